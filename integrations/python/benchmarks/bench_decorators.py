@@ -0,0 +1,45 @@
+"""Measure per-call overhead of stacked Tribute decorators.
+
+Run from ``integrations/python``::
+
+    python -m benchmarks.bench_decorators
+"""
+
+from __future__ import annotations
+
+import timeit
+from functools import wraps
+from typing import Any, Callable
+
+from tribute_core import cacheable, entitlement, metered
+
+
+def _nested_wrapper(func: Callable[..., Any]) -> Callable[..., Any]:
+    """One wrapper frame per decorator, as the decorators used to add."""
+
+    @wraps(func)
+    def wrapper(*args: Any, **kwargs: Any):
+        return func(*args, **kwargs)
+
+    return wrapper
+
+
+def handler(item_id: int, *, verbose: bool = False) -> int:
+    return item_id
+
+
+def main(iterations: int = 2_000_000) -> None:
+    nested = _nested_wrapper(_nested_wrapper(_nested_wrapper(handler)))
+    stacked = cacheable(ttl=30)(entitlement(feature="pro")(metered(policy_ver=1)(handler)))
+
+    results = {
+        "undecorated": timeit.timeit(lambda: handler(1, verbose=True), number=iterations),
+        "3 nested wrappers": timeit.timeit(lambda: nested(1, verbose=True), number=iterations),
+        "stacked decorators": timeit.timeit(lambda: stacked(1, verbose=True), number=iterations),
+    }
+    for name, elapsed in results.items():
+        print(f"{name:>18}: {elapsed / iterations * 1e9:8.1f} ns/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Measure pricing-rule lookups on typical and backtracking-heavy tables.
+
+Run from ``integrations/python``::
+
+    python -m benchmarks.bench_pricing
+
+The worst case stacks ``depth`` levels where both the literal and the
+wildcard branch match and every early rule dead-ends on the last segment,
+so the walk has to back out of each of them before reaching the catch-all
+rule. A linear scan over the same rules is printed for comparison.
+"""
+
+from __future__ import annotations
+
+import re
+import timeit
+from typing import List, Optional, Tuple
+
+from tribute_core import CompiledPricing
+
+
+def _policy(paths: List[str]) -> dict:
+    return {
+        "policyVersion": 1,
+        "rules": [{"match": {"method": "GET", "path": path}, "price": {"flat": 1}} for path in paths],
+    }
+
+
+def _typical(routes: int = 5_000) -> Tuple[List[str], str]:
+    paths = [f"/v1/service{index}/items/{{id}}" for index in range(routes)]
+    return paths, f"/v1/service{routes - 1}/items/42"
+
+
+def _worst_case(depth: int) -> Tuple[List[str], str]:
+    paths = []
+    for level in range(depth):
+        segments = ["a"] * depth
+        segments[level] = "{p}"
+        paths.append("/" + "/".join(segments) + "/dead-end")
+    paths.append("/" + "/".join(["{p}"] * depth) + "/{last}")
+    return paths, "/" + "/".join(["a"] * depth) + "/live"
+
+
+def _linear(paths: List[str]):
+    patterns = [
+        re.compile("/".join("[^/]+".join(map(re.escape, re.split(r"\{[^/]+\}", part))) for part in path.split("/")))
+        for path in paths
+    ]
+
+    def match(path: str) -> Optional[int]:
+        return next((index for index, pattern in enumerate(patterns) if pattern.fullmatch(path)), None)
+
+    return match
+
+
+def main(iterations: int = 20_000) -> None:
+    cases = {"typical 5k routes": _typical()}
+    for depth in (4, 8, 12):
+        cases[f"worst case depth {depth}"] = _worst_case(depth)
+    for name, (paths, path) in cases.items():
+        compiled = CompiledPricing.from_policy(_policy(paths))
+        linear = _linear(paths)
+        rule = compiled.match("GET", path)
+        assert rule is not None and rule.index == linear(path)
+        trie = timeit.timeit(lambda: compiled.match("GET", path), number=iterations) / iterations
+        scan = timeit.timeit(lambda: linear(path), number=iterations // 10) / (iterations // 10)
+        print(f"{name:>22}: trie {trie * 1e6:8.2f} us   linear scan {scan * 1e6:8.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Compare HMACSigner throughput against the original per-call implementation.
+
+Run from ``integrations/python``::
+
+    python -m benchmarks.bench_signing
+"""
+
+from __future__ import annotations
+
+import base64
+import hmac
+import json
+import timeit
+from hashlib import sha256
+from typing import Any, Mapping
+
+from tribute_core import HMACSigner, Price
+
+
+def _b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+class BaselineSigner:
+    """The signer as it was before header and key-state caching."""
+
+    def __init__(self, *, key_id: str, secret: bytes):
+        self.key_id = key_id
+        self._secret = secret
+
+    def sign_estimate(self, price: Price, observables: Mapping[str, Any]) -> str:
+        header = {"alg": "HS256", "kid": self.key_id, "typ": "JOSE"}
+        payload = {"price": str(price), "observables": observables}
+        encoded_header = _b64url(json.dumps(header, separators=(",", ":")).encode("utf-8"))
+        encoded_payload = _b64url(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+        signing_input = f"{encoded_header}.{encoded_payload}".encode("ascii")
+        digest = hmac.new(self._secret, signing_input, sha256).digest()
+        return f"{encoded_header}.{encoded_payload}.{_b64url(digest)}"
+
+
+def main(iterations: int = 50_000) -> None:
+    price = Price.parse("0.0125")
+    observables = {"prompt_tokens": 512, "model": "gpt-4o-mini"}
+    secret = b"s" * 32
+    baseline = BaselineSigner(key_id="primary", secret=secret)
+    signer = HMACSigner(key_id="primary", secret=secret)
+    assert baseline.sign_estimate(price, observables) == signer.sign_estimate(price, observables)
+
+    batch = [(price, observables)] * iterations
+    results = {
+        "baseline": timeit.timeit(lambda: baseline.sign_estimate(price, observables), number=iterations),
+        "sign_estimate": timeit.timeit(lambda: signer.sign_estimate(price, observables), number=iterations),
+        "sign_many": timeit.timeit(lambda: signer.sign_many(batch), number=1),
+    }
+    for name, elapsed in results.items():
+        print(f"{name:>14}: {iterations / elapsed:>12,.0f} signatures/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 """Optional utilities for Tribute Python SDKs."""
 
-from . import llm_openai
+from . import llm_openai, llm_prompt_cost
 
-__all__ = ["llm_openai"]
+__all__ = ["llm_openai", "llm_prompt_cost"]
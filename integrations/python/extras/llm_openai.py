@@ -2,7 +2,12 @@
 
 from __future__ import annotations
 
-from typing import Any, Dict, Mapping
+import json
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, List, Mapping, Optional, Union
+
+from tribute_core import AccountedStream, UsageTracker
+
+Chunk = Union[bytes, bytearray, memoryview]
 
 
 def tokens_from_response(response: Mapping[str, Any]) -> Dict[str, int]:
@@ -13,3 +18,129 @@ def tokens_from_response(response: Mapping[str, Any]) -> Dict[str, int]:
         "prompt_tokens": int(usage.get("prompt_tokens", 0)),
         "completion_tokens": int(usage.get("completion_tokens", 0)),
     }
+
+
+class StreamUsageExtractor:
+    """Pull token usage out of a streamed (SSE) ChatCompletion as it passes by.
+
+    Feed raw response chunks in any split; only the current incomplete line
+    is buffered. The ``usage`` block of the final chunk (sent when the request
+    sets ``stream_options.include_usage``) wins. Without it,
+    ``completion_tokens`` falls back to the number of non-empty deltas, which
+    OpenAI emits roughly one per token. :meth:`close` hands the result to
+    ``tracker.set_usage``.
+    """
+
+    def __init__(self, tracker: Optional[UsageTracker] = None):
+        self.tracker = tracker
+        self.usage: Optional[Dict[str, int]] = None
+        self.delta_count = 0
+        self.closed = False
+        self._pending = bytearray()
+        self._data: List[bytes] = []
+
+    def feed(self, chunk: Chunk) -> None:
+        pending = self._pending
+        pending += chunk
+        start = 0
+        while True:
+            end = pending.find(b"\n", start)
+            if end < 0:
+                break
+            self._line(bytes(pending[start:end]).rstrip(b"\r"))
+            start = end + 1
+        if start:
+            del pending[:start]
+
+    def tokens(self) -> Dict[str, int]:
+        if self.usage is not None:
+            return dict(self.usage)
+        return {"prompt_tokens": 0, "completion_tokens": self.delta_count}
+
+    def close(self) -> Dict[str, int]:
+        """Flush the final event and report usage to the tracker once."""
+
+        if not self.closed:
+            self.closed = True
+            if self._pending:
+                self._line(bytes(self._pending).rstrip(b"\r"))
+                self._pending.clear()
+            self._dispatch()
+            if self.tracker is not None:
+                self.tracker.set_usage(self.tokens())
+        return self.tokens()
+
+    def _line(self, line: bytes) -> None:
+        if not line:
+            self._dispatch()
+        elif line.startswith(b"data:"):
+            value = line[5:]
+            self._data.append(value[1:] if value.startswith(b" ") else value)
+        # Comments (":"), event/id/retry fields carry no usage.
+
+    def _dispatch(self) -> None:
+        if not self._data:
+            return
+        payload = b"\n".join(self._data)
+        self._data = []
+        if payload == b"[DONE]":
+            return
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            return
+        if not isinstance(event, dict):
+            return
+        usage = event.get("usage")
+        if isinstance(usage, Mapping):
+            self.usage = tokens_from_response(event)
+        choices = event.get("choices")
+        for choice in choices if isinstance(choices, list) else ():
+            if not isinstance(choice, Mapping):
+                continue
+            delta = choice.get("delta")
+            if not isinstance(delta, Mapping):
+                continue
+            if delta.get("content") or delta.get("tool_calls") or delta.get("function_call"):
+                self.delta_count += 1
+
+
+def track_stream_usage(
+    body: Iterable[Chunk], *, tracker: Optional[UsageTracker] = None
+) -> AccountedStream:
+    """Pass an SSE response body through, recording bytes, hash and token usage.
+
+    Usage is reported to ``tracker`` when the body ends, fails or is closed early.
+    """
+
+    tracker = tracker or UsageTracker()
+    extractor = StreamUsageExtractor(tracker)
+
+    def tapped() -> Iterator[Chunk]:
+        try:
+            for chunk in body:
+                extractor.feed(chunk)
+                yield chunk
+        finally:
+            extractor.close()
+
+    return AccountedStream(tapped(), tracker=tracker)
+
+
+def track_async_stream_usage(
+    body: AsyncIterable[Chunk], *, tracker: Optional[UsageTracker] = None
+) -> AccountedStream:
+    """Async counterpart of :func:`track_stream_usage`."""
+
+    tracker = tracker or UsageTracker()
+    extractor = StreamUsageExtractor(tracker)
+
+    async def tapped() -> AsyncIterator[Chunk]:
+        try:
+            async for chunk in body:
+                extractor.feed(chunk)
+                yield chunk
+        finally:
+            extractor.close()
+
+    return AccountedStream(tapped(), tracker=tracker)
@@ -0,0 +1,194 @@
+"""Fast local prompt-cost estimates for metered chat-completion routes."""
+
+from __future__ import annotations
+
+import json
+import math
+import re
+from dataclasses import dataclass
+from decimal import Decimal
+from hashlib import sha256
+from typing import Any, Iterable, Mapping, Optional, Tuple, Union
+
+from tribute_core import CanonicalBody, EstimateResult, Price, Signer, TTLCache, estimate
+
+_MILLION = 1_000_000
+
+# Approximates the cl100k/o200k pre-tokenizer: letter runs, digit groups of
+# up to three, newline runs and single symbols.
+_PIECE = re.compile(r"[^\W\d_]+|\d{1,3}|\n+|[^\s\w]|_")
+
+# Per-message framing tokens from OpenAI's chat format (role, separators) and
+# the tokens that prime the assistant reply.
+_TOKENS_PER_MESSAGE = 3
+_TOKENS_PER_NAME = 1
+_REPLY_PRIMING = 3
+
+
+@dataclass(frozen=True)
+class ModelPrice:
+    """USD list price per million input and output tokens."""
+
+    input_per_million: Price
+    output_per_million: Price
+
+
+# List prices at the time of writing; pass ``prices=`` to use your own rates.
+DEFAULT_PRICES: Mapping[str, ModelPrice] = {
+    "gpt-4o": ModelPrice(Price.parse("2.50"), Price.parse("10.00")),
+    "gpt-4o-mini": ModelPrice(Price.parse("0.15"), Price.parse("0.60")),
+    "gpt-4.1": ModelPrice(Price.parse("2.00"), Price.parse("8.00")),
+    "gpt-4.1-mini": ModelPrice(Price.parse("0.40"), Price.parse("1.60")),
+    "gpt-4.1-nano": ModelPrice(Price.parse("0.10"), Price.parse("0.40")),
+    "gpt-3.5-turbo": ModelPrice(Price.parse("0.50"), Price.parse("1.50")),
+}
+
+
+def count_text_tokens(text: str) -> int:
+    """Estimate BPE tokens in ``text`` with a single regex pass.
+
+    Common ASCII words are one token and longer ones split roughly every six
+    characters; non-ASCII letters cost about a token each.
+    """
+
+    tokens = 0
+    for match in _PIECE.finditer(text):
+        piece = match.group()
+        if piece.isascii():
+            tokens += 1 + (len(piece) - 1) // 6 if piece.isalpha() else 1
+        else:
+            tokens += len(piece)
+    return tokens
+
+
+def count_prompt_tokens(payload: Mapping[str, Any]) -> int:
+    """Estimate prompt tokens for a chat-completion request body."""
+
+    tokens = _REPLY_PRIMING
+    for message in payload.get("messages") or ():
+        tokens += _TOKENS_PER_MESSAGE
+        for key, value in message.items():
+            if key == "content":
+                tokens += _content_tokens(value)
+            elif isinstance(value, str):
+                tokens += count_text_tokens(value)
+                if key == "name":
+                    tokens += _TOKENS_PER_NAME
+    return tokens
+
+
+def _content_tokens(content: Any) -> int:
+    if isinstance(content, str):
+        return count_text_tokens(content)
+    tokens = 0
+    # Multi-part content: only text parts are counted; images are priced separately.
+    for part in content or ():
+        if isinstance(part, Mapping) and isinstance(part.get("text"), str):
+            tokens += count_text_tokens(part["text"])
+    return tokens
+
+
+class PromptCostEstimator:
+    """Price chat-completion requests locally, without a tokenizer round-trip.
+
+    Token counts are memoized by the ``CanonicalBody.digest`` of the request,
+    so a repeated prompt costs one cache lookup. Prompt tokens are inflated by
+    ``error_bound`` (a relative error; measure it for your traffic with
+    :func:`calibrate`) and completion tokens are taken from ``max_tokens`` /
+    ``max_completion_tokens``, falling back to ``default_completion_tokens``,
+    so the estimate is an upper bound on the final price.
+    """
+
+    def __init__(
+        self,
+        *,
+        prices: Optional[Mapping[str, ModelPrice]] = None,
+        error_bound: float = 0.25,
+        default_completion_tokens: int = 256,
+        memo: Optional[TTLCache[Tuple[str, int, int]]] = None,
+    ):
+        self.prices = dict(DEFAULT_PRICES if prices is None else prices)
+        self.error_bound = error_bound
+        self.default_completion_tokens = default_completion_tokens
+        self.memo = memo if memo is not None else TTLCache(max_entries=4096, default_ttl_seconds=3600.0)
+
+    def price_for(self, model: str) -> ModelPrice:
+        """Return the price for ``model``, matching dated snapshots by prefix."""
+
+        price = self.prices.get(model)
+        if price is not None:
+            return price
+        for name in sorted(self.prices, key=len, reverse=True):
+            if model.startswith(name + "-"):
+                return self.prices[name]
+        raise ValueError(f"no price configured for model {model!r}")
+
+    def analyze(
+        self,
+        body: Union[CanonicalBody, bytes],
+        payload: Optional[Mapping[str, Any]] = None,
+    ) -> Tuple[str, int, int]:
+        """Return ``(model, prompt_tokens, completion_tokens)`` for a request body.
+
+        Pass the parsed ``payload`` when the canonical body did not retain its
+        bytes (streamed requests); it is only consulted on a memo miss.
+        """
+
+        digest = body.digest if isinstance(body, CanonicalBody) else sha256(body).hexdigest()
+        cached = self.memo.get(digest)
+        if cached is not None:
+            return cached
+        if payload is None:
+            raw = body.open().read() if isinstance(body, CanonicalBody) else body
+            payload = json.loads(raw)
+        model = str(payload.get("model", ""))
+        completion = payload.get("max_completion_tokens") or payload.get("max_tokens")
+        result = (
+            model,
+            count_prompt_tokens(payload),
+            int(completion) if completion else self.default_completion_tokens,
+        )
+        self.memo.set(digest, result)
+        return result
+
+    def estimate(
+        self,
+        body: Union[CanonicalBody, bytes],
+        payload: Optional[Mapping[str, Any]] = None,
+        *,
+        signer: Optional[Signer] = None,
+    ) -> EstimateResult:
+        model, prompt_tokens, completion_tokens = self.analyze(body, payload)
+        price = self.price_for(model)
+        bounded_prompt = math.ceil(prompt_tokens * (1 + Decimal(str(self.error_bound))))
+        scaled = (
+            bounded_prompt * price.input_per_million.micros
+            + completion_tokens * price.output_per_million.micros
+        )
+        return estimate(
+            # Round up to the next micro-unit so the estimate stays an upper bound.
+            estimated_price=Price(-(-scaled // _MILLION)),
+            observables={
+                "model": model,
+                "prompt_tokens": prompt_tokens,
+                "max_completion_tokens": completion_tokens,
+                "error_bound": self.error_bound,
+            },
+            signer=signer,
+        )
+
+
+def calibrate(samples: Iterable[Tuple[Mapping[str, Any], int]]) -> float:
+    """Return the worst relative under-count over ``(payload, actual_prompt_tokens)``.
+
+    Feed request bodies with the ``prompt_tokens`` later reported by the
+    provider (for example from usage reports) and use the result as
+    ``PromptCostEstimator(error_bound=...)``.
+    """
+
+    worst = 0.0
+    for payload, actual in samples:
+        estimated = count_prompt_tokens(payload)
+        if estimated and actual > estimated:
+            worst = max(worst, actual / estimated - 1)
+    return worst
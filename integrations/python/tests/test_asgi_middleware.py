@@ -0,0 +1,134 @@
+import asyncio
+import hashlib
+
+from tribute_core import CacheRule, Canonicalizer, ResponseCache, canonicalize_request
+from tribute_fastapi import TributeASGIMiddleware
+
+
+def _run(make_middleware, scope, chunks):
+    messages = [{"type": "http.request", "body": chunk, "more_body": index < len(chunks) - 1} for index, chunk in enumerate(chunks)]
+    received = []
+    seen_state = {}
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        pass
+
+    async def app(scope, receive, send):
+        seen_state["before"] = scope["state"].get("tribute_canonical")
+        while True:
+            message = await receive()
+            received.append(message["body"])
+            if not message.get("more_body"):
+                break
+
+    asyncio.run(make_middleware(app)(scope, receive, send))
+    return received, seen_state
+
+
+def test_middleware_hashes_streamed_body_and_passes_chunks_through():
+    chunks = [b"a" * 10, b"b" * 10, b"c"]
+    scope = {
+        "type": "http",
+        "method": "PUT",
+        "path": "/files/42",
+        "query_string": b"b=2&a=1&a=",
+        "headers": [(b"content-type", b"application/octet-stream"), (b"content-length", b"21"), (b"x-other", b"1")],
+    }
+    received, seen = _run(
+        lambda app: TributeASGIMiddleware(
+            app,
+            header_allowlist=["content-type"],
+            canonicalizers=[Canonicalizer(header_allowlist=["content-type"], path_template="/files/{file_id}")],
+        ),
+        scope,
+        chunks,
+    )
+
+    assert received == chunks
+    assert seen["before"] is None
+    canonical = scope["state"]["tribute_canonical"]
+    expected = canonicalize_request(
+        method="put",
+        raw_path="/files/42",
+        header_allowlist=["content-type"],
+        headers=[("content-type", "application/octet-stream")],
+        query=[("b", "2"), ("a", "1"), ("a", "")],
+        body=b"".join(chunks),
+        path_params={"file_id": "42"},
+    )
+    assert canonical.path_template == "/files/{file_id}"
+    assert canonical.body.digest == hashlib.sha256(b"".join(chunks)).hexdigest()
+    assert canonical.hash() == expected.hash()
+
+
+def test_middleware_canonicalizes_bodyless_requests_up_front():
+    scope = {"type": "http", "method": "GET", "path": "/v1/demo", "query_string": b"", "headers": []}
+    _, seen = _run(lambda app: TributeASGIMiddleware(app), scope, [b""])
+
+    assert seen["before"] is not None
+    assert seen["before"].path_template == "/v1/demo"
+    assert seen["before"].body is None
+
+
+def test_middleware_serves_cached_responses_for_cache_rules():
+    calls = []
+
+    async def app(scope, receive, send):
+        calls.append(scope["path"])
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+        await send({"type": "http.response.body", "body": scope["path"].encode("utf-8")})
+
+    middleware = TributeASGIMiddleware(
+        app,
+        canonicalizers=[Canonicalizer(header_allowlist=[], path_template="/items/{item_id}")],
+        response_cache=ResponseCache(),
+        cache_rules={("GET", "/items/{item_id}"): CacheRule(ttl_seconds=60)},
+    )
+
+    def get(path, method="GET"):
+        sent = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": method, "path": path, "query_string": b"", "headers": []}
+        asyncio.run(middleware(scope, receive, send))
+        return sent[0]["status"], b"".join(message.get("body", b"") for message in sent[1:])
+
+    assert get("/items/1") == (200, b"/items/1")
+    assert get("/items/1") == (200, b"/items/1")
+    assert get("/items/2") == (200, b"/items/2")
+    assert calls == ["/items/1", "/items/2"]
+
+    # Bodyless DELETEs share the path template but must reach the app every time.
+    assert get("/items/1", "DELETE") == (200, b"/items/1")
+    assert get("/items/1", "DELETE") == (200, b"/items/1")
+    assert calls == ["/items/1", "/items/2", "/items/1", "/items/1"]
+
+
+def test_http2_bodies_without_length_headers_are_hashed():
+    chunks = [b"x" * 5, b"y" * 5]
+    scope = {
+        "type": "http",
+        "http_version": "2",
+        "method": "POST",
+        "path": "/upload",
+        "query_string": b"",
+        "headers": [(b"content-type", b"application/octet-stream")],
+    }
+    received, _ = _run(lambda app: TributeASGIMiddleware(app, header_allowlist=["content-type"]), scope, chunks)
+
+    assert received == chunks
+    canonical = scope["state"]["tribute_canonical"]
+    assert canonical.body is not None
+    assert canonical.body.digest == hashlib.sha256(b"".join(chunks)).hexdigest()
+
+    get_scope = dict(scope, method="GET", state={})
+    _run(lambda app: TributeASGIMiddleware(app, header_allowlist=["content-type"]), get_scope, [b""])
+    assert get_scope["state"]["tribute_canonical"].body is None
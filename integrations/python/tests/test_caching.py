@@ -0,0 +1,193 @@
+import asyncio
+from decimal import Decimal
+
+from tribute_core import (
+    CachedResponse,
+    CacheRule,
+    EstimateCache,
+    PolicyContext,
+    PolicyDigest,
+    ResponseCache,
+    TTLCache,
+    canonicalize_request,
+    estimate,
+)
+
+
+def _canonical(prompt: str):
+    return canonicalize_request(
+        method="post",
+        raw_path="/llm/estimate",
+        header_allowlist=["content-type"],
+        headers=[("Content-Type", "application/json")],
+        query=[],
+        body=f'{{"prompt": "{prompt}"}}'.encode("utf-8"),
+    )
+
+
+def test_ttl_cache_evicts_lru_and_expires():
+    now = [0.0]
+    cache = TTLCache(max_entries=2, default_ttl_seconds=5, clock=lambda: now[0])
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    now[0] = 6
+    assert cache.get("c") is None
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+def test_estimate_cache_reuses_results_and_honours_ttl():
+    now = [0.0]
+    cache = EstimateCache(policy=PolicyContext(policy_version=1), clock=lambda: now[0])
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"estimated_price": 0.05, "estimate_ttl_seconds": 10}
+
+    first = cache.get_or_compute(_canonical("hi"), compute)
+    second = cache.get_or_compute(_canonical("hi"), compute)
+    assert first is second
+    cache.get_or_compute(_canonical("other"), compute)
+    assert len(calls) == 2
+
+    now[0] = 11
+    cache.get_or_compute(_canonical("hi"), compute)
+    assert len(calls) == 3
+
+
+def test_estimate_cache_invalidates_on_policy_change():
+    policy = PolicyContext(policy_version=1)
+    cache = EstimateCache(policy=policy, policy_digest=PolicyDigest(version=1, digest="abc"))
+    result = estimate(estimated_price=Decimal("0.2"))
+    cache.put(_canonical("hi"), result)
+    assert cache.get(_canonical("hi")) is result
+
+    policy.policy_version = 2
+    assert cache.get(_canonical("hi")) is None
+    assert len(cache) == 0
+
+    cache.put(_canonical("hi"), result)
+    cache.set_policy(policy, PolicyDigest(version=2, digest="def"))
+    assert cache.get(_canonical("hi")) is None
+
+
+def _parts(response):
+    return response
+
+
+def test_cache_rule_from_cacheable_options():
+    assert CacheRule.from_options(None) is None
+    rule = CacheRule.from_options({"ttl": 30, "stale_while_revalidate": 10, "vary": "Accept, X-Tenant"})
+    assert rule == CacheRule(ttl_seconds=30, stale_while_revalidate=10, vary=("accept", "x-tenant"))
+
+
+def test_response_cache_keys_split_on_path_and_vary_headers():
+    rule = CacheRule(vary=("accept",))
+    canonical = _canonical("hi")
+    json_key = ResponseCache.key(canonical, rule, {"accept": "application/json"}.get, path="/items/1")
+    assert json_key == ResponseCache.key(canonical, rule, {"accept": "application/json"}.get, path="/items/1")
+    assert json_key != ResponseCache.key(canonical, rule, {"accept": "text/html"}.get, path="/items/1")
+    assert json_key != ResponseCache.key(canonical, rule, {"accept": "application/json"}.get, path="/items/2")
+
+
+def test_response_cache_serves_hits_and_skips_uncacheable_responses():
+    now = [0.0]
+    cache = ResponseCache(clock=lambda: now[0])
+    rule = CacheRule(ttl_seconds=10)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return (200, [("content-type", "text/plain")], b"ok")
+
+    response = cache.get_or_compute("k", rule, compute, _parts, method="GET")
+    assert response == (200, [("content-type", "text/plain")], b"ok")
+    hit = cache.get_or_compute("k", rule, compute, _parts, method="GET")
+    assert isinstance(hit, CachedResponse)
+    assert (hit.status, hit.headers, hit.body) == (200, (("content-type", "text/plain"),), b"ok")
+    assert len(calls) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    now[0] = 11
+    assert cache.lookup("k") is None
+
+    assert not cache.store("a", rule, 500, [], b"boom", method="GET")
+    assert not cache.store("b", rule, 200, [("Set-Cookie", "sid=1")], b"", method="GET")
+    assert not cache.store("c", rule, 200, [("Cache-Control", "private, max-age=60")], b"", method="GET")
+    assert not ResponseCache(max_body_bytes=2).store("d", rule, 200, [], b"big", method="GET")
+    assert not cache.store("e", rule, 200, [], b"ok", method="POST")
+
+
+def test_response_cache_only_serves_get_and_head():
+    cache = ResponseCache()
+    rule = CacheRule(ttl_seconds=10)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return (200, [], b"deleted")
+
+    for method in ("DELETE", "POST", "DELETE"):
+        assert cache.get_or_compute("k", rule, compute, _parts, method=method) == (200, [], b"deleted")
+    assert len(calls) == 3
+    assert len(cache) == 0 and cache.misses == 0
+
+    async def async_compute():
+        calls.append(1)
+        return (200, [], b"put")
+
+    assert asyncio.run(cache.get_or_compute_async("k", rule, async_compute, _parts, method="PUT")) == (200, [], b"put")
+    assert len(calls) == 4 and len(cache) == 0
+
+    cache.get_or_compute("k", rule, compute, _parts, method="HEAD")
+    assert isinstance(cache.get_or_compute("k", rule, compute, _parts, method="HEAD"), CachedResponse)
+
+
+def test_response_cache_serves_stale_while_one_refresh_runs():
+    now = [0.0]
+    cache = ResponseCache(clock=lambda: now[0])
+    rule = CacheRule(ttl_seconds=10, stale_while_revalidate=20)
+    cache.store("k", rule, 200, [], b"old", method="GET")
+    now[0] = 15
+
+    async def compute():
+        return (200, [], b"new")
+
+    async def scenario():
+        stale = [await cache.get_or_compute_async("k", rule, compute, _parts, method="GET") for _ in range(3)]
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        return stale
+
+    stale = asyncio.run(scenario())
+    assert [entry.body for entry in stale] == [b"old"] * 3
+    assert (cache.stale_hits, cache.revalidations) == (3, 1)
+    entry = cache.lookup("k")
+    assert entry.body == b"new" and cache.is_fresh(entry)
+
+    now[0] = 100
+    assert cache.lookup("k") is None
+
+
+def test_response_cache_disk_tier_is_shared_between_instances(tmp_path):
+    now = [0.0]
+    rule = CacheRule(ttl_seconds=10)
+    writer = ResponseCache(disk_path=tmp_path, clock=lambda: now[0])
+    writer.store("abcdef", rule, 200, [("content-type", "application/json")], b'{"a": 1}', method="GET")
+
+    reader = ResponseCache(disk_path=tmp_path, clock=lambda: now[0])
+    entry = reader.lookup("abcdef")
+    assert entry.body == b'{"a": 1}'
+    assert entry.headers == (("content-type", "application/json"),)
+    assert reader.disk_hits == 1
+    reader.lookup("abcdef")
+    assert reader.disk_hits == 1
+
+    now[0] = 11
+    assert ResponseCache(disk_path=tmp_path, clock=lambda: now[0]).lookup("abcdef") is None
+    assert not (tmp_path / "ab" / "abcdef").exists()
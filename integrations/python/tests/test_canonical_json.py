@@ -0,0 +1,115 @@
+import hashlib
+import json
+import random
+
+import pytest
+
+from tribute_core import canonicalize_request, get_json_backend, set_json_backend
+from tribute_core.canonical_json import StdlibJSONBackend, available_backends, json_dumps, json_loads
+
+CORPUS = [
+    b'{"beta": 2, "alpha": 1}',
+    b'  {"nested": {"z": [3, 2, 1], "a": {"y": null, "x": true}}, "b": false} ',
+    b'{"a": 1, "a": 2, "b": {"a": 1, "a": {"c": 3}}}',
+    b'[1, -0, 0.1, 1e16, 1E-5, -2.5e+300, 1e400, 123456789012345678901234567890]',
+    b'[18446744073709551615, -9223372036854775809, 9007199254740993.0]',
+    b'{"msg": "caf\xc3\xa9 \xf0\x9f\x98\x80 \\u2028 \\ud83d\\ude00 \x7f"}',
+    b'{"esc": "\\"\\\\\\/\\b\\f\\n\\r\\t\\u0001"}',
+    b'[NaN, Infinity, -Infinity]',
+    b'{"\xc3\xa9": 1, "e": 2, "E": 3, "": 4}',
+    b'"just a string"',
+    b'42',
+    b'null',
+    b' null ',
+    b'{}',
+    b'[[], {}, [{}]]',
+    b'{not-json}',
+    b'{"a": 1,}',
+    b'[1, 2',
+    b'01',
+    b'"\\ud800"',
+    b'\xef\xbb\xbf{"a": 1}',
+    b'\xff\xfe',
+    b'{"a": 1} trailing',
+    b'',
+]
+
+
+def _reference(payload: bytes):
+    return StdlibJSONBackend().canonicalize(payload)
+
+
+def _random_document(rng: random.Random, depth: int = 0):
+    choice = rng.randrange(8 if depth < 4 else 5)
+    if choice == 0:
+        return rng.randint(-(2**70), 2**70)
+    if choice == 1:
+        return rng.uniform(-1e20, 1e20) * rng.choice([1, 1e-10, 1e10])
+    if choice == 2:
+        return "".join(chr(rng.choice([rng.randrange(32, 127), rng.randrange(0x80, 0x3000)])) for _ in range(rng.randrange(6)))
+    if choice == 3:
+        return rng.choice([True, False, None])
+    if choice == 4:
+        return rng.randrange(1000)
+    if choice == 5:
+        return [_random_document(rng, depth + 1) for _ in range(rng.randrange(4))]
+    return {
+        _random_document(rng, 4) if rng.random() < 0.5 else str(rng.randrange(50)): _random_document(rng, depth + 1)
+        for _ in range(rng.randrange(5))
+    }
+
+
+@pytest.mark.parametrize("name", sorted(available_backends()))
+@pytest.mark.parametrize("payload", CORPUS)
+def test_backends_match_reference(name, payload):
+    backend = available_backends()[name]
+    assert backend.canonicalize(payload) == _reference(payload)
+
+
+@pytest.mark.parametrize("name", sorted(available_backends()))
+def test_backends_match_reference_on_random_documents(name):
+    backend = available_backends()[name]
+    rng = random.Random(8785)
+    for _ in range(300):
+        document = _random_document(rng)
+        if isinstance(document, str) or not isinstance(document, (dict, list)):
+            document = [document]
+        payload = json.dumps(document, ensure_ascii=rng.random() < 0.5, indent=rng.choice([None, 2])).encode("utf-8")
+        assert backend.canonicalize(payload) == _reference(payload)
+
+
+@pytest.mark.parametrize("name", sorted(available_backends()))
+def test_body_digest_is_backend_independent(name):
+    payload = b'{"messages": [{"role": "user", "content": "hi \xc3\xa9"}], "temperature": 0.7}'
+    previous = set_json_backend(name)
+    try:
+        canonical = canonicalize_request(
+            method="post",
+            raw_path="/llm",
+            header_allowlist=["content-type"],
+            headers=[("Content-Type", "application/json")],
+            query=[],
+            body=payload,
+        )
+    finally:
+        set_json_backend(previous)
+
+    expected = json.dumps(json.loads(payload), separators=(",", ":"), sort_keys=True).encode("utf-8")
+    assert canonical.body is not None
+    assert canonical.body.digest == hashlib.sha256(expected).hexdigest()
+    assert get_json_backend() is previous
+
+
+def test_set_json_backend_rejects_unknown_name():
+    with pytest.raises(ValueError):
+        set_json_backend("simdjson")
+
+
+def test_json_helpers_round_trip_and_raise_value_error():
+    from decimal import Decimal
+
+    encoded = json_dumps({"b": [1, "é"], "a": Decimal("0.5")}, default=str)
+    assert isinstance(encoded, bytes) and b" " not in encoded
+    assert json_loads(encoded) == json_loads(encoded.decode("utf-8")) == {"b": [1, "é"], "a": "0.5"}
+    with pytest.raises(ValueError):
+        json_loads(b"{not json")
@@ -1,4 +1,6 @@
-from tribute_core import canonicalize_request
+import pytest
+
+from tribute_core import CanonicalBodyBuilder, CanonicalRequest, Canonicalizer, canonicalize_request
 
 
 def test_json_body_canonicalization():
@@ -81,3 +83,124 @@ def test_canonicalize_body_invalid_json():
     assert canonical.body is not None
     # When parsing fails the raw payload is preserved
     assert canonical.body.raw == b"{not-json}"
+
+
+def test_body_builder_matches_one_shot_digest():
+    payload = b"x" * 5000
+    builder = CanonicalBodyBuilder("application/octet-stream", spool_threshold=1024)
+    for offset in range(0, len(payload), 700):
+        builder.feed(payload[offset : offset + 700])
+    streamed = builder.finish()
+
+    assert streamed is not None
+    assert streamed.spooled
+    assert streamed.raw == b""
+    assert streamed.open().read() == payload
+    one_shot = canonicalize_request(
+        method="post",
+        raw_path="/upload",
+        header_allowlist=[],
+        headers=[],
+        query=[],
+        body=payload,
+    )
+    assert one_shot.body is not None
+    assert streamed.digest == one_shot.body.digest
+
+
+def test_body_builder_json_and_empty():
+    builder = CanonicalBodyBuilder("application/json", spool_threshold=4)
+    builder.feed(b'{"beta": 2, ')
+    builder.feed(b'"alpha": 1}')
+    body = builder.finish()
+    assert body is not None
+    assert body.raw == b'{"alpha":1,"beta":2}'
+
+    canonical = canonicalize_request(
+        method="post",
+        raw_path="/llm",
+        header_allowlist=[],
+        headers=[],
+        query=[],
+        body=body,
+    )
+    assert canonical.body is body
+    assert CanonicalBodyBuilder().finish() is None
+
+
+def test_canonicalizer_resolves_route_template():
+    canonicalizer = Canonicalizer(
+        header_allowlist=["Accept"],
+        path_template="/chats/{chat_id}/messages/{message_id}",
+    )
+    canonical = canonicalizer.canonicalize(
+        method="get",
+        raw_path="/chats/7/messages/7",
+        headers=[("ACCEPT", "text/plain")],
+        query=[],
+        body=None,
+        path_params={"chat_id": 7, "message_id": 7},
+    )
+
+    assert canonical.path_template == "/chats/{chat_id}/messages/{message_id}"
+    assert canonical.headers == {"accept": ("text/plain",)}
+    assert canonicalizer.header_allowlist == frozenset({"accept"})
+
+
+def test_canonicalizer_rewrites_exact_segments_only():
+    canonicalizer = Canonicalizer(header_allowlist=[])
+    path = canonicalizer.resolve_path("/files/2024/20245", {"year": 2024})
+    assert path == "/files/{year}/20245"
+
+
+def test_canonicalizer_drops_converter_suffixes():
+    canonicalizer = Canonicalizer(header_allowlist=[], path_template="/items/{id:int}")
+    assert canonicalizer.resolve_path("/items/42", {"id": 42}) == "/items/{id}"
+    assert canonicalizer.match_path("/items/42") == {"id": "42"}
+
+
+@pytest.mark.parametrize("template", [None, "/files/{name:path}"], ids=["rewrite", "template"])
+def test_multi_segment_path_params_are_templated(template):
+    canonicalizer = Canonicalizer(header_allowlist=[], path_template=template)
+    assert canonicalizer.resolve_path("/files/a/b", {"name": "a/b"}) == "/files/{name}"
+    canonical = canonicalize_request(
+        method="get",
+        raw_path="/files/a/b",
+        header_allowlist=[],
+        headers=[],
+        query=[],
+        body=None,
+        path_params={"name": "a/b"},
+    )
+    assert canonical.path_template == "/files/{name}"
+
+
+def test_equal_path_params_keep_their_positions():
+    canonicalizer = Canonicalizer(header_allowlist=[])
+    assert canonicalizer.resolve_path("/a/1/b/1", {"x": 1, "y": 1}) == "/a/{x}/b/{y}"
+
+
+def test_hash_is_memoized_and_binary_roundtrip():
+    canonical = canonicalize_request(
+        method="post",
+        raw_path="/llm/42",
+        header_allowlist=["content-type", "x-tenant"],
+        headers=[("Content-Type", "application/json"), ("X-Tenant", "b"), ("X-Tenant", "a")],
+        query=[("q", "café"), ("page", "2")],
+        body=b'{"prompt": "hi"}',
+        path_params={"chat_id": 42},
+    )
+    digest = canonical.hash()
+    assert canonical.hash() is digest
+
+    encoded = canonical.to_bytes()
+    decoded = CanonicalRequest.from_bytes(encoded)
+    assert decoded == canonical
+    assert decoded.hash() == digest
+
+    without_raw = CanonicalRequest.from_bytes(canonical.to_bytes(include_raw=False))
+    assert without_raw.body is not None
+    assert without_raw.body.raw == b""
+    assert without_raw.hash() == digest
+    with pytest.raises(ValueError):
+        CanonicalRequest.from_bytes(encoded[:-3])
@@ -0,0 +1,100 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from tribute_core import AsyncCoalescer
+
+
+def test_concurrent_async_calls_share_one_invocation():
+    coalescer = AsyncCoalescer()
+    calls = []
+
+    async def estimator(prompt):
+        calls.append(prompt)
+        await asyncio.sleep(0.05)
+        return {"estimated_price": len(prompt)}
+
+    async def scenario():
+        return await asyncio.gather(*(coalescer.run("same", estimator, "hello") for _ in range(5)))
+
+    results = asyncio.run(scenario())
+    assert results == [{"estimated_price": 5}] * 5
+    assert len(calls) == 1
+    assert (coalescer.started, coalescer.coalesced, len(coalescer)) == (1, 4, 0)
+
+
+def test_sync_estimator_runs_in_thread_pool():
+    coalescer = AsyncCoalescer()
+    threads = []
+
+    def estimator():
+        threads.append(threading.get_ident())
+        time.sleep(0.05)
+        return 42
+
+    async def scenario():
+        return await asyncio.gather(coalescer.run("k", estimator), coalescer.run("k", estimator))
+
+    assert asyncio.run(scenario()) == [42, 42]
+    assert threads and threads[0] != threading.get_ident()
+    assert len(threads) == 1
+
+
+def test_cancelled_waiter_does_not_cancel_shared_call():
+    coalescer = AsyncCoalescer()
+
+    async def estimator():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def scenario():
+        first = asyncio.ensure_future(coalescer.run("k", estimator))
+        second = asyncio.ensure_future(coalescer.run("k", estimator))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second, first.cancelled()
+
+    assert asyncio.run(scenario()) == ("done", True)
+
+
+def test_wait_is_bounded_and_errors_propagate():
+    coalescer = AsyncCoalescer(max_wait_seconds=0.01)
+
+    async def slow():
+        await asyncio.sleep(0.2)
+
+    async def broken():
+        raise RuntimeError("tokenizer unavailable")
+
+    async def scenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await coalescer.run("slow", slow)
+        with pytest.raises(RuntimeError):
+            await coalescer.run("broken", broken)
+
+    asyncio.run(scenario())
+
+
+def test_calls_on_different_loops_are_not_coalesced():
+    coalescer = AsyncCoalescer()
+    barrier = threading.Barrier(2)
+    results = []
+
+    async def estimator():
+        await asyncio.sleep(0.05)
+        return threading.get_ident()
+
+    async def scenario():
+        barrier.wait()
+        return await coalescer.run("k", estimator)
+
+    threads = [threading.Thread(target=lambda: results.append(asyncio.run(scenario()))) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(results) == sorted(thread.ident for thread in threads)
+    assert (coalescer.started, coalescer.coalesced, len(coalescer)) == (2, 0, 0)
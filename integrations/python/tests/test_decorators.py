@@ -1,4 +1,7 @@
-from tribute_core import cacheable, estimate_handler, metered, resolve_semantics
+import asyncio
+import inspect
+
+from tribute_core import cacheable, entitlement, estimate_handler, metered, resolve_semantics
 
 
 @cacheable(ttl=30)
@@ -32,3 +35,63 @@ def test_estimate_handler_absent_returns_none():
         return "noop"
 
     assert estimate_handler(undecorated) is None
+
+
+def test_stacked_decorators_return_original_function():
+    def plain():
+        return "ok"
+
+    decorated = cacheable(ttl=5)(entitlement(feature="pro")(metered(policy_ver=1)(plain)))
+
+    assert decorated is plain
+    semantics = resolve_semantics(plain)
+    assert semantics.entitlement == {"feature": "pro"}
+    assert semantics.cacheable == {"ttl": 5}
+
+
+def test_async_handlers_keep_their_kind():
+    @metered(policy_ver=1)
+    async def coroutine_handler():
+        return "ok"
+
+    @cacheable(ttl=1)
+    async def streaming_handler():
+        yield b"chunk"
+
+    assert inspect.iscoroutinefunction(coroutine_handler)
+    assert inspect.isasyncgenfunction(streaming_handler)
+    assert asyncio.run(coroutine_handler()) == "ok"
+
+
+def test_bound_methods_get_a_single_flat_wrapper():
+    class Service:
+        async def handle(self):
+            return "bound"
+
+    bound = Service().handle
+    wrapped = metered(policy_ver=2)(entitlement(feature="x")(bound))
+
+    assert wrapped is not bound
+    assert inspect.iscoroutinefunction(wrapped)
+    assert resolve_semantics(wrapped).metered == {"policy_ver": 2}
+    assert resolve_semantics(wrapped).entitlement == {"feature": "x"}
+    assert asyncio.run(wrapped()) == "bound"
+
+
+def test_bound_methods_of_decorated_functions_keep_class_semantics():
+    class Service:
+        @metered(price=1)
+        def handle(self):
+            return "ok"
+
+    wrapped = metered(price=2)(Service().handle)
+
+    @wrapped.estimate
+    def estimate_bound():
+        return {"estimated_price": "2"}
+
+    assert wrapped() == "ok"
+    assert resolve_semantics(wrapped).metered == {"price": 2}
+    assert estimate_handler(wrapped) is estimate_bound
+    assert resolve_semantics(Service.handle).metered == {"price": 1}
+    assert estimate_handler(Service.handle) is None
@@ -79,3 +79,120 @@ def test_run_without_command_shows_help(capsys):
     exit_code = run([])
     assert exit_code == 1
     assert "Tribute integration utilities" in capsys.readouterr().out
+
+
+def _usage_log(tmp_path: Path) -> Path:
+    records = [
+        {"method": "GET", "path": "/v1/demo", "final_price": 0.05, "response_bytes": 10, "request_hash": "a"},
+        {"method": "GET", "path": "/v1/demo", "final_price": 0.07, "response_bytes": 10, "request_hash": "b"},
+        {"method": "GET", "path": "/v1/missing", "final_price": 0.01, "request_hash": "c"},
+        {"method": "GET", "path": "/v1/demo", "final_price": None},
+        {"method": "GET", "path": "/v1/demo", "final_price": 0.05, "policy_version": 7},
+    ]
+    usage = tmp_path / "usage.jsonl"
+    usage.write_text("\n".join(json.dumps(record) for record in records) + "\nnot json\n")
+    return usage
+
+
+def _policy(tmp_path: Path) -> Path:
+    policy = tmp_path / "policy.json"
+    policy.write_text(
+        json.dumps(
+            {
+                "pricing": {
+                    "policyVersion": 1,
+                    "rules": [{"match": {"method": "GET", "path": "/v1/demo"}, "price": {"flat": 0.05}}],
+                }
+            }
+        )
+    )
+    return policy
+
+
+@pytest.mark.parametrize("use_numpy", [False, pytest.param(True, id="numpy")])
+def test_reconcile_usage_summarises_discrepancies(tmp_path: Path, use_numpy):
+    from tribute_core import PricingEngine
+    from tribute_core.devtools import reconcile_usage
+
+    if use_numpy:
+        pytest.importorskip("numpy")
+    engine = PricingEngine()
+    engine.load(_policy(tmp_path).read_bytes())
+    with _usage_log(tmp_path).open("rb") as lines:
+        summary = reconcile_usage(lines, engine, batch_size=2, top=1, use_numpy=use_numpy)
+
+    assert summary["rows"] == 3
+    assert summary["unmatched_rows"] == 1
+    assert summary["skipped"] == {"invalid": 1, "missing_price": 1, "other_version": 1}
+    assert summary["mismatches"] == 2
+    assert summary["rules"][0]["rows"] == 2
+    assert summary["delta_total"] == "-0.030000"
+    assert [entry["request_hash"] for entry in summary["worst"]] == ["b"]
+
+
+def test_run_reconcile_exit_code(tmp_path: Path, capsys):
+    exit_code = run(["reconcile", str(_usage_log(tmp_path)), str(_policy(tmp_path)), "--top", "5"])
+    summary = json.loads(capsys.readouterr().out)
+    assert exit_code == 1
+    assert [entry["request_hash"] for entry in summary["worst"]] == ["b", "c"]
+
+
+def test_reconcile_usage_counts_unparseable_amounts_as_invalid(tmp_path: Path):
+    from tribute_core import PricingEngine
+    from tribute_core.devtools import reconcile_usage
+
+    engine = PricingEngine()
+    engine.load(_policy(tmp_path).read_bytes())
+    lines = [
+        json.dumps({"method": "GET", "path": "/v1/demo", "final_price": 0.05}),
+        json.dumps({"method": "GET", "path": "/v1/demo", "final_price": 0.05, "request_bytes": "lots"}),
+        json.dumps({"method": "GET", "path": "/v1/demo", "final_price": 0.05, "response_bytes": [1]}),
+        json.dumps({"method": "GET", "path": "/v1/demo", "final_price": "five cents"}),
+        json.dumps({"method": "GET", "path": "/v1/demo", "final_price": {"amount": 1}}),
+    ]
+    summary = reconcile_usage(lines, engine, use_numpy=False)
+
+    assert summary["rows"] == 1
+    assert summary["skipped"] == {"invalid": 4, "missing_price": 0, "other_version": 0}
+    assert summary["mismatches"] == 0
+
+
+def test_reconcile_usage_numpy_and_python_paths_agree():
+    import random
+
+    from tribute_core import CompiledPricing
+    from tribute_core.devtools import reconcile_usage
+
+    pytest.importorskip("numpy")
+    compiled = CompiledPricing.from_policy(
+        {
+            "policyVersion": 1,
+            "rules": [
+                {"match": {"method": "GET", "path": "/flat"}, "price": {"flat": 0.05}},
+                {
+                    "match": {"method": "POST", "path": "/upload/{id}"},
+                    "price": {"flat": 0.001, "perMbReq": 0.000003, "perMbResp": 0.02, "min": 0.002},
+                },
+            ],
+        }
+    )
+    rng = random.Random(7)
+    lines = [
+        json.dumps(
+            {
+                "method": method,
+                "path": path,
+                "request_bytes": rng.randrange(0, 4 * 1024 * 1024),
+                "response_bytes": rng.choice([0, 524288, rng.randrange(0, 1 << 30)]),
+                "final_price": rng.choice(["0.05", "0.002", "0.001"]),
+                "request_hash": str(position),
+            }
+        )
+        for position, (method, path) in enumerate(
+            rng.choice([("GET", "/flat"), ("POST", "/upload/1"), ("GET", "/other")]) for _ in range(500)
+        )
+    ]
+
+    summaries = [reconcile_usage(lines, compiled, batch_size=64, top=5, use_numpy=flag) for flag in (False, True)]
+    assert summaries[0] == summaries[1]
+    assert summaries[0]["rows"] == 500
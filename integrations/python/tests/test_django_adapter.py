@@ -0,0 +1,247 @@
+import hashlib
+import io
+
+import pytest
+
+from tribute_core import EstimateCache, ResponseCache, cacheable, estimate, metered
+from tribute_django import DRFAdapter
+
+
+class Router:
+    trailing_slash = "/"
+
+    def __init__(self):
+        self.registry = []
+
+    def register(self, prefix, viewset, basename):
+        self.registry.append((prefix, viewset, basename))
+
+
+class Request:
+    """Just enough of Django's HttpRequest/DRF Request for the adapter."""
+
+    def __init__(self, method="GET", path="/items/", body=b"", headers=None, query=None):
+        self.method = method
+        self.path = path
+        self.headers = dict(headers or {})
+        self.query_params = dict(query or {})
+        self.META = {"CONTENT_LENGTH": str(len(body))} if body else {}
+        self._stream = io.BytesIO(body)
+
+    @property
+    def body(self):
+        if not hasattr(self, "_body"):
+            self._body = self._stream.read()
+        return self._body
+
+    def read(self, *args):
+        return self._stream.read(*args)
+
+
+class Response:
+    def __init__(self, data, status_code=200, cookies=None):
+        self.data = data
+        self.status_code = status_code
+        self.cookies = dict(cookies or {})
+        self.headers = {}
+        self.content = repr(data).encode()
+
+
+def test_estimate_cache_stores_payloads_not_responses():
+    calls = []
+
+    @metered(price=1)
+    def retrieve(self, request, pk=None):
+        return Response({"id": pk})
+
+    @retrieve.estimate
+    def retrieve_estimate(self, request, pk=None):
+        calls.append(pk)
+        if pk == "bad":
+            return Response({"error": "no price"}, status_code=500)
+        if pk == "cookie":
+            return Response(estimate(estimated_price="0.10").to_dict(), cookies={"sessionid": "x"})
+        return Response(estimate(estimated_price="0.10").to_dict())
+
+    viewset = type("ItemViewSet", (), {"retrieve": retrieve, "http_method_names": ["get"]})
+    cache = EstimateCache()
+    DRFAdapter(router=Router(), estimate_cache=cache).register_viewset("items", viewset, basename="item")
+
+    for pk in ("bad", "cookie", "bad", "cookie"):
+        viewset.retrieve_estimate(viewset(), Request(path=f"/items/{pk}/"), pk=pk)
+    assert calls == ["bad", "cookie", "bad", "cookie"]
+    assert len(cache) == 0
+
+    first = viewset.retrieve_estimate(viewset(), Request(path="/items/1/"), pk="1")
+    assert first.data["estimated_price"] == "0.100000"
+    assert len(cache) == 1
+
+
+def test_estimate_cache_hits_get_a_new_response_each_time():
+    pytest.importorskip("rest_framework")
+    from django.conf import settings
+
+    if not settings.configured:
+        settings.configure()
+
+    @metered(price=1)
+    def retrieve(self, request, pk=None):
+        return Response({"id": pk})
+
+    @retrieve.estimate
+    def retrieve_estimate(self, request, pk=None):
+        return Response(estimate(estimated_price="0.10").to_dict())
+
+    viewset = type("ItemViewSet", (), {"retrieve": retrieve, "http_method_names": ["get"]})
+    DRFAdapter(router=Router(), estimate_cache=EstimateCache()).register_viewset("items", viewset, basename="item")
+
+    viewset.retrieve_estimate(viewset(), Request(path="/items/1/"), pk="1")
+    second = viewset.retrieve_estimate(viewset(), Request(path="/items/1/"), pk="1")
+    third = viewset.retrieve_estimate(viewset(), Request(path="/items/1/"), pk="1")
+
+    assert second is not third
+    assert second.data == third.data == {"estimated_price": "0.100000", "observables": {}}
+    second.data["estimated_price"] = "tampered"
+    assert third.data["estimated_price"] == "0.100000"
+
+
+def _viewset(**actions):
+    return type("ItemViewSet", (), {"http_method_names": ["get", "post"], "lookup_field": "slug", **actions})
+
+
+def test_list_and_detail_actions_get_router_templates():
+    seen = {}
+
+    def list_items(self, request):
+        seen["list"] = request.tribute_canonical
+        return Response([])
+
+    def retrieve(self, request, slug=None):
+        seen["retrieve"] = request.tribute_canonical
+        return Response({"slug": slug})
+
+    router = Router()
+    viewset = _viewset(list=list_items, retrieve=retrieve)
+    DRFAdapter(router=router, header_allowlist=["accept"]).register_viewset("items", viewset, basename="item")
+
+    viewset.list(viewset(), Request(path="/items/", headers={"accept": "application/json"}, query={"b": "2"}))
+    viewset.retrieve(viewset(), Request(path="/items/abc/"), slug="abc")
+
+    assert router.registry == [("items", viewset, "item")]
+    assert seen["list"].path_template == "/items/"
+    assert seen["list"].headers == {"accept": ("application/json",)}
+    assert seen["list"].query == {"b": ("2",)}
+    assert seen["retrieve"].path_template == "/items/{slug}/"
+
+
+def test_async_actions_stay_coroutines():
+    import asyncio
+    import inspect
+
+    async def retrieve(self, request, slug=None):
+        await asyncio.sleep(0)
+        return Response({"template": request.tribute_canonical.path_template})
+
+    viewset = _viewset(retrieve=retrieve)
+    DRFAdapter(router=Router()).register_viewset("items", viewset, basename="item")
+
+    assert inspect.iscoroutinefunction(viewset.retrieve)
+    response = asyncio.run(viewset.retrieve(viewset(), Request(path="/items/x/"), slug="x"))
+    assert response.data == {"template": "/items/{slug}/"}
+
+
+def test_canonical_request_is_finalized_once_the_view_reads_the_body():
+    from tribute_core import canonicalize_request
+    from tribute_django.adapter import canonical_request
+
+    body = b'{"b": 1, "a": 2}'
+    seen = {}
+
+    def create(self, request):
+        seen["before"] = canonical_request(request)
+        seen["body"] = request.read(4) + request.read()
+        seen["after"] = canonical_request(request)
+        return Response({}, status_code=201)
+
+    viewset = _viewset(create=create)
+    DRFAdapter(router=Router(), header_allowlist=["content-type"]).register_viewset(
+        "items", viewset, basename="item"
+    )
+    request = Request(method="POST", path="/items/", body=body, headers={"content-type": "application/json"})
+    viewset.create(viewset(), request)
+
+    assert seen["before"] is None
+    assert seen["body"] == body
+    expected = canonicalize_request(
+        method="POST",
+        raw_path="/items/",
+        header_allowlist=["content-type"],
+        headers=[("content-type", "application/json")],
+        query=[],
+        body=body,
+    )
+    assert seen["after"].hash() == expected.hash()
+
+
+def test_canonical_request_drain_consumes_an_unread_body():
+    from tribute_django.adapter import canonical_request
+
+    def create(self, request):
+        return Response({}, status_code=201)
+
+    viewset = _viewset(create=create)
+    DRFAdapter(router=Router()).register_viewset("items", viewset, basename="item")
+    request = Request(method="POST", path="/items/", body=b"payload")
+    viewset.create(viewset(), request)
+
+    assert canonical_request(request) is None
+    canonical = canonical_request(request, drain=True)
+    assert canonical is not None
+    assert canonical.body.digest == hashlib.sha256(b"payload").hexdigest()
+
+
+def _cached_viewset(calls):
+    # One action routed for several methods, as with @action(methods=[...]).
+    @cacheable(ttl=60)
+    def retrieve(self, request, slug=None):
+        calls.append(request.method)
+        return Response({"slug": slug, "call": len(calls)})
+
+    return _viewset(retrieve=retrieve)
+
+
+def test_response_cache_bypasses_methods_other_than_get_and_head():
+    calls = []
+    cache = ResponseCache()
+    viewset = _cached_viewset(calls)
+    DRFAdapter(router=Router(), response_cache=cache).register_viewset("items", viewset, basename="item")
+
+    for method in ("DELETE", "POST", "DELETE"):
+        response = viewset.retrieve(viewset(), Request(method=method, path="/items/a/"), slug="a")
+        assert response.data == {"slug": "a", "call": len(calls)}
+    assert calls == ["DELETE", "POST", "DELETE"]
+    assert (cache.misses, len(cache)) == (0, 0)
+
+    viewset.retrieve(viewset(), Request(path="/items/a/"), slug="a")
+    assert (cache.misses, len(cache)) == (1, 1)
+
+
+def test_response_cache_serves_repeated_gets():
+    pytest.importorskip("django")
+    from django.conf import settings
+
+    if not settings.configured:
+        settings.configure()
+
+    calls = []
+    cache = ResponseCache()
+    viewset = _cached_viewset(calls)
+    DRFAdapter(router=Router(), response_cache=cache).register_viewset("items", viewset, basename="item")
+
+    first = viewset.retrieve(viewset(), Request(path="/items/a/"), slug="a")
+    second = viewset.retrieve(viewset(), Request(path="/items/a/"), slug="a")
+    viewset.retrieve(viewset(), Request(method="DELETE", path="/items/a/"), slug="a")
+
+    assert calls == ["GET", "DELETE"]
+    assert second.content == first.content
+    assert (cache.hits, cache.misses) == (1, 1)
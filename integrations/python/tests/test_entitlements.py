@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from tribute_core import (
+    Canonicalizer,
+    EntitlementEngine,
+    ProxyContextVerifier,
+    SubscriptionRequired,
+    decode_proxy_context,
+    entitlement,
+)
+from tribute_fastapi import TributeASGIMiddleware
+
+from test_proxy_context import _envelope
+
+
+def _context(sub="user-1@mer-1"):
+    return decode_proxy_context(_envelope(sub=sub))
+
+
+def test_requirements_compile_to_masks_and_grants_are_cached():
+    lookups = []
+    grants = {"user-1@mer-1": ["pro", "export"], "user-2@mer-1": ["pro"]}
+
+    def resolver(subject):
+        lookups.append(subject)
+        return grants.get(subject, ())
+
+    now = [0.0]
+    engine = EntitlementEngine(resolver, ttl_seconds=30, clock=lambda: now[0])
+    requirement = engine.compile({"features": ["pro", "export"], "upgrade_url": "https://billing.example.com"})
+    assert requirement.mask == engine.mask(["pro", "export"])
+    assert engine.compile(None) is None
+
+    engine.require(requirement, _context())
+    engine.require(requirement, _context())
+    assert lookups == ["user-1@mer-1"]
+
+    with pytest.raises(SubscriptionRequired) as excinfo:
+        engine.require(requirement, _context("user-2@mer-1"))
+    assert excinfo.value.body() == {
+        "error": "subscription_required",
+        "needed": "subscription:export",
+        "upgrade_url": "https://billing.example.com",
+        "reason": "not_entitled",
+    }
+    assert excinfo.value.headers() == {
+        "X-Required-Entitlement": "export",
+        "X-Upgrade-Url": "https://billing.example.com",
+    }
+
+    grants["user-2@mer-1"].append("export")
+    now[0] = 31
+    engine.require(requirement, _context("user-2@mer-1"))
+
+    with pytest.raises(SubscriptionRequired) as excinfo:
+        engine.require(engine.compile({"feature": "pro"}), None)
+    assert excinfo.value.reason == "missing_proxy_context"
+
+
+def test_asgi_middleware_answers_402_for_unentitled_subjects():
+    calls = []
+
+    @entitlement(feature="pro")
+    async def handler():
+        pass
+
+    async def app(scope, receive, send):
+        calls.append(scope["path"])
+
+    engine = EntitlementEngine(lambda subject: ["pro"] if subject == "user-1@mer-1" else ())
+    middleware = TributeASGIMiddleware(
+        app,
+        canonicalizers=[Canonicalizer(header_allowlist=[], path_template="/v1/pro")],
+        proxy_context=ProxyContextVerifier(clock=lambda: 1100.0),
+        entitlements=engine,
+        entitlement_rules={("GET", "/v1/pro"): engine.compile(handler.__tribute_semantics__.entitlement)},
+    )
+
+    def get(sub):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": "/v1/pro",
+            "query_string": b"",
+            "headers": [(b"host", b"api.example.com"), (b"x-proxy-context", _envelope(sub=sub).encode())],
+        }
+        asyncio.run(middleware(scope, None, send))
+        return sent
+
+    assert get("user-1@mer-1") == []
+    rejected = get("user-2@mer-1")
+    assert rejected[0]["status"] == 402
+    assert (b"x-required-entitlement", b"pro") in rejected[0]["headers"]
+    assert b'"subscription_required"' in rejected[1]["body"]
+    assert calls == ["/v1/pro"]
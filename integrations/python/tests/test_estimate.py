@@ -1,6 +1,10 @@
+import base64
+import json
 from decimal import Decimal
 
-from tribute_core import HMACSigner, JWKSManager, estimate, verify_signature
+import pytest
+
+from tribute_core import HMACSigner, JWKSManager, VerifiedTokenCache, estimate, verify_many, verify_signature
 
 
 def test_estimate_signing_roundtrip():
@@ -26,6 +30,16 @@ def test_estimate_signing_roundtrip():
     assert verify_signature(token=token, key_resolver=resolver)
 
 
+@pytest.mark.parametrize(
+    "price, signed", [(Decimal("0.050"), "0.05"), ("10", "10"), (0, "0"), (Decimal("0.1234567"), "0.123457")]
+)
+def test_signed_payload_uses_the_shortest_decimal_price(price, signed):
+    token = HMACSigner(key_id="primary", secret=b"topsecret").sign_estimate(price, {"tokens": 42})
+    encoded = token.split(".")[1]
+    payload = json.loads(base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4)))
+    assert payload == {"price": signed, "observables": {"tokens": 42}}
+
+
 def test_jwks_manager_resolve_and_jwks_listing():
     manager = JWKSManager()
     signer = HMACSigner(key_id="secondary", secret=b"secret")
@@ -47,3 +61,63 @@ def test_verify_signature_returns_false_for_unknown_key():
         return None
 
     assert verify_signature(token=token, key_resolver=resolver) is False
+
+
+def test_verified_token_cache_skips_reverification_until_rotation():
+    secrets = {"k1": b"secret"}
+    calls = []
+
+    def resolver(kid: str):
+        calls.append(kid)
+        return secrets.get(kid)
+
+    signer = HMACSigner(key_id="k1", secret=b"secret")
+    token = signer.sign_estimate(price=Decimal("1.0"), observables={})
+    cache = VerifiedTokenCache(max_entries=2)
+
+    assert verify_signature(token=token, key_resolver=resolver, cache=cache)
+    assert len(cache) == 1
+    assert cache.lookup(token, resolver) is True
+
+    secrets["k1"] = b"rotated"
+    assert verify_signature(token=token, key_resolver=resolver, cache=cache) is False
+    assert len(cache) == 0
+
+
+def test_verified_token_cache_expires_and_evicts():
+    now = [0.0]
+    cache = VerifiedTokenCache(max_entries=1, ttl_seconds=10, clock=lambda: now[0])
+    cache.store("a", "k1", b"secret")
+    cache.store("b", "k1", b"secret")
+    resolver = {"k1": b"secret"}.get
+
+    assert cache.lookup("a", resolver) is False
+    assert cache.lookup("b", resolver) is True
+    now[0] = 11
+    assert cache.lookup("b", resolver) is False
+
+
+def test_verify_many_resolves_each_kid_once():
+    first = HMACSigner(key_id="k1", secret=b"one")
+    second = HMACSigner(key_id="k2", secret=b"two")
+    tokens = [
+        first.sign_estimate(price=Decimal("1"), observables={"n": n}) for n in range(3)
+    ] + [second.sign_estimate(price=Decimal("2"), observables={}), "garbage", first.sign_estimate(price=Decimal("3"), observables={})[:-2] + "xx"]
+    calls = []
+
+    def resolver(kid: str):
+        calls.append(kid)
+        return {"k1": b"one", "k2": b"two"}.get(kid)
+
+    assert verify_many(tokens, key_resolver=resolver) == [True, True, True, True, False, False]
+    assert sorted(calls) == ["k1", "k2"]
+
+
+def test_sign_many_matches_individual_signatures():
+    signer = HMACSigner(key_id="batch", secret=b"secret")
+    estimates = [(Decimal("0.5"), {"tokens": 1}), (Decimal("1.25"), {})]
+
+    tokens = signer.sign_many(estimates)
+
+    assert tokens == [signer.sign_estimate(price, observables) for price, observables in estimates]
+    assert verify_many(tokens, key_resolver={"batch": b"secret"}.get) == [True, True]
@@ -0,0 +1,170 @@
+import asyncio
+
+import pytest
+
+fastapi = pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+from fastapi.testclient import TestClient
+from starlette.background import BackgroundTask
+
+from tribute_core import (
+    AsyncCoalescer,
+    EntitlementEngine,
+    EstimateCache,
+    ProxyContextVerifier,
+    ReplayGuard,
+    entitlement,
+    metered,
+)
+from tribute_fastapi import FastAPIAdapter
+
+from test_proxy_context import _envelope
+
+
+def _client(*, middleware, **options):
+    app = fastapi.FastAPI()
+    adapter = FastAPIAdapter(app=app, proxy_context=ProxyContextVerifier(clock=lambda: 1100.0), **options)
+    calls = []
+
+    def item(item_id: str, request: fastapi.Request):
+        calls.append(item_id)
+        context = request.state.tribute_proxy_context
+        return {"id": item_id, "sub": context.sub if context else None}
+
+    adapter.register("/items/{item_id}", handler=item, methods=["GET"])
+    if middleware:
+        adapter.install_middleware()
+    return TestClient(app, base_url="http://api.example.com"), calls
+
+
+@pytest.mark.parametrize("middleware", [False, True], ids=["routes", "middleware"])
+def test_replay_guard_applies_with_or_without_the_middleware(middleware):
+    client, calls = _client(middleware=middleware, replay_guard=ReplayGuard(capacity=1000, clock=lambda: 1100.0))
+    headers = {"x-proxy-context": _envelope()}
+
+    first = client.get("/items/1", headers=headers)
+    assert first.status_code == 200
+    assert first.json() == {"id": "1", "sub": "user-1@mer-1"}
+
+    replay = client.get("/items/1", headers=headers)
+    assert replay.status_code == 409
+    assert replay.json()["error"] == "replay"
+    assert calls == ["1"]
+
+
+def test_routes_without_a_request_parameter_are_guarded_too():
+    app = fastapi.FastAPI()
+    adapter = FastAPIAdapter(
+        app=app,
+        proxy_context=ProxyContextVerifier(clock=lambda: 1100.0),
+        replay_guard=ReplayGuard(capacity=1000, clock=lambda: 1100.0),
+    )
+
+    async def item(item_id: int):
+        return {"id": item_id}
+
+    adapter.register("/items/{item_id}", handler=item, methods=["GET"])
+    client = TestClient(app, base_url="http://api.example.com")
+    headers = {"x-proxy-context": _envelope()}
+
+    assert client.get("/items/1", headers=headers).json() == {"id": 1}
+    assert client.get("/items/1", headers=headers).status_code == 409
+    assert client.get("/items/2").json() == {"id": 2}
+
+
+@pytest.mark.parametrize(
+    "route, path",
+    [("/v1/pro", "/v1/pro"), ("/files/{p:path}", "/files/a"), ("/files/{p:path}", "/files/a/b")],
+    ids=["plain", "path-converter", "multi-segment"],
+)
+@pytest.mark.parametrize("middleware", [False, True], ids=["routes", "middleware"])
+def test_entitlements_apply_with_or_without_the_middleware(middleware, route, path):
+    app = fastapi.FastAPI()
+    adapter = FastAPIAdapter(
+        app=app,
+        proxy_context=ProxyContextVerifier(clock=lambda: 1100.0),
+        entitlements=EntitlementEngine(lambda subject: ["pro"] if subject == "user-1@mer-1" else ()),
+    )
+    calls = []
+
+    @entitlement(feature="pro")
+    def report():
+        calls.append(1)
+        return {"ok": True}
+
+    @entitlement(feature="pro")
+    def download(p: str):
+        calls.append(1)
+        return {"ok": True}
+
+    adapter.register(route, handler=download if "{p:path}" in route else report, methods=["GET"])
+    if middleware:
+        adapter.install_middleware()
+    client = TestClient(app, base_url="http://api.example.com")
+
+    assert client.get(path, headers={"x-proxy-context": _envelope(sub="user-1@mer-1")}).json() == {"ok": True}
+    rejected = client.get(path, headers={"x-proxy-context": _envelope(sub="user-2@mer-1")})
+    assert rejected.status_code == 402
+    assert rejected.headers["x-required-entitlement"] == "pro"
+    assert rejected.json()["error"] == "subscription_required"
+    assert client.get(path).status_code == 402
+    assert calls == [1]
+
+
+def test_estimate_cache_stores_payloads_and_builds_fresh_responses():
+    app = fastapi.FastAPI()
+    adapter = FastAPIAdapter(app=app, estimate_cache=EstimateCache())
+    calls = []
+
+    @metered(price=1)
+    def item(item_id: str):
+        return {"id": item_id}
+
+    @item.estimate
+    def item_estimate(item_id: str):
+        calls.append(item_id)
+        return fastapi.responses.JSONResponse(
+            {"estimated_price": "0.10"}, background=BackgroundTask(calls.append, "background")
+        )
+
+    adapter.register("/items/{item_id}", handler=item, methods=["POST"])
+    client = TestClient(app)
+
+    first = client.post("/items/1/estimate")
+    second = client.post("/items/1/estimate")
+
+    assert first.json() == second.json() == {"estimated_price": "0.10"}
+    assert calls == ["1", "background"]
+
+
+def test_coalesced_estimates_get_their_own_responses():
+    httpx = pytest.importorskip("httpx")
+    app = fastapi.FastAPI()
+    coalescer = AsyncCoalescer()
+    adapter = FastAPIAdapter(app=app, estimate_coalescer=coalescer)
+    calls = []
+
+    @metered(price=1)
+    def item(item_id: str):
+        return {"id": item_id}
+
+    @item.estimate
+    async def item_estimate(item_id: str):
+        calls.append(item_id)
+        await asyncio.sleep(0.05)
+        return fastapi.responses.JSONResponse(
+            {"estimated_price": "0.10"}, background=BackgroundTask(calls.append, "background")
+        )
+
+    adapter.register("/items/{item_id}", handler=item, methods=["POST"])
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(client.post("/items/1/estimate") for _ in range(3)))
+
+    responses = asyncio.run(scenario())
+    assert [response.json() for response in responses] == [{"estimated_price": "0.10"}] * 3
+    assert calls == ["1", "background"]
+    assert (coalescer.started, coalescer.coalesced) == (1, 2)
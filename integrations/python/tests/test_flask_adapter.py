@@ -0,0 +1,116 @@
+import pytest
+
+flask = pytest.importorskip("flask")
+
+from tribute_core import EstimateCache, ResponseCache, cacheable, estimate, metered
+from tribute_flask import FlaskAdapter
+
+
+def _app(**options):
+    app = flask.Flask(__name__)
+    app.secret_key = "test"
+    return app, FlaskAdapter(app, **options)
+
+
+def test_estimate_cache_stores_payloads_and_builds_fresh_responses():
+    app, adapter = _app(estimate_cache=EstimateCache())
+    calls = []
+
+    @metered(price=1)
+    def item(item_id):
+        return {"id": item_id}
+
+    @item.estimate
+    def item_estimate(item_id):
+        calls.append(item_id)
+        flask.session["seen"] = item_id
+        return estimate(estimated_price="0.10").to_dict()
+
+    adapter.register("/items/<item_id>", handler=item, methods=["POST"])
+    client = app.test_client()
+
+    first = client.post("/items/1/estimate")
+    second = client.post("/items/1/estimate")
+
+    assert calls == ["1"]
+    assert first.json == second.json == {"estimated_price": "0.100000", "observables": {}}
+    assert "Set-Cookie" in first.headers
+    assert "Set-Cookie" not in second.headers
+
+
+def test_estimate_cache_skips_errors_and_cookies():
+    app, adapter = _app(estimate_cache=EstimateCache())
+    calls = []
+
+    @metered(price=1)
+    def item(item_id):
+        return {"id": item_id}
+
+    @item.estimate
+    def item_estimate(item_id):
+        calls.append(item_id)
+        if item_id == "bad":
+            return flask.jsonify(error="no price"), 500
+        response = flask.jsonify(estimated_price="0.10")
+        response.set_cookie("tracking", item_id)
+        return response
+
+    adapter.register("/items/<item_id>", handler=item, methods=["POST"])
+    client = app.test_client()
+
+    for _ in range(2):
+        assert client.post("/items/bad/estimate").status_code == 500
+        assert "tracking=1" in client.post("/items/1/estimate").headers["Set-Cookie"]
+
+    assert calls == ["bad", "1", "bad", "1"]
+
+
+def test_response_cache_serves_only_get_and_head():
+    cache = ResponseCache()
+    app, adapter = _app(response_cache=cache)
+    calls = []
+
+    @cacheable(ttl=60)
+    def item(item_id):
+        calls.append(flask.request.method)
+        return {"id": item_id, "call": len(calls)}
+
+    adapter.register("/items/<item_id>", handler=item, methods=["GET", "DELETE", "POST"])
+    client = app.test_client()
+
+    assert client.get("/items/1").json == {"id": "1", "call": 1}
+    assert client.get("/items/1").json == {"id": "1", "call": 1}
+    assert client.delete("/items/1").json == {"id": "1", "call": 2}
+    assert client.delete("/items/1").json == {"id": "1", "call": 3}
+    assert client.post("/items/1").json == {"id": "1", "call": 4}
+    assert calls == ["GET", "DELETE", "DELETE", "POST"]
+    assert (cache.hits, cache.misses, len(cache)) == (1, 1, 1)
+
+
+def test_streamed_response_usage_span_joins_the_request_trace():
+    from tribute_core import Tracer, set_tracer, wrap_iterable
+
+    class ListSink:
+        def __init__(self):
+            self.traces = []
+
+        def emit(self, records):
+            self.traces.append(records)
+
+    sink = ListSink()
+    previous = set_tracer(Tracer(sink, sample_rate=1.0))
+    try:
+        app, adapter = _app()
+
+        def item(item_id):
+            return flask.Response(wrap_iterable([b"a", b"bc"]))
+
+        adapter.register("/items/<item_id>", handler=item)
+        assert app.test_client().get("/items/1").data == b"abc"
+    finally:
+        set_tracer(previous)
+
+    request, late = sink.traces
+    assert late[0]["name"] == "usage"
+    assert late[0]["trace_id"] == request[0]["trace_id"]
+    assert late[0]["route"] == "/items/{item_id}"
@@ -0,0 +1,87 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from tribute_core import HMACSigner, RemoteJWKSResolver, verify_signature
+
+
+@pytest.fixture
+def jwks_server():
+    state = {"keys": [{"kid": "primary", "k": "secret"}], "hits": 0, "delay": 0.0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            state["hits"] += 1
+            time.sleep(state["delay"])
+            body = json.dumps({"keys": state["keys"]}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Cache-Control", "public, max-age=60")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/jwks.json", state
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_remote_resolver_verifies_against_http_jwks(jwks_server):
+    url, state = jwks_server
+    resolver = RemoteJWKSResolver(url)
+    token = HMACSigner(key_id="primary", secret=b"secret").sign_estimate(price=1, observables={})
+
+    assert verify_signature(token=token, key_resolver=resolver)
+    assert verify_signature(token=token, key_resolver=resolver)
+    assert state["hits"] == 1
+
+
+def test_concurrent_unknown_kid_misses_share_one_fetch(jwks_server):
+    url, state = jwks_server
+    resolver = RemoteJWKSResolver(url, miss_interval=0)
+    resolver.refresh()
+    state["keys"].append({"kid": "rotated", "k": "next"})
+    state["delay"] = 0.2
+    results = []
+
+    def lookup():
+        results.append(resolver.resolve("rotated"))
+
+    threads = [threading.Thread(target=lookup) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [b"next"] * 8
+    assert state["hits"] == 2
+
+
+def test_warm_lookup_refreshes_in_background(tmp_path):
+    jwks = tmp_path / "jwks.json"
+    jwks.write_text(json.dumps({"keys": [{"kid": "a", "k": "one"}]}))
+    now = [0.0]
+    resolver = RemoteJWKSResolver(jwks, refresh_interval=100, refresh_margin=10, clock=lambda: now[0])
+    assert resolver.resolve("a") == b"one"
+
+    jwks.write_text(json.dumps({"keys": [{"kid": "a", "k": "two"}]}))
+    now[0] = 95.0
+    # The stale value is served immediately while the refresh runs off-path.
+    assert resolver.resolve("a") == b"one"
+    deadline = time.time() + 2
+    while resolver.fetch_count < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    assert resolver.resolve("a") == b"two"
+    assert resolver.resolve("missing") is None
+    assert resolver.fetch_count == 2
@@ -0,0 +1,94 @@
+import asyncio
+import json
+
+import pytest
+
+from extras.llm_openai import StreamUsageExtractor, track_async_stream_usage, track_stream_usage
+from tribute_core import UsageTracker
+
+
+def _frame(payload) -> bytes:
+    return b"data: " + json.dumps(payload).encode() + b"\n\n"
+
+
+def _delta(text: str) -> bytes:
+    return _frame({"choices": [{"index": 0, "delta": {"content": text}}]})
+
+
+SSE_WITH_USAGE = (
+    _frame({"choices": [{"index": 0, "delta": {"role": "assistant", "content": ""}}]})
+    + _delta("Hel")
+    + _delta("lo")
+    + _frame({"choices": [], "usage": {"prompt_tokens": 9, "completion_tokens": 2, "total_tokens": 11}})
+    + b"data: [DONE]\n\n"
+)
+
+
+def test_extractor_reads_final_usage_block_across_split_chunks():
+    tracker = UsageTracker()
+    extractor = StreamUsageExtractor(tracker)
+    for index in range(0, len(SSE_WITH_USAGE), 7):
+        extractor.feed(memoryview(SSE_WITH_USAGE)[index : index + 7])
+
+    assert extractor.close() == {"prompt_tokens": 9, "completion_tokens": 2}
+    assert tracker.build().usage == {"prompt_tokens": 9, "completion_tokens": 2}
+
+
+def test_extractor_counts_deltas_without_usage_block():
+    body = (_delta("a") + _delta("b") + _delta("c")).replace(b"\n", b"\r\n") + b": keep-alive\r\n\r\n"
+    extractor = StreamUsageExtractor()
+    extractor.feed(body)
+    assert extractor.close() == {"prompt_tokens": 0, "completion_tokens": 3}
+
+
+def test_extractor_skips_malformed_choices():
+    extractor = StreamUsageExtractor()
+    extractor.feed(_frame({"choices": ["x", None, {"delta": "y"}, {"delta": {"content": "z"}}]}))
+    extractor.feed(_frame({"choices": {"delta": {"content": "w"}}}))
+    assert extractor.close() == {"prompt_tokens": 0, "completion_tokens": 1}
+
+
+def test_track_stream_usage_passes_chunks_through():
+    chunks = [SSE_WITH_USAGE[:40], SSE_WITH_USAGE[40:]]
+    stream = track_stream_usage(chunks)
+
+    assert list(stream) == chunks
+    assert stream.report.usage["completion_tokens"] == 2
+    assert stream.report.response_bytes == len(SSE_WITH_USAGE)
+
+
+def test_track_async_stream_usage():
+    async def body():
+        yield _delta("x")
+        yield _delta("y")
+
+    async def consume():
+        stream = track_async_stream_usage(body())
+        return [chunk async for chunk in stream], stream.report
+
+    chunks, report = asyncio.run(consume())
+    assert len(chunks) == 2
+    assert report.usage == {"prompt_tokens": 0, "completion_tokens": 2}
+
+
+def test_usage_is_reported_when_the_body_fails():
+    def body():
+        yield _delta("x")
+        raise RuntimeError("upstream reset")
+
+    async def async_body():
+        for chunk in body():
+            yield chunk
+
+    async def consume(stream):
+        return [chunk async for chunk in stream]
+
+    tracker = UsageTracker()
+    with pytest.raises(RuntimeError):
+        list(track_stream_usage(body(), tracker=tracker))
+    assert tracker.build().usage == {"prompt_tokens": 0, "completion_tokens": 1}
+
+    tracker = UsageTracker()
+    with pytest.raises(RuntimeError):
+        asyncio.run(consume(track_async_stream_usage(async_body(), tracker=tracker)))
+    assert tracker.build().usage == {"prompt_tokens": 0, "completion_tokens": 1}
@@ -0,0 +1,62 @@
+import hashlib
+import json
+
+import pytest
+
+from extras.llm_prompt_cost import ModelPrice, PromptCostEstimator, calibrate, count_prompt_tokens, count_text_tokens
+from tribute_core import CanonicalBody, HMACSigner, Price, verify_signature
+
+BODY = {
+    "model": "gpt-4o-mini-2024-07-18",
+    "messages": [
+        {"role": "system", "content": "You are terse."},
+        {"role": "user", "content": [{"type": "text", "text": "Hello, world!"}, {"type": "image_url"}]},
+    ],
+    "max_tokens": 100,
+}
+
+
+def _canonical(payload) -> CanonicalBody:
+    raw = json.dumps(payload, separators=(",", ":"), sort_keys=True).encode()
+    return CanonicalBody(raw=raw, digest=hashlib.sha256(raw).hexdigest(), content_type="application/json")
+
+
+def test_count_text_tokens_matches_common_bpe_splits():
+    assert count_text_tokens("Hello, world!") == 4
+    assert count_text_tokens("12345") == 2
+    assert count_text_tokens("") == 0
+
+
+def test_estimator_prices_upper_bound_and_signs():
+    prices = {"gpt-4o-mini": ModelPrice(Price.parse(1), Price.parse(2))}
+    estimator = PromptCostEstimator(prices=prices, error_bound=0.5)
+    signer = HMACSigner(key_id="k", secret=b"s")
+
+    result = estimator.estimate(_canonical(BODY), signer=signer)
+    prompt_tokens = count_prompt_tokens(BODY)
+    assert result.observables["prompt_tokens"] == prompt_tokens
+    bounded_prompt = -(-prompt_tokens * 3 // 2)
+    # 1 and 2 USD per million tokens are 1 and 2 micro-units per token.
+    assert result.estimated_price == Price(bounded_prompt + 100 * 2)
+    assert verify_signature(token=result.price_signature, key_resolver={"k": b"s"}.get)
+
+
+def test_estimator_memoizes_by_digest_without_payload():
+    estimator = PromptCostEstimator()
+    body = _canonical(BODY)
+    first = estimator.analyze(body)
+    streamed = CanonicalBody(raw=b"", digest=body.digest, content_type="application/json")
+    assert estimator.analyze(streamed) == first
+    assert estimator.memo.hits == 1
+
+
+def test_unknown_model_is_rejected():
+    estimator = PromptCostEstimator()
+    with pytest.raises(ValueError):
+        estimator.estimate(_canonical({"model": "mystery", "messages": []}))
+
+
+def test_calibrate_reports_worst_undercount():
+    payload = {"messages": [{"role": "user", "content": "hi"}]}
+    estimated = count_prompt_tokens(payload)
+    assert calibrate([(payload, estimated * 2), (payload, estimated - 1)]) == pytest.approx(1.0)
@@ -0,0 +1,181 @@
+import asyncio
+import threading
+
+import pytest
+
+from tribute_core import (
+    Canonicalizer,
+    HMACSigner,
+    LatencyRecorder,
+    enrich_response,
+    estimate,
+    instrument,
+    route_scope,
+    set_recorder,
+    timed,
+    verify_signature,
+    wrap_iterable,
+)
+from tribute_fastapi import TributeASGIMiddleware
+
+
+@pytest.fixture
+def recorder():
+    recorder = LatencyRecorder()
+    previous = set_recorder(recorder)
+    try:
+        yield recorder
+    finally:
+        set_recorder(previous)
+
+
+def test_prometheus_rendering_is_cumulative():
+    recorder = LatencyRecorder(buckets=(0.01, 0.1))
+    recorder.observe("handler", 0.005, route="/items/{id}")
+    recorder.observe("handler", 0.05, route="/items/{id}")
+    recorder.observe("handler", 5.0, route="/items/{id}")
+    recorder.observe("sign", 0.001, route='/a"b')
+
+    lines = recorder.render_prometheus().splitlines()
+
+    assert lines[1] == "# TYPE tribute_stage_duration_seconds histogram"
+    labels = 'stage="handler",route="/items/{id}"'
+    assert f'tribute_stage_duration_seconds_bucket{{{labels},le="0.01"}} 1' in lines
+    assert f'tribute_stage_duration_seconds_bucket{{{labels},le="0.1"}} 2' in lines
+    assert f'tribute_stage_duration_seconds_bucket{{{labels},le="+Inf"}} 3' in lines
+    assert f"tribute_stage_duration_seconds_sum{{{labels}}} 5.055" in lines
+    assert f"tribute_stage_duration_seconds_count{{{labels}}} 3" in lines
+    assert 'tribute_stage_duration_seconds_count{stage="sign",route="/a\\"b"} 1' in lines
+
+    recorder.reset()
+    assert recorder.snapshot() == {}
+
+
+def test_timing_is_off_without_a_recorder():
+    set_recorder(None)
+    with timed("handler") as timer:
+        pass
+    assert type(timer).__name__ == "_NoopTimer"
+
+    calls = []
+    wrapped = instrument(lambda value: calls.append(value) or value, "handler")
+    assert wrapped(3) == 3
+    assert calls == [3]
+
+
+def test_route_scope_labels_nested_observations(recorder):
+    with route_scope("/items/{id}"):
+        with timed("canonicalize"):
+            pass
+    with timed("canonicalize"):
+        pass
+
+    assert set(recorder.snapshot()) == {("canonicalize", "/items/{id}"), ("canonicalize", "")}
+
+
+def test_instrument_times_sync_and_async_callables(recorder):
+    def handler(value):
+        return value * 2
+
+    async def async_handler(value):
+        await asyncio.sleep(0)
+        return value + 1
+
+    assert instrument(handler, "handler", route="/double")(4) == 8
+    assert asyncio.run(instrument(async_handler, "handler", route="/inc")(4)) == 5
+
+    snapshot = recorder.snapshot()
+    assert sum(snapshot[("handler", "/double")][0]) == 1
+    assert sum(snapshot[("handler", "/inc")][0]) == 1
+
+
+def test_core_stages_are_recorded(recorder):
+    signer = HMACSigner(key_id="primary", secret=b"topsecret")
+    canonicalizer = Canonicalizer(header_allowlist=[], path_template="/items/{item_id}")
+
+    with route_scope("/items/{item_id}"):
+        canonicalizer.canonicalize(
+            method="GET", raw_path="/items/1", headers=[], query=[], body=b"", path_params={"item_id": "1"}
+        )
+        token = estimate(estimated_price="0.10", signer=signer).price_signature
+        assert verify_signature(token=token, key_resolver=lambda kid: signer.secret)
+        enrich_response(body=b"payload")
+        stream = wrap_iterable([b"ab", b"cd"])
+        assert b"".join(stream) == b"abcd"
+
+    snapshot = recorder.snapshot()
+    for stage in ("canonicalize", "sign", "verify"):
+        assert sum(snapshot[(stage, "/items/{item_id}")][0]) == 1
+    assert sum(snapshot[("usage", "/items/{item_id}")][0]) == 2
+
+
+def test_shards_from_other_threads_are_merged(recorder):
+    def work():
+        for _ in range(100):
+            recorder.observe("handler", 0.001, route="/x")
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    counts, total = recorder.snapshot()[("handler", "/x")]
+    assert sum(counts) == 400
+    assert total == pytest.approx(0.4)
+
+
+def test_shards_of_exited_threads_are_retired(recorder):
+    import gc
+
+    def work():
+        recorder.observe("handler", 0.001, route="/x")
+
+    for _ in range(20):
+        thread = threading.Thread(target=work)
+        thread.start()
+        thread.join()
+    gc.collect()
+
+    assert len(recorder._shards) <= 1
+    counts, total = recorder.snapshot()[("handler", "/x")]
+    assert sum(counts) == 20
+    assert total == pytest.approx(0.02)
+
+    recorder.reset()
+    assert recorder.snapshot() == {}
+
+
+def test_sample_rate_zero_skips_timings():
+    recorder = LatencyRecorder(sample_rate=0.0)
+    previous = set_recorder(recorder)
+    try:
+        with timed("handler"):
+            pass
+    finally:
+        set_recorder(previous)
+    assert recorder.snapshot() == {}
+
+
+def test_asgi_middleware_records_requests_by_template(recorder):
+    async def app(scope, receive, send):
+        await receive()
+
+    middleware = TributeASGIMiddleware(
+        app,
+        header_allowlist=[],
+        canonicalizers=[Canonicalizer(header_allowlist=[], path_template="/items/{item_id}")],
+    )
+    scope = {"type": "http", "method": "GET", "path": "/items/7", "query_string": b"", "headers": []}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    asyncio.run(middleware(scope, receive, send))
+
+    snapshot = recorder.snapshot()
+    assert sum(snapshot[("request", "/items/{item_id}")][0]) == 1
+    assert sum(snapshot[("canonicalize", "/items/{item_id}")][0]) == 1
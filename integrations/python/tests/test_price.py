@@ -0,0 +1,37 @@
+from decimal import Decimal
+
+import pytest
+
+from tribute_core import Price
+
+
+@pytest.mark.parametrize(
+    "value, micros",
+    [
+        ("0.05", 50_000),
+        (Decimal("0.1234567"), 123_457),
+        (0.1, 100_000),
+        (2, 2_000_000),
+        ("-1.5", -1_500_000),
+        (Price(7), 7),
+    ],
+)
+def test_parse_rounds_half_up_to_micro_units(value, micros):
+    assert Price.parse(value).micros == micros
+
+
+def test_arithmetic_is_integer_and_exact():
+    prices = [Price.parse(0.1)] * 10
+    assert sum(prices) == Price.parse(1)
+    assert Price.sum(prices) == Price(1_000_000)
+    assert Price.parse("0.3") - Price.parse("0.1") == Price.parse("0.2")
+    assert Price.parse("0.25") * 4 == Price.parse(1)
+    assert Price.parse("0.2") > Price.parse("0.1")
+
+
+def test_wire_format_and_conversions():
+    assert str(Price.parse("0.05")) == "0.050000"
+    assert str(Price(-1)) == "-0.000001"
+    assert Price.parse("1.25").to_decimal() == Decimal("1.25")
+    assert float(Price.parse("1.25")) == 1.25
+    assert not Price(0)
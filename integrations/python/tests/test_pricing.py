@@ -0,0 +1,154 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from tribute_core import (
+    CanonicalBodyBuilder,
+    CanonicalRequest,
+    CompiledPricing,
+    Price,
+    PriceExpression,
+    PricingEngine,
+    canonicalize_request,
+)
+
+SPEC = Path(__file__).resolve().parents[3] / "specs" / "merchant-example.json"
+
+
+def _pricing(version, rules):
+    return {"policyVersion": version, "rules": rules}
+
+
+def _rule(method, path, **price):
+    return {"match": {"method": method, "path": path}, "price": price}
+
+
+def test_merchant_example_flat_price_is_exact():
+    engine = PricingEngine()
+    assert engine.load(SPEC.read_bytes()) is True
+    assert engine.policy_version == 1
+    assert engine.price("get", "/v1/demo") == Price.parse("0.05")
+    assert engine.price("POST", "/v1/demo") == Price(0)
+    assert engine.price("GET", "/v1/other") == Price(0)
+
+
+def test_templates_match_single_segments_and_first_rule_wins():
+    compiled = CompiledPricing.from_policy(
+        _pricing(
+            1,
+            [
+                _rule("GET", "/v1/items/{id}", flat=0.10),
+                _rule("GET", "/v1/items/special", flat=0.50),
+                _rule("GET", "/v1/files/{name}.json", flat=0.20),
+            ],
+        )
+    )
+    assert compiled.price("GET", "/v1/items/special") == Price.parse("0.1")
+    assert compiled.price("GET", "/v1/items/42") == Price.parse("0.1")
+    assert compiled.price("GET", "/v1/items/42/extra") == Price(0)
+    assert compiled.price("GET", "/v1/items/") == Price(0)
+    assert compiled.price("GET", "/v1/files/report.json") == Price.parse("0.2")
+    assert compiled.price("GET", "/v1/files/report.csv") == Price(0)
+
+
+def test_usage_based_price_with_minimum():
+    compiled = CompiledPricing.from_policy(
+        _pricing(1, [_rule("POST", "/v1/upload", flat=0.01, perMbReq=0.1, perMbResp=0.2, min=0.05)])
+    )
+    mb = 1024 * 1024
+    assert compiled.price("POST", "/v1/upload", request_bytes=mb // 2) == Price.parse("0.06")
+    assert compiled.price("POST", "/v1/upload", request_bytes=mb, response_bytes=3 * mb) == Price.parse("0.71")
+    assert compiled.price("POST", "/v1/upload") == Price.parse("0.05")
+
+
+def test_raw_formula_rounds_half_up_once_and_applies_the_minimum():
+    # 1 micro-unit per request MB, 3 per response MB, floor of 2.
+    def micros(request_bytes, response_bytes):
+        return PriceExpression.micros(0, 1, 3, 2, request_bytes=request_bytes, response_bytes=response_bytes)
+
+    assert micros(0, 0) == 2
+    assert micros(524287 * 4, 0) == 2
+    assert micros(524288 * 5, 0) == 3
+    assert micros(524288, 524288) == 2
+    assert micros(524288 + 1, 1048576) == 4
+    expression = PriceExpression.from_policy({"perMbReq": 0.000001, "perMbResp": 0.000003, "min": 0.000002})
+    assert expression.evaluate(request_bytes=524288 + 1, response_bytes=1048576) == Price(4)
+
+
+def test_engine_swaps_only_on_version_change():
+    engine = PricingEngine(_pricing(1, [_rule("GET", "/a", flat=1)]))
+    first = engine.compiled
+    assert engine.load(_pricing(1, [_rule("GET", "/a", flat=2)])) is False
+    assert engine.compiled is first
+    assert engine.load(json.dumps({"pricing": _pricing(2, [_rule("GET", "/a", flat=2)])})) is True
+    assert engine.price("GET", "/a") == Price.parse(2)
+
+
+def test_price_request_uses_canonical_body_size():
+    engine = PricingEngine(_pricing(1, [_rule("POST", "/v1/items/{id}", perMbReq=1024 * 1024)]))
+    request = canonicalize_request(
+        method="POST",
+        raw_path="/v1/items/7",
+        headers=[],
+        query=[],
+        body=b"abc",
+        header_allowlist=[],
+    )
+    assert engine.price_request(request) == Price.parse(3)
+    assert engine.price_request(request, request_bytes=10) == Price.parse(10)
+
+
+@pytest.mark.parametrize(
+    "content_type, retain_payload",
+    [("application/octet-stream", False), ("application/octet-stream", True), ("application/json", True)],
+    ids=["hashed-only", "retained", "json"],
+)
+def test_price_request_bills_received_bytes(content_type, retain_payload):
+    engine = PricingEngine(_pricing(1, [_rule("POST", "/v1/items/{id}", perMbReq=1024 * 1024)]))
+    builder = CanonicalBodyBuilder(content_type, spool_threshold=4, retain_payload=retain_payload)
+    for chunk in (b'{ "b": 1,', b' "a": 2 }'):
+        builder.feed(chunk)
+    request = canonicalize_request(
+        method="POST",
+        raw_path="/v1/items/7",
+        headers=[],
+        query=[],
+        body=builder.finish(),
+        header_allowlist=[],
+    )
+    assert engine.price_request(request) == Price.parse(18)
+    decoded = CanonicalRequest.from_bytes(request.to_bytes(include_raw=False))
+    assert engine.price_request(decoded) == Price.parse(18)
+
+
+def test_lookup_backtracks_out_of_dead_ends_and_agrees_with_a_linear_scan():
+    import random
+    import re
+
+    compiled = CompiledPricing.from_policy(
+        _pricing(
+            1,
+            [
+                _rule("GET", "/a/{x}/end", flat=1),
+                _rule("GET", "/{y}/b/other", flat=2),
+                _rule("GET", "/{y}/{z}/other", flat=3),
+            ],
+        )
+    )
+    assert compiled.match("GET", "/a/b/other").index == 1
+    assert compiled.match("GET", "/c/d/other").index == 2
+
+    rng = random.Random(7)
+    segments = ["a", "b", "{p}", "{p}.json"]
+    paths = ["/" + "/".join(rng.choice(segments) for _ in range(rng.randint(1, 4))) for _ in range(60)]
+    compiled = CompiledPricing.from_policy(_pricing(1, [_rule("GET", path, flat=1) for path in paths]))
+    patterns = [
+        re.compile("/".join("[^/]+".join(map(re.escape, re.split(r"\{[^/]+\}", part))) for part in path.split("/")))
+        for path in paths
+    ]
+    for _ in range(500):
+        path = "/" + "/".join(rng.choice(["a", "b", "c", "x.json", ""]) for _ in range(rng.randint(1, 4)))
+        expected = next((index for index, pattern in enumerate(patterns) if pattern.fullmatch(path)), None)
+        rule = compiled.match("GET", path)
+        assert (rule.index if rule else None) == expected, path
@@ -0,0 +1,111 @@
+import asyncio
+import base64
+import hashlib
+import json
+
+from tribute_core import ProxyContextVerifier, decode_proxy_context
+from tribute_fastapi import TributeASGIMiddleware
+from tribute_fastapi.middleware import CONTEXT_STATE_KEY
+from tribute_flask import TributeWSGIMiddleware
+from tribute_flask.middleware import CONTEXT_KEY
+
+
+def _envelope(**overrides):
+    # Mirrors buildProxyContextHeader in edge-proxy/src/context.ts.
+    payload = {
+        "iss": "tribute",
+        "aud": "api.example.com",
+        "iat": 1000,
+        "exp": 1300,
+        "sub": "user-1@mer-1",
+        "app": None,
+        "rid": "/v1/demo",
+        "method": "GET",
+        "inputs_hash": "abc",
+        "receipt_nonce": "nonce-1",
+        "path_tmpl": "/v1/demo",
+    }
+    payload.update(overrides)
+    serialized = json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+    signature = base64.urlsafe_b64encode(hashlib.sha256(serialized.encode("utf-8")).digest()).rstrip(b"=")
+    return f"{base64.b64encode(serialized.encode('latin-1')).decode()}.{signature.decode()}"
+
+
+def test_decode_checks_digest_and_exposes_claims():
+    context = decode_proxy_context(_envelope(sub="zoë@mer-1"))
+    assert (context.sub, context.rid, context.inputs_hash, context.receipt_nonce) == (
+        "zoë@mer-1",
+        "/v1/demo",
+        "abc",
+        "nonce-1",
+    )
+    assert context.claims["path_tmpl"] == "/v1/demo"
+    assert not hasattr(context, "__dict__")
+
+    header = _envelope()
+    encoded, signature = header.split(".")
+    tampered = base64.b64encode(base64.b64decode(encoded).replace(b"user-1", b"user-2")).decode()
+    assert decode_proxy_context(f"{tampered}.{signature}") is None
+    assert decode_proxy_context(encoded) is None
+    assert decode_proxy_context(_envelope(iss="someone-else")) is None
+
+
+def test_verifier_enforces_expiry_and_audience():
+    now = [1100.0]
+    verifier = ProxyContextVerifier(clock=lambda: now[0])
+    header = _envelope()
+
+    assert verifier.verify(header, host="api.example.com:443").sub == "user-1@mer-1"
+    assert verifier.verify(header, host="other.example.com") is None
+    assert verifier.verify(header) is None
+    assert verifier.verify(None, host="api.example.com") is None
+    assert ProxyContextVerifier(audience="api.example.com", clock=lambda: now[0]).verify(header) is not None
+
+    now[0] = 1300
+    assert verifier.verify(header, host="api.example.com") is None
+
+
+def test_verifier_caches_decoded_envelopes():
+    verifier = ProxyContextVerifier(audience="api.example.com", clock=lambda: 1100.0)
+    header = _envelope()
+    first = verifier.verify(header)
+    assert verifier.verify(header) is first
+    assert (verifier._cache.hits, verifier._cache.misses) == (1, 1)
+
+
+def test_wsgi_middleware_exposes_proxy_context():
+    seen = {}
+
+    def app(environ, start_response):
+        seen["context"] = environ[CONTEXT_KEY]
+        return [b"ok"]
+
+    middleware = TributeWSGIMiddleware(
+        app, proxy_context=ProxyContextVerifier(clock=lambda: 1100.0)
+    )
+    environ = {
+        "REQUEST_METHOD": "GET",
+        "PATH_INFO": "/v1/demo",
+        "HTTP_HOST": "api.example.com",
+        "HTTP_X_PROXY_CONTEXT": _envelope(),
+    }
+    middleware(environ, lambda *args: None)
+    assert seen["context"].receipt_nonce == "nonce-1"
+
+
+def test_asgi_middleware_exposes_proxy_context():
+    seen = {}
+
+    async def app(scope, receive, send):
+        seen["context"] = scope["state"][CONTEXT_STATE_KEY]
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/v1/demo",
+        "query_string": b"",
+        "headers": [(b"host", b"api.example.com"), (b"x-proxy-context", _envelope().encode())],
+    }
+    middleware = TributeASGIMiddleware(app, proxy_context=ProxyContextVerifier(clock=lambda: 1100.0))
+    asyncio.run(middleware(scope, None, None))
+    assert seen["context"].sub == "user-1@mer-1"
@@ -0,0 +1,108 @@
+import asyncio
+import os
+import uuid
+
+import pytest
+
+from tribute_core import ProxyContextVerifier, ReplayGuard
+from tribute_fastapi import TributeASGIMiddleware
+from tribute_flask import TributeWSGIMiddleware
+
+from test_proxy_context import _envelope
+
+
+def test_replay_guard_rejects_nonces_within_the_window():
+    now = [0.0]
+    guard = ReplayGuard(window_seconds=300, capacity=1000, clock=lambda: now[0])
+
+    assert guard.accept("n-1")
+    assert not guard.accept("n-1")
+    now[0] = 299
+    assert not guard.accept("n-1")
+    assert guard.accept("n-2")
+
+    # A slice is reused only once every nonce in it is older than the window.
+    now[0] = 300 + guard.slice_seconds
+    assert guard.accept("n-1")
+    assert not guard.accept("n-2")
+    assert (guard.accepted, guard.rejected) == (3, 3)
+
+
+def test_replay_guard_stays_within_its_false_positive_rate():
+    now = [0.0]
+    guard = ReplayGuard(window_seconds=300, capacity=20_000, false_positive_rate=1e-4, clock=lambda: now[0])
+    for index in range(40_000):
+        now[0] = index * 300 / 20_000
+        guard.accept(f"nonce-{index}")
+    # 40k fresh nonces at a 1e-4 false-positive rate: about four rejections expected.
+    assert guard.rejected <= 12
+    assert guard.slot_bytes * guard.slots < 20_000 * 4
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_shared_replay_guard_spans_processes():
+    name = f"tribute-test-{uuid.uuid4().hex[:12]}"
+    guard = ReplayGuard(capacity=1000, shared_name=name)
+    try:
+        assert guard.accept("parent")
+        pid = os.fork()
+        if pid == 0:
+            child = ReplayGuard(capacity=1000, shared_name=name)
+            os._exit(0 if not child.accept("parent") and child.accept("child") else 1)
+        _, status = os.waitpid(pid, 0)
+        assert os.WEXITSTATUS(status) == 0
+        assert not guard.accept("child")
+        with pytest.raises(ValueError):
+            ReplayGuard(capacity=5000, shared_name=name)
+    finally:
+        guard.unlink()
+        guard.close()
+
+
+def test_middlewares_answer_replays_with_409():
+    header = _envelope()
+    calls = []
+
+    def wsgi_app(environ, start_response):
+        calls.append("wsgi")
+        return [b"ok"]
+
+    wsgi = TributeWSGIMiddleware(
+        wsgi_app,
+        proxy_context=ProxyContextVerifier(clock=lambda: 1100.0),
+        replay_guard=ReplayGuard(capacity=1000, clock=lambda: 1100.0),
+    )
+    statuses = []
+    for _ in range(2):
+        environ = {"REQUEST_METHOD": "GET", "PATH_INFO": "/v1/demo", "HTTP_HOST": "api.example.com", "HTTP_X_PROXY_CONTEXT": header}
+        body = wsgi(environ, lambda status, headers: statuses.append(status))
+    assert statuses == ["409 Conflict"]
+    assert b'"error": "replay"' in body[0]
+
+    async def asgi_app(scope, receive, send):
+        calls.append("asgi")
+
+    asgi = TributeASGIMiddleware(
+        asgi_app,
+        proxy_context=ProxyContextVerifier(clock=lambda: 1100.0),
+        replay_guard=ReplayGuard(capacity=1000, clock=lambda: 1100.0),
+    )
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    for _ in range(2):
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": "/v1/demo",
+            "query_string": b"",
+            "headers": [(b"host", b"api.example.com"), (b"x-proxy-context", header.encode())],
+        }
+        asyncio.run(asgi(scope, None, send))
+    assert sent[0]["status"] == 409
+    assert calls == ["wsgi", "asgi"]
+
+    with pytest.raises(ValueError):
+        TributeWSGIMiddleware(wsgi_app, replay_guard=ReplayGuard(capacity=10))
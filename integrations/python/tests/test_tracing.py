@@ -0,0 +1,249 @@
+import asyncio
+import json
+
+import pytest
+
+from tribute_core import (
+    Canonicalizer,
+    HMACSigner,
+    JsonLinesSink,
+    Tracer,
+    current_trace,
+    enrich_response,
+    estimate,
+    instrument,
+    set_tracer,
+    trace_request,
+    trace_span,
+    wrap_iterable,
+)
+from tribute_fastapi import TributeASGIMiddleware
+
+
+class ListSink:
+    def __init__(self):
+        self.traces = []
+
+    def emit(self, records):
+        self.traces.append(records)
+
+
+@pytest.fixture
+def install():
+    previous = []
+
+    def _install(**options):
+        sink = ListSink()
+        previous.append(set_tracer(Tracer(sink, **options)))
+        return sink
+
+    yield _install
+    if previous:
+        set_tracer(previous[0])
+
+
+def _handler():
+    canonicalizer = Canonicalizer(header_allowlist=["content-type"], path_template="/items/{item_id}")
+    signer = HMACSigner(key_id="primary", secret=b"topsecret")
+
+    def handler(item_id):
+        canonicalizer.canonicalize(
+            method="POST",
+            raw_path=f"/items/{item_id}",
+            headers=[("content-type", "application/json")],
+            query=[("b", "2"), ("a", "1")],
+            body=b'{"b": 1, "a": 2}',
+            path_params={"item_id": item_id},
+        )
+        estimate(estimated_price="0.10", signer=signer)
+        enrich_response(body=b"payload")
+        return "ok"
+
+    return instrument(instrument(handler, "handler"), "request", route="/items/{item_id}")
+
+
+def test_head_sampled_request_produces_a_span_tree(install):
+    sink = install(sample_rate=1.0)
+
+    assert _handler()("1") == "ok"
+
+    (records,) = sink.traces
+    by_name = {record["name"]: record for record in records}
+    assert set(by_name) == {
+        "request",
+        "handler",
+        "canonicalize",
+        "canonicalize.headers",
+        "canonicalize.query",
+        "canonicalize.body",
+        "canonicalize.hash",
+        "sign",
+        "usage",
+    }
+    assert by_name["request"]["parent_id"] is None
+    assert by_name["handler"]["parent_id"] == by_name["request"]["span_id"]
+    for step in ("headers", "query", "body", "hash"):
+        assert by_name[f"canonicalize.{step}"]["parent_id"] == by_name["canonicalize"]["span_id"]
+    assert by_name["canonicalize.body"]["attributes"] == {"bytes": 16}
+
+    hashes = {record["canonical_hash"] for record in records}
+    assert len(hashes) == 1 and None not in hashes
+    assert {record["route"] for record in records} == {"/items/{item_id}"}
+    assert {record["sampled"] for record in records} == {"head"}
+    assert len({record["trace_id"] for record in records}) == 1
+    assert [record["start"] for record in records] == sorted(record["start"] for record in records)
+
+
+def test_tail_sampling_keeps_slow_and_failing_requests(install):
+    sink = install(sample_rate=0.0, slow_threshold_seconds=3600.0)
+    handler = _handler()
+    handler("1")
+    assert sink.traces == []
+
+    def broken():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        instrument(broken, "request", route="/broken")()
+    (records,) = sink.traces
+    assert records[0]["sampled"] == "tail"
+    assert records[0]["attributes"] == {"error": "RuntimeError"}
+
+    set_tracer(Tracer(sink, sample_rate=0.0, slow_threshold_seconds=0.0))
+    handler("2")
+    assert len(sink.traces) == 2
+
+
+def test_unsampled_requests_are_not_traced(install):
+    sink = install(sample_rate=0.0)
+
+    def handler():
+        return current_trace()
+
+    assert instrument(handler, "request", route="/x")() is None
+    assert sink.traces == []
+
+
+def test_nested_request_scopes_join_the_outer_trace(install):
+    sink = install(sample_rate=1.0)
+
+    with trace_request("/outer") as trace:
+        with trace_request("/inner"):
+            assert current_trace() is trace
+    assert len(sink.traces) == 1
+
+
+def test_trace_span_is_a_no_op_outside_a_trace(install):
+    sink = install(sample_rate=1.0)
+    with trace_span("orphan") as span:
+        assert span is None
+    assert sink.traces == []
+
+    canonical = Canonicalizer(header_allowlist=[]).canonicalize(
+        method="GET", raw_path="/x", headers=[], query=[], body=b""
+    )
+    assert canonical.path_template == "/x"
+    assert sink.traces == []
+
+
+def test_spans_beyond_the_limit_are_counted_on_the_root(install):
+    sink = install(sample_rate=1.0, max_spans=3)
+
+    def handler():
+        for _ in range(5):
+            with current_trace().span("step"):
+                pass
+
+    instrument(handler, "request", route="/loop")()
+    (records,) = sink.traces
+    assert len(records) == 3
+    root = next(record for record in records if record["parent_id"] is None)
+    assert root["attributes"] == {"dropped_spans": 3}
+
+
+def test_streamed_response_accounting_is_traced(install):
+    sink = install(sample_rate=1.0)
+
+    def handler():
+        return b"".join(wrap_iterable([b"ab", b"cd"]))
+
+    instrument(handler, "request", route="/stream")()
+    usage = next(record for record in sink.traces[0] if record["name"] == "usage")
+    assert usage["attributes"] == {"response_bytes": 4}
+
+
+def test_bodies_streamed_after_the_request_emit_a_late_usage_span(install):
+    sink = install(sample_rate=1.0)
+
+    def view():
+        return wrap_iterable([b"ab", b"cd"])
+
+    # WSGI servers iterate the body once the view has returned.
+    body = instrument(view, "request", route="/stream")()
+    (records,) = sink.traces
+    assert [record["name"] for record in records] == ["request"]
+
+    assert b"".join(body) == b"abcd"
+    (usage,) = sink.traces[1]
+    assert usage["name"] == "usage"
+    assert usage["trace_id"] == records[0]["trace_id"]
+    assert usage["parent_id"] == records[0]["span_id"]
+    assert usage["route"] == "/stream" and usage["sampled"] == "head"
+    assert usage["attributes"] == {"response_bytes": 4}
+
+    sink = install(sample_rate=0.0, slow_threshold_seconds=3600.0)
+    body = instrument(view, "request", route="/stream")()
+    assert b"".join(body) == b"abcd"
+    assert sink.traces == []
+
+
+def test_asgi_middleware_traces_streamed_bodies(install):
+    sink = install(sample_rate=1.0)
+    chunks = [b"a" * 10, b"b" * 10]
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": index < len(chunks) - 1}
+        for index, chunk in enumerate(chunks)
+    ]
+
+    async def app(scope, receive, send):
+        while (await receive()).get("more_body"):
+            pass
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        pass
+
+    middleware = TributeASGIMiddleware(
+        app,
+        header_allowlist=["content-type"],
+        canonicalizers=[Canonicalizer(header_allowlist=["content-type"], path_template="/files/{file_id}")],
+    )
+    scope = {
+        "type": "http",
+        "method": "PUT",
+        "path": "/files/42",
+        "query_string": b"",
+        "headers": [(b"content-type", b"application/octet-stream"), (b"content-length", b"20")],
+    }
+    asyncio.run(middleware(scope, receive, send))
+
+    (records,) = sink.traces
+    by_name = {record["name"]: record for record in records}
+    assert by_name["canonicalize.body"]["attributes"] == {"bytes": 20, "streamed": True}
+    assert by_name["request"]["route"] == "/files/{file_id}"
+    assert by_name["request"]["canonical_hash"] == scope["state"]["tribute_canonical"].hash()
+
+
+def test_json_lines_sink_writes_one_record_per_line(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    sink = JsonLinesSink(path)
+    sink.emit([{"name": "request", "duration": 0.5}, {"name": "handler", "duration": 0.25}])
+    sink.emit([{"name": "request", "duration": 0.1}])
+    sink.flush()
+    sink.close()
+
+    lines = path.read_text().splitlines()
+    assert [json.loads(line)["name"] for line in lines] == ["request", "handler", "request"]
+    assert sink.dropped == 0
@@ -1,4 +1,4 @@
-from tribute_core import UsageTracker, enrich_response, wrap_iterable
+from tribute_core import Price, UsageTracker, enrich_response, wrap_async_iterable, wrap_iterable
 
 
 def test_usage_tracker_body_count():
@@ -11,7 +11,7 @@ def test_usage_tracker_body_count():
     report = tracker.build()
     assert report.response_bytes == 10
     assert report.usage["tokens"] == 5
-    assert report.final_price == 0.42
+    assert report.final_price == Price.parse("0.42")
 
 
 def test_enrich_response_helper():
@@ -19,7 +19,22 @@ def test_enrich_response_helper():
     assert body == b"payload"
     assert report.usage["foo"] == "bar"
     assert report.response_bytes == len(body)
-    assert report.final_price == 1.2
+    assert report.final_price == Price.parse("1.2")
+
+
+def test_usage_report_serialises_final_price_as_a_json_number():
+    import json
+
+    _, report = enrich_response(body=b"payload", usage={"tokens": 3}, final_price="0.000123")
+    payload = json.loads(json.dumps(report.to_dict()))
+    assert payload["final_price"] == 0.000123
+    assert isinstance(payload["final_price"], float)
+    assert payload["usage"] == {"tokens": 3}
+    assert payload["response_bytes"] == 7
+    assert payload["content_hash"] == report.content_hash
+
+    _, unpriced = enrich_response(body=b"")
+    assert "final_price" not in unpriced.to_dict()
 
 
 def test_wrap_iterable_counts_chunks():
@@ -28,3 +43,79 @@ def test_wrap_iterable_counts_chunks():
     collected = b"".join(list(wrapped))
     assert collected == b"abcd"
     assert tracker.build().response_bytes == 4
+
+
+def _expected_hash(body: bytes) -> str:
+    import base64
+    import hashlib
+
+    return base64.urlsafe_b64encode(hashlib.sha256(body).digest()).rstrip(b"=").decode()
+
+
+def test_tracker_hashes_memoryview_chunks():
+    payload = bytearray(b"x" * 64 + b"tail")
+    view = memoryview(payload)
+    tracker = UsageTracker()
+    tracker.add_chunk(view[:64])
+    tracker.add_chunk(view[64:])
+
+    report = tracker.build()
+    assert report.response_bytes == len(payload)
+    assert report.content_hash == _expected_hash(bytes(payload))
+    assert report.to_headers() == {"X-Content-Hash": report.content_hash}
+
+
+def test_wrap_iterable_exposes_report_and_callbacks():
+    seen = []
+    chunk = memoryview(b"cd")
+    wrapped = wrap_iterable([b"ab", chunk])
+    wrapped.add_done_callback(seen.append)
+    assert wrapped.report is None
+
+    chunks = list(wrapped)
+    assert chunks[1] is chunk
+    assert wrapped.report is not None
+    assert wrapped.report.response_bytes == 4
+    assert wrapped.report.content_hash == _expected_hash(b"abcd")
+    assert seen == [wrapped.report]
+
+
+def test_wrap_async_iterable_counts_and_hashes():
+    import asyncio
+
+    from tribute_core import wrap_async_iterable
+
+    async def body():
+        yield b"hello "
+        yield b"world"
+
+    async def consume():
+        wrapped = wrap_async_iterable(body())
+        wrapped.tracker.set_final_price(0.5)
+        collected = b"".join([chunk async for chunk in wrapped])
+        return collected, wrapped.report
+
+    collected, report = asyncio.run(consume())
+    assert collected == b"hello world"
+    assert report.response_bytes == 11
+    assert report.to_headers() == {
+        "X-Content-Hash": _expected_hash(b"hello world"),
+        "X-Final-Price": "0.500000",
+    }
+
+
+def test_wrapped_streams_are_iterators():
+    import asyncio
+
+    stream = wrap_iterable([b"ab", b"cd"])
+    assert next(stream) == b"ab"
+    assert list(stream) == [b"cd"]
+    assert stream.report.response_bytes == 4
+
+    async def pull():
+        astream = wrap_async_iterable(iter([b"x", b"yz"]))
+        first = await astream.__anext__()
+        rest = [chunk async for chunk in astream]
+        return first, rest, astream.report.response_bytes
+
+    assert asyncio.run(pull()) == (b"x", [b"yz"], 3)
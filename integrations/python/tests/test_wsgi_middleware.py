@@ -0,0 +1,83 @@
+import io
+
+from tribute_core import Canonicalizer, canonicalize_request
+from tribute_flask import TributeWSGIMiddleware, canonical_request
+
+
+def _environ(body: bytes, **extra):
+    environ = {
+        "REQUEST_METHOD": "POST",
+        "PATH_INFO": "/uploads/7",
+        "QUERY_STRING": "b=2&a=1",
+        "CONTENT_TYPE": "application/json",
+        "CONTENT_LENGTH": str(len(body)),
+        "HTTP_ACCEPT": "application/json",
+        "HTTP_X_IGNORED": "1",
+        "wsgi.input": io.BytesIO(body),
+    }
+    environ.update(extra)
+    return environ
+
+
+def test_wsgi_middleware_finalizes_after_body_is_consumed():
+    body = b'{"beta": 2, "alpha": 1}'
+    seen = {}
+
+    def app(environ, start_response):
+        seen["before"] = canonical_request(environ)
+        stream = environ["wsgi.input"]
+        seen["body"] = stream.read(5) + stream.read(int(environ["CONTENT_LENGTH"]) - 5)
+        return [b"ok"]
+
+    middleware = TributeWSGIMiddleware(
+        app,
+        header_allowlist=["content-type", "accept"],
+        canonicalizers=[Canonicalizer(header_allowlist=["content-type", "accept"], path_template="/uploads/{upload_id}")],
+    )
+    environ = _environ(body)
+    assert middleware(environ, lambda *args: None) == [b"ok"]
+
+    expected = canonicalize_request(
+        method="post",
+        raw_path="/uploads/7",
+        header_allowlist=["content-type", "accept"],
+        headers=[("Content-Type", "application/json"), ("Accept", "application/json")],
+        query=[("b", "2"), ("a", "1")],
+        body=body,
+        path_params={"upload_id": "7"},
+    )
+    canonical = canonical_request(environ)
+    assert seen["before"] is None
+    assert seen["body"] == body
+    assert canonical.path_template == "/uploads/{upload_id}"
+    assert canonical.hash() == expected.hash()
+
+
+def test_wsgi_middleware_drain_and_bodyless_requests():
+    middleware = TributeWSGIMiddleware(lambda environ, start_response: [])
+    environ = _environ(b"x" * 10, CONTENT_TYPE="application/octet-stream")
+    middleware(environ, lambda *args: None)
+    assert canonical_request(environ) is None
+    assert canonical_request(environ, drain=True).body is not None
+
+    bodyless = _environ(b"", REQUEST_METHOD="GET")
+    middleware(bodyless, lambda *args: None)
+    assert canonical_request(bodyless).body is None
+
+
+def test_static_templates_win_over_parameters_regardless_of_order():
+    routes = {}
+    seen = {}
+
+    def app(environ, start_response):
+        seen["template"] = canonical_request(environ).path_template
+        return [b"ok"]
+
+    middleware = TributeWSGIMiddleware(app, canonicalizers=routes.values())
+    routes["detail"] = Canonicalizer(header_allowlist=[], path_template="/items/{id}")
+    routes["new"] = Canonicalizer(header_allowlist=[], path_template="/items/new")
+
+    for path, template in (("/items/new", "/items/new"), ("/items/7", "/items/{id}")):
+        environ = {"REQUEST_METHOD": "GET", "PATH_INFO": path, "QUERY_STRING": "", "wsgi.input": io.BytesIO()}
+        middleware(environ, lambda *args: None)
+        assert seen["template"] == template
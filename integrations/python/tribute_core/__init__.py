@@ -3,7 +3,16 @@
 This package centralises canonicalization, pricing, usage accounting, and OpenAPI metadata helpers. Framework adapters import from here to avoid duplicating logic.
 """
 
-from .canonicalization import CanonicalBody, CanonicalRequest, canonicalize_request
+from .caching import CACHEABLE_METHODS, CachedResponse, CacheRule, EstimateCache, ResponseCache, TTLCache
+from .canonical_json import JSONBackend, canonical_json, get_json_backend, set_json_backend
+from .canonicalization import (
+    CanonicalBody,
+    CanonicalBodyBuilder,
+    CanonicalRequest,
+    Canonicalizer,
+    canonicalize_request,
+)
+from .coalesce import AsyncCoalescer
 from .decorators import (
     MethodSemantics,
     cacheable,
@@ -12,21 +21,65 @@ from .decorators import (
     metered,
     resolve_semantics,
 )
-from .estimate import EstimateResult, HMACSigner, JWKSManager, Signer, estimate, verify_signature
+from .entitlements import EntitlementEngine, EntitlementRequirement, SubscriptionRequired
+from .estimate import (
+    EstimateResult,
+    HMACSigner,
+    JWKSManager,
+    Signer,
+    VerifiedTokenCache,
+    estimate,
+    verify_many,
+    verify_signature,
+)
+from .jwks import RemoteJWKSResolver
+from .metrics import LatencyRecorder, get_recorder, instrument, route_scope, set_recorder, timed
 from .openapi import ProxyMetadata, apply_openapi_extensions, build_proxy_metadata
 from .policy import PolicyContext, PolicyDigest, compute_policy_digest
-from .usage import UsageReport, UsageTracker, enrich_response, wrap_iterable
+from .price import MICROS_PER_UNIT, Price, PriceLike
+from .pricing import CompiledPricing, PriceExpression, PricingEngine, PricingRule
+from .proxy_context import PROXY_CONTEXT_HEADER, ProxyContext, ProxyContextVerifier, decode_proxy_context
+from .replay import ReplayGuard, replay_error
+from .streaming import HashingInput
+from .tracing import (
+    JsonLinesSink,
+    Trace,
+    Tracer,
+    TraceSink,
+    attach_canonical,
+    current_trace,
+    get_tracer,
+    set_tracer,
+    trace_request,
+    trace_span,
+)
+from .usage import AccountedStream, UsageReport, UsageTracker, enrich_response, wrap_async_iterable, wrap_iterable
 
 __all__ = [
+    "AccountedStream",
+    "AsyncCoalescer",
+    "CACHEABLE_METHODS",
+    "CachedResponse",
+    "CacheRule",
     "CanonicalBody",
+    "CanonicalBodyBuilder",
     "CanonicalRequest",
+    "Canonicalizer",
     "canonicalize_request",
+    "canonical_json",
     "cacheable",
     "entitlement",
+    "EntitlementEngine",
+    "EntitlementRequirement",
     "EstimateResult",
     "estimate",
+    "EstimateCache",
+    "HashingInput",
     "HMACSigner",
     "JWKSManager",
+    "JSONBackend",
+    "JsonLinesSink",
+    "LatencyRecorder",
     "MethodSemantics",
     "estimate_handler",
     "PolicyContext",
@@ -37,10 +90,46 @@ __all__ = [
     "UsageReport",
     "UsageTracker",
     "Signer",
+    "SubscriptionRequired",
+    "TTLCache",
     "compute_policy_digest",
+    "CompiledPricing",
+    "MICROS_PER_UNIT",
+    "Price",
+    "PriceLike",
+    "PriceExpression",
+    "PricingEngine",
+    "PricingRule",
+    "PROXY_CONTEXT_HEADER",
+    "ProxyContext",
+    "ProxyContextVerifier",
+    "decode_proxy_context",
     "enrich_response",
+    "get_json_backend",
+    "get_recorder",
+    "get_tracer",
+    "current_trace",
+    "attach_canonical",
+    "instrument",
     "metered",
+    "RemoteJWKSResolver",
+    "ReplayGuard",
+    "replay_error",
     "resolve_semantics",
+    "route_scope",
+    "ResponseCache",
+    "set_json_backend",
+    "set_recorder",
+    "set_tracer",
+    "timed",
+    "Trace",
+    "Tracer",
+    "TraceSink",
+    "trace_request",
+    "trace_span",
+    "VerifiedTokenCache",
+    "verify_many",
     "verify_signature",
+    "wrap_async_iterable",
     "wrap_iterable",
 ]
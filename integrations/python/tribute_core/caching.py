@@ -0,0 +1,536 @@
+"""In-process caches keyed by canonical request hashes."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    FrozenSet,
+    Generic,
+    Hashable,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+from .canonicalization import CanonicalRequest
+from .estimate import EstimateResult
+from .policy import PolicyContext, PolicyDigest
+
+V = TypeVar("V")
+R = TypeVar("R")
+
+_MISSING = object()
+
+
+class TTLCache(Generic[V]):
+    """Thread-safe, size-bounded LRU cache with per-entry expiry."""
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = 1024,
+        default_ttl_seconds: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.default_ttl_seconds = default_ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[V, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > self._clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: V, *, ttl_seconds: Optional[float] = None) -> None:
+        ttl = self.default_ttl_seconds if ttl_seconds is None else ttl_seconds
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, self._clock() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class EstimateCache:
+    """Cache estimate handler results per canonical request and policy.
+
+    Entries are keyed by ``CanonicalRequest.hash()`` together with the bound
+    policy version and digest. The cache drops every entry as soon as it sees
+    ``PolicyContext.policy_version`` change, so stale prices never outlive a
+    policy swap. TTLs come from ``estimate_ttl_seconds`` on mapping results
+    when present, otherwise ``default_ttl_seconds``.
+
+    Adapters store :func:`estimate_payload` mappings here, never framework
+    response objects, and build a new response for every hit.
+    """
+
+    def __init__(
+        self,
+        *,
+        policy: Optional[PolicyContext] = None,
+        policy_digest: Optional[PolicyDigest] = None,
+        max_entries: int = 1024,
+        default_ttl_seconds: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._store: TTLCache[Any] = TTLCache(
+            max_entries=max_entries,
+            default_ttl_seconds=default_ttl_seconds,
+            clock=clock,
+        )
+        self.policy = policy
+        self.policy_digest = policy_digest
+        self._seen_version = policy.policy_version if policy else None
+
+    @property
+    def hits(self) -> int:
+        return self._store.hits
+
+    @property
+    def misses(self) -> int:
+        return self._store.misses
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def set_policy(
+        self, policy: Optional[PolicyContext], policy_digest: Optional[PolicyDigest] = None
+    ) -> None:
+        """Bind a new policy, invalidating entries priced under the old one."""
+
+        self.policy = policy
+        self.policy_digest = policy_digest
+        self._check_policy()
+
+    def get(self, canonical: CanonicalRequest) -> Optional[Any]:
+        return self._store.get(self._key(canonical))
+
+    def put(
+        self, canonical: CanonicalRequest, result: Any, *, ttl_seconds: Optional[float] = None
+    ) -> None:
+        if ttl_seconds is None:
+            ttl_seconds = _result_ttl(result)
+        self._store.set(self._key(canonical), result, ttl_seconds=ttl_seconds)
+
+    def get_or_compute(
+        self,
+        canonical: CanonicalRequest,
+        compute: Callable[[], Any],
+        *,
+        ttl_seconds: Optional[float] = None,
+    ) -> Any:
+        key = self._key(canonical)
+        cached = self._store.get(key, _MISSING)
+        if cached is not _MISSING:
+            return cached
+        result = compute()
+        if ttl_seconds is None:
+            ttl_seconds = _result_ttl(result)
+        self._store.set(key, result, ttl_seconds=ttl_seconds)
+        return result
+
+    def clear(self) -> None:
+        self._store.clear()
+
+    def _key(self, canonical: CanonicalRequest) -> Tuple[str, Optional[int], Optional[str]]:
+        version = self._check_policy()
+        digest = self.policy_digest.digest if self.policy_digest else None
+        return canonical.hash(), version, digest
+
+    def _check_policy(self) -> Optional[int]:
+        version = self.policy.policy_version if self.policy else None
+        if version != self._seen_version:
+            self._store.clear()
+            self._seen_version = version
+        return version
+
+
+def estimate_payload(result: Any) -> Optional[Dict[str, Any]]:
+    """Return an estimator result as a plain mapping, or None when it is not one."""
+
+    if isinstance(result, EstimateResult):
+        return result.to_dict()
+    if isinstance(result, Mapping):
+        return dict(result)
+    return None
+
+
+def _result_ttl(result: Any) -> Optional[float]:
+    if isinstance(result, Mapping):
+        ttl = result.get("estimate_ttl_seconds")
+        if ttl is not None:
+            return float(ttl)
+    return None
+
+
+Headers = Tuple[Tuple[str, str], ...]
+# Requests whose responses may be cached; anything else can change state.
+CACHEABLE_METHODS = frozenset({"GET", "HEAD"})
+ResponseParts = Tuple[int, Sequence[Tuple[str, str]], bytes]
+
+
+@dataclass(frozen=True)
+class CacheRule:
+    """Origin caching options taken from ``@cacheable(...)``.
+
+    Recognised options: ``ttl`` (seconds, default 60), ``stale_while_revalidate``
+    (seconds a stale entry may still be served while it is refreshed), ``vary``
+    (extra request headers that split the cache key) and ``statuses``
+    (cacheable status codes, default ``(200,)``).
+    """
+
+    ttl_seconds: float = 60.0
+    stale_while_revalidate: float = 0.0
+    vary: Tuple[str, ...] = ()
+    statuses: FrozenSet[int] = frozenset({200})
+
+    @classmethod
+    def from_options(cls, options: Optional[Mapping[str, Any]]) -> Optional["CacheRule"]:
+        if options is None:
+            return None
+        vary = options.get("vary") or ()
+        if isinstance(vary, str):
+            vary = vary.split(",")
+        return cls(
+            ttl_seconds=float(options.get("ttl", options.get("ttl_seconds", 60.0))),
+            stale_while_revalidate=float(options.get("stale_while_revalidate", 0.0)),
+            vary=tuple(sorted(name.strip().lower() for name in vary if name.strip())),
+            statuses=frozenset(options.get("statuses", (200,))),
+        )
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    status: int
+    headers: Headers
+    body: bytes
+    fresh_until: float
+    stale_until: float
+
+
+class ResponseCache:
+    """Origin response cache for ``@cacheable`` routes.
+
+    Keys are ``CanonicalRequest.hash()``, extended with the concrete path and
+    the values of the rule's ``vary`` headers. Entries live in a :class:`TTLCache` LRU tier and,
+    when ``disk_path`` is set, in one file per key under that directory so
+    other workers and restarts can reuse them. An entry is fresh for ``ttl``
+    seconds and may then be served for ``stale_while_revalidate`` more seconds
+    while a single background refresh replaces it. Only ``GET`` and ``HEAD``
+    requests are cached; responses with ``Set-Cookie``,
+    ``Cache-Control: no-store``/``private``, an uncacheable status or a body
+    over ``max_body_bytes`` are never stored.
+
+    Expiry uses wall-clock time by default so disk entries stay meaningful
+    across processes.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = 1024,
+        max_body_bytes: int = 1024 * 1024,
+        disk_path: Union[str, Path, None] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self._memory: TTLCache[CachedResponse] = TTLCache(max_entries=max_entries, clock=clock)
+        self.max_body_bytes = max_body_bytes
+        self.disk_path = Path(disk_path) if disk_path is not None else None
+        self._clock = clock
+        self._revalidating: Set[str] = set()
+        self._refreshes: Set["asyncio.Future[None]"] = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.revalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    @staticmethod
+    def key(
+        canonical: CanonicalRequest,
+        rule: CacheRule,
+        header: Callable[[str], Optional[str]],
+        *,
+        path: str,
+    ) -> str:
+        """Return the cache key for a request.
+
+        The canonical hash abstracts path parameters into the route template,
+        so the concrete ``path`` is mixed in; ``header`` looks up the values of
+        the rule's ``vary`` headers.
+        """
+
+        parts = [canonical.hash(), path]
+        for name in rule.vary:
+            parts.append(f"{name}={header(name) or ''}")
+        return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+    def lookup(self, key: str) -> Optional[CachedResponse]:
+        """Return a fresh or stale-but-servable entry, counting the outcome."""
+
+        entry = self._memory.get(key)
+        if entry is None and self.disk_path is not None:
+            entry = self._read_disk(key)
+            if entry is not None:
+                self.disk_hits += 1
+                self._memory.set(key, entry, ttl_seconds=entry.stale_until - self._clock())
+        if entry is None:
+            self.misses += 1
+        elif self.is_fresh(entry):
+            self.hits += 1
+        else:
+            self.stale_hits += 1
+        return entry
+
+    def is_fresh(self, entry: CachedResponse) -> bool:
+        return entry.fresh_until > self._clock()
+
+    def store(
+        self,
+        key: str,
+        rule: CacheRule,
+        status: int,
+        headers: Sequence[Tuple[str, str]],
+        body: bytes,
+        *,
+        method: str,
+    ) -> bool:
+        """Store a response if it is cacheable under ``rule``; return whether it was."""
+
+        if method not in CACHEABLE_METHODS or status not in rule.statuses or len(body) > self.max_body_bytes or rule.ttl_seconds <= 0:
+            return False
+        for name, value in headers:
+            lowered = name.lower()
+            if lowered == "set-cookie":
+                return False
+            if lowered == "cache-control" and ("no-store" in value or "private" in value):
+                return False
+        now = self._clock()
+        entry = CachedResponse(
+            status=status,
+            headers=tuple((str(name), str(value)) for name, value in headers),
+            body=bytes(body),
+            fresh_until=now + rule.ttl_seconds,
+            stale_until=now + rule.ttl_seconds + rule.stale_while_revalidate,
+        )
+        self._memory.set(key, entry, ttl_seconds=entry.stale_until - now)
+        if self.disk_path is not None:
+            self._write_disk(key, entry)
+        return True
+
+    def pop(self, key: str) -> None:
+        self._memory.pop(key)
+        if self.disk_path is not None:
+            try:
+                os.unlink(self._disk_file(key))
+            except FileNotFoundError:
+                pass
+
+    def clear(self) -> None:
+        """Drop the memory tier; disk entries expire on their own."""
+
+        self._memory.clear()
+
+    def get_or_compute(
+        self,
+        key: str,
+        rule: CacheRule,
+        compute: Callable[[], R],
+        parts: Callable[[R], Optional[ResponseParts]],
+        *,
+        method: str,
+    ) -> Union[CachedResponse, R]:
+        """Serve ``key`` from cache, or return ``compute()`` after storing it.
+
+        ``parts`` extracts ``(status, headers, body)`` from a computed response,
+        or returns ``None`` for responses that cannot be cached (streams).
+        Requests whose ``method`` is not ``GET`` or ``HEAD`` always run
+        ``compute``. Stale hits are refreshed on a background thread, so
+        ``compute`` must be safe to call there; adapters bind any request
+        context first.
+        """
+
+        if method not in CACHEABLE_METHODS:
+            return compute()
+        entry = self.lookup(key)
+        if entry is not None:
+            if not self.is_fresh(entry) and self.begin_revalidation(key):
+                threading.Thread(
+                    target=self._revalidate, args=(key, rule, compute, parts, method), daemon=True
+                ).start()
+            return entry
+        response = compute()
+        self._store_parts(key, rule, parts(response), method)
+        return response
+
+    async def get_or_compute_async(
+        self,
+        key: str,
+        rule: CacheRule,
+        compute: Callable[[], Awaitable[R]],
+        parts: Callable[[R], Optional[ResponseParts]],
+        *,
+        method: str,
+    ) -> Union[CachedResponse, R]:
+        """Coroutine counterpart of :meth:`get_or_compute`; refreshes run as tasks."""
+
+        if method not in CACHEABLE_METHODS:
+            return await compute()
+        entry = self.lookup(key)
+        if entry is not None:
+            if not self.is_fresh(entry) and self.begin_revalidation(key):
+                self.keep_task(asyncio.ensure_future(self._revalidate_async(key, rule, compute, parts, method)))
+            return entry
+        response = await compute()
+        self._store_parts(key, rule, parts(response), method)
+        return response
+
+    def keep_task(self, task: "asyncio.Future[None]") -> None:
+        """Hold a reference to a background refresh until it finishes.
+
+        The event loop only keeps weak references to tasks, so an unreferenced
+        refresh can be garbage-collected before it completes.
+        """
+
+        self._refreshes.add(task)
+        task.add_done_callback(self._refreshes.discard)
+
+    def begin_revalidation(self, key: str) -> bool:
+        """Claim the refresh of a stale ``key``; False if one is already running."""
+
+        with self._lock:
+            if key in self._revalidating:
+                return False
+            self._revalidating.add(key)
+            self.revalidations += 1
+            return True
+
+    def end_revalidation(self, key: str) -> None:
+        with self._lock:
+            self._revalidating.discard(key)
+
+    def _store_parts(self, key: str, rule: CacheRule, parts: Optional[ResponseParts], method: str) -> None:
+        if parts is not None:
+            self.store(key, rule, *parts, method=method)
+
+    def _revalidate(
+        self,
+        key: str,
+        rule: CacheRule,
+        compute: Callable[[], R],
+        parts: Callable[[R], Optional[ResponseParts]],
+        method: str,
+    ) -> None:
+        try:
+            self._store_parts(key, rule, parts(compute()), method)
+        finally:
+            self.end_revalidation(key)
+
+    async def _revalidate_async(
+        self,
+        key: str,
+        rule: CacheRule,
+        compute: Callable[[], Awaitable[R]],
+        parts: Callable[[R], Optional[ResponseParts]],
+        method: str,
+    ) -> None:
+        try:
+            self._store_parts(key, rule, parts(await compute()), method)
+        finally:
+            self.end_revalidation(key)
+
+    def _disk_file(self, key: str) -> Path:
+        assert self.disk_path is not None
+        return self.disk_path / key[:2] / key
+
+    def _read_disk(self, key: str) -> Optional[CachedResponse]:
+        path = self._disk_file(key)
+        try:
+            with open(path, "rb") as handle:
+                meta = json.loads(handle.readline())
+                body = handle.read()
+        except (OSError, ValueError):
+            return None
+        if meta["stale_until"] <= self._clock():
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            return None
+        return CachedResponse(
+            status=meta["status"],
+            headers=tuple((name, value) for name, value in meta["headers"]),
+            body=body,
+            fresh_until=meta["fresh_until"],
+            stale_until=meta["stale_until"],
+        )
+
+    def _write_disk(self, key: str, entry: CachedResponse) -> None:
+        path = self._disk_file(key)
+        meta = {
+            "status": entry.status,
+            "headers": entry.headers,
+            "fresh_until": entry.fresh_until,
+            "stale_until": entry.stale_until,
+        }
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path.parent)
+        except OSError:
+            # The disk tier is best effort; the memory tier already holds the entry.
+            return
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(json.dumps(meta, separators=(",", ":")).encode("utf-8") + b"\n")
+                handle.write(entry.body)
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
@@ -0,0 +1,263 @@
+"""Pluggable canonical JSON serialisation for body digests.
+
+Every backend must reproduce the reference output byte for byte: the stdlib
+``json.loads`` followed by ``json.dumps(sort_keys=True, separators=(",", ":"))``
+(ASCII-escaped, ``repr`` floats, last duplicate key wins). A backend returns
+``None`` when the payload is not JSON or decodes to ``null``, in which case the
+raw bytes are hashed unchanged.
+
+Backends:
+
+- ``stdlib``: the reference implementation.
+- ``orjson``: parses and serialises with orjson when it is installed, falling
+  back to ``stdlib`` for documents orjson would render differently (non-ASCII
+  output, floats, integers beyond 64 bits, ``NaN``/``Infinity``).
+- ``tokenizer``: a pure-Python tokenizer that emits canonical fragments
+  directly, sorting object members without building a Python object tree.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from json.decoder import scanstring
+from json.encoder import encode_basestring_ascii
+from typing import Any, Callable, Dict, List, Optional, Protocol, Tuple, Union
+
+try:  # pragma: no cover - exercised only when orjson is installed
+    import orjson as _orjson
+except ImportError:  # pragma: no cover
+    _orjson = None
+
+
+class JSONBackend(Protocol):
+    name: str
+
+    def canonicalize(self, payload: bytes) -> Optional[bytes]:
+        ...
+
+
+class StdlibJSONBackend:
+    """Reference backend built on the standard library ``json`` module."""
+
+    name = "stdlib"
+
+    def canonicalize(self, payload: bytes) -> Optional[bytes]:
+        try:
+            loaded = json.loads(payload.decode("utf-8"))
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            return None
+        if loaded is None:
+            return None
+        return json.dumps(loaded, separators=(",", ":"), sort_keys=True).encode("utf-8")
+
+
+# Folds digits and exponent markers so float tokens reduce to ``0.`` / ``0e``.
+_FLOAT_FOLD = bytes.maketrans(b"0123456789E", b"0000000000e")
+
+
+def _orjson_safe(rendered: bytes) -> bool:
+    if not rendered.isascii() or b"\x7f" in rendered:
+        return False
+    folded = rendered.translate(_FLOAT_FOLD)
+    return b"0." not in folded and b"0e" not in folded
+
+
+class OrjsonJSONBackend:
+    """orjson-accelerated backend with a stdlib fallback for unsafe documents."""
+
+    name = "orjson"
+
+    def __init__(self) -> None:
+        if _orjson is None:
+            raise RuntimeError("orjson is not installed")
+        self._fallback = StdlibJSONBackend()
+
+    def canonicalize(self, payload: bytes) -> Optional[bytes]:
+        try:
+            loaded = _orjson.loads(payload)
+        except _orjson.JSONDecodeError:
+            # orjson rejects NaN/Infinity and lone surrogates; stdlib decides.
+            return self._fallback.canonicalize(payload)
+        if loaded is None:
+            return None
+        try:
+            rendered = _orjson.dumps(loaded, option=_orjson.OPT_SORT_KEYS)
+        except TypeError:
+            return self._fallback.canonicalize(payload)
+        if not _orjson_safe(rendered):
+            return self._fallback.canonicalize(payload)
+        return rendered
+
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_NUMBER = re.compile(r"(-?(?:0|[1-9][0-9]*))(\.[0-9]+)?([eE][-+]?[0-9]+)?")
+_CONSTANTS = {
+    "null": "null",
+    "true": "true",
+    "false": "false",
+    "NaN": "NaN",
+    "Infinity": "Infinity",
+    "-Infinity": "-Infinity",
+}
+
+
+class _TokenizerError(ValueError):
+    pass
+
+
+class TokenizerJSONBackend:
+    """Pure-Python tokenizer that writes canonical JSON without a parse tree."""
+
+    name = "tokenizer"
+
+    def canonicalize(self, payload: bytes) -> Optional[bytes]:
+        try:
+            text = payload.decode("utf-8")
+        except UnicodeDecodeError:
+            return None
+        try:
+            end = _skip_whitespace(text, 0)
+            rendered, end = self._value(text, end)
+            end = _skip_whitespace(text, end)
+        except (_TokenizerError, json.JSONDecodeError):
+            return None
+        if end != len(text) or rendered == "null":
+            return None
+        return rendered.encode("ascii")
+
+    def _value(self, text: str, idx: int) -> Tuple[str, int]:
+        if idx >= len(text):
+            raise _TokenizerError("unexpected end of document")
+        char = text[idx]
+        if char == '"':
+            value, end = scanstring(text, idx + 1, True)
+            return encode_basestring_ascii(value), end
+        if char == "{":
+            return self._object(text, idx + 1)
+        if char == "[":
+            return self._array(text, idx + 1)
+        match = _NUMBER.match(text, idx)
+        if match is not None:
+            integer, frac, exp = match.groups()
+            if frac or exp:
+                return _float_repr(float(integer + (frac or "") + (exp or ""))), match.end()
+            return repr(int(integer)), match.end()
+        for literal, rendered in _CONSTANTS.items():
+            if text.startswith(literal, idx):
+                return rendered, idx + len(literal)
+        raise _TokenizerError(f"unexpected character at {idx}")
+
+    def _object(self, text: str, idx: int) -> Tuple[str, int]:
+        members: Dict[str, str] = {}
+        idx = _skip_whitespace(text, idx)
+        if text.startswith("}", idx):
+            return "{}", idx + 1
+        while True:
+            if not text.startswith('"', idx):
+                raise _TokenizerError(f"expected key at {idx}")
+            key, idx = scanstring(text, idx + 1, True)
+            idx = _skip_whitespace(text, idx)
+            if not text.startswith(":", idx):
+                raise _TokenizerError(f"expected ':' at {idx}")
+            idx = _skip_whitespace(text, idx + 1)
+            # Later duplicates overwrite earlier ones, matching json.loads.
+            members[key], idx = self._value(text, idx)
+            idx = _skip_whitespace(text, idx)
+            if text.startswith("}", idx):
+                break
+            if not text.startswith(",", idx):
+                raise _TokenizerError(f"expected ',' at {idx}")
+            idx = _skip_whitespace(text, idx + 1)
+        parts = [f"{encode_basestring_ascii(key)}:{members[key]}" for key in sorted(members)]
+        return "{" + ",".join(parts) + "}", idx + 1
+
+    def _array(self, text: str, idx: int) -> Tuple[str, int]:
+        items: List[str] = []
+        idx = _skip_whitespace(text, idx)
+        if text.startswith("]", idx):
+            return "[]", idx + 1
+        while True:
+            item, idx = self._value(text, idx)
+            items.append(item)
+            idx = _skip_whitespace(text, idx)
+            if text.startswith("]", idx):
+                break
+            if not text.startswith(",", idx):
+                raise _TokenizerError(f"expected ',' at {idx}")
+            idx = _skip_whitespace(text, idx + 1)
+        return "[" + ",".join(items) + "]", idx + 1
+
+
+def _skip_whitespace(text: str, idx: int) -> int:
+    match = _WHITESPACE.match(text, idx)
+    return match.end() if match else idx
+
+
+def _float_repr(value: float) -> str:
+    if value != value:
+        return "NaN"
+    if value == float("inf"):
+        return "Infinity"
+    if value == float("-inf"):
+        return "-Infinity"
+    return float.__repr__(value)
+
+
+_FACTORIES: Dict[str, Callable[[], JSONBackend]] = {
+    "stdlib": StdlibJSONBackend,
+    "tokenizer": TokenizerJSONBackend,
+}
+if _orjson is not None:
+    _FACTORIES["orjson"] = OrjsonJSONBackend
+
+_backend: JSONBackend = OrjsonJSONBackend() if _orjson is not None else StdlibJSONBackend()
+
+
+def available_backends() -> Dict[str, JSONBackend]:
+    """Return a fresh instance of every backend usable in this interpreter."""
+
+    return {name: factory() for name, factory in _FACTORIES.items()}
+
+
+def get_json_backend() -> JSONBackend:
+    return _backend
+
+
+def set_json_backend(backend: Union[str, JSONBackend]) -> JSONBackend:
+    """Select the process-wide backend by name or instance; returns the previous one."""
+
+    global _backend
+    previous = _backend
+    if isinstance(backend, str):
+        factory = _FACTORIES.get(backend)
+        if factory is None:
+            raise ValueError(f"unknown JSON backend: {backend}")
+        backend = factory()
+    _backend = backend
+    return previous
+
+
+def canonical_json(payload: bytes) -> Optional[bytes]:
+    """Return the canonical JSON encoding of ``payload`` or ``None`` when not applicable."""
+
+    return _backend.canonicalize(payload)
+
+
+def json_loads(data: Union[bytes, str]) -> Any:
+    """Parse JSON with orjson when it is installed; malformed input raises ``ValueError``."""
+
+    if _orjson is not None:
+        return _orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(value: Any, *, default: Optional[Callable[[Any], Any]] = None) -> bytes:
+    """Serialise ``value`` to compact JSON bytes, with orjson when it is installed.
+
+    The output is not canonical; use :func:`canonical_json` for digests.
+    """
+
+    if _orjson is not None:
+        return _orjson.dumps(value, default=default)
+    return json.dumps(value, separators=(",", ":"), default=default).encode("utf-8")
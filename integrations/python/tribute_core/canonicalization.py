@@ -8,71 +8,356 @@ rules:
 2. Dynamic path segments are rewritten to ``{param}`` placeholders.
 3. Headers are filtered by an allowlist, folded to lowercase, and value-sorted.
 4. Query parameters are sorted first by key, then value.
-5. Bodies are normalised — JSON payloads are re-serialised with sorted keys.
+5. Bodies are normalised — JSON payloads are re-serialised with sorted keys
+   (see :mod:`tribute_core.canonical_json` for the pluggable backends).
 6. A SHA-256 digest is computed for optional inclusion in receipts.
+
+Large uploads can be fed incrementally through :class:`CanonicalBodyBuilder`,
+which hashes chunks as they arrive and spills to a temporary file once the
+configured threshold is crossed. JSON bodies are the exception: sorting keys
+needs the whole document, so they are canonicalised in memory.
 """
 
 from __future__ import annotations
 
 import hashlib
-import json
-from dataclasses import dataclass
-from typing import Iterable, Mapping, MutableMapping, Optional, Sequence, Tuple
+import io
+import re
+import tempfile
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import BinaryIO, Dict, FrozenSet, Iterable, Mapping, MutableMapping, Optional, Sequence, Tuple, Union
+
+from .canonical_json import canonical_json
+from .metrics import timed
+from .tracing import attach_canonical, current_trace, trace_span
 
 HeaderItems = Iterable[Tuple[str, str]]
 QueryItems = Iterable[Tuple[str, str]]
 
+DEFAULT_SPOOL_THRESHOLD = 1024 * 1024
+
 
 @dataclass(frozen=True)
 class CanonicalBody:
-    """Representation of a canonicalised request body."""
+    """Representation of a canonicalised request body.
+
+    Bodies spilled to disk by :class:`CanonicalBodyBuilder` keep ``raw`` empty
+    and expose the payload through :meth:`open` instead. ``size`` is the
+    length of the body as received, before JSON re-serialisation, and is
+    set even when the payload was not retained.
+    """
 
     raw: bytes
     digest: str
     content_type: Optional[str]
+    spool: Optional[BinaryIO] = field(default=None, compare=False, repr=False)
+    size: Optional[int] = field(default=None, compare=False)
+
+    @property
+    def spooled(self) -> bool:
+        return self.spool is not None
+
+    def open(self) -> BinaryIO:
+        """Return a readable stream positioned at the start of the payload."""
+
+        if self.spool is None:
+            return io.BytesIO(self.raw)
+        self.spool.seek(0)
+        return self.spool
 
     def as_text(self) -> str:
+        raw = self.open().read() if self.spool is not None else self.raw
         try:
-            return self.raw.decode("utf-8")
+            return raw.decode("utf-8")
         except UnicodeDecodeError:
-            return self.raw.hex()
+            return raw.hex()
 
 
 @dataclass(frozen=True)
 class CanonicalRequest:
-    """Canonical representation of an inbound request."""
+    """Canonical representation of an inbound request.
+
+    :meth:`hash` is computed once and memoised on the instance. :meth:`to_bytes`
+    produces a compact binary encoding that can be shipped to other processes
+    and decoded with :meth:`from_bytes` without re-normalising. Layout
+    (``str`` is a varint length followed by UTF-8 bytes)::
+
+        magic      b"TCR1"
+        method     str
+        path       str
+        headers    varint count, then per entry: str name, varint n, n * str
+        query      same layout as headers
+        flags      1 byte: 0x1 body, 0x2 content type, 0x4 raw payload, 0x8 size
+        digest     32 bytes (when 0x1)
+        ctype      str (when 0x2)
+        raw        varint length + bytes (when 0x4)
+        size       varint received body length (when 0x8)
+    """
 
     method: str
     path_template: str
     headers: Mapping[str, Tuple[str, ...]]
     query: Mapping[str, Tuple[str, ...]]
     body: Optional[CanonicalBody]
+    _digest: Optional[str] = field(default=None, init=False, repr=False, compare=False)
 
     def hash(self) -> str:
         """Return a stable digest of the canonical representation."""
 
-        sha = hashlib.sha256()
-        sha.update(self.method.encode("utf-8"))
-        sha.update(b"\0")
-        sha.update(self.path_template.encode("utf-8"))
-        sha.update(b"\0")
+        digest = self._digest
+        if digest is None:
+            digest = hashlib.sha256(self._hash_input()).hexdigest()
+            object.__setattr__(self, "_digest", digest)
+        return digest
+
+    def _hash_input(self) -> bytes:
+        parts = [self.method, "\0", self.path_template, "\0"]
         for header, values in self.headers.items():
-            sha.update(header.encode("utf-8"))
-            sha.update(b"=")
+            parts.append(header)
+            parts.append("=")
             for value in values:
-                sha.update(value.encode("utf-8"))
-                sha.update(b"\0")
-        sha.update(b"\0")
+                parts.append(value)
+                parts.append("\0")
+        parts.append("\0")
         for key, values in self.query.items():
-            sha.update(key.encode("utf-8"))
-            sha.update(b"=")
+            parts.append(key)
+            parts.append("=")
             for value in values:
-                sha.update(value.encode("utf-8"))
-                sha.update(b"\0")
+                parts.append(value)
+                parts.append("\0")
         if self.body:
-            sha.update(b"\0")
-            sha.update(self.body.digest.encode("utf-8"))
-        return sha.hexdigest()
+            parts.append("\0")
+            parts.append(self.body.digest)
+        return "".join(parts).encode("utf-8")
+
+    def to_bytes(self, *, include_raw: bool = True) -> bytes:
+        """Encode the request in the compact binary layout described above."""
+
+        out = bytearray(_BINARY_MAGIC)
+        _write_str(out, self.method)
+        _write_str(out, self.path_template)
+        for mapping in (self.headers, self.query):
+            _write_varint(out, len(mapping))
+            for key, values in mapping.items():
+                _write_str(out, key)
+                _write_varint(out, len(values))
+                for value in values:
+                    _write_str(out, value)
+        body = self.body
+        flags = 0
+        if body is not None:
+            flags |= 0x1
+            if body.content_type is not None:
+                flags |= 0x2
+            if include_raw and not body.spooled:
+                flags |= 0x4
+            if body.size is not None:
+                flags |= 0x8
+        out.append(flags)
+        if body is not None:
+            out += bytes.fromhex(body.digest)
+            if flags & 0x2:
+                _write_str(out, body.content_type or "")
+            if flags & 0x4:
+                _write_varint(out, len(body.raw))
+                out += body.raw
+            if flags & 0x8:
+                _write_varint(out, body.size or 0)
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CanonicalRequest":
+        """Decode a request produced by :meth:`to_bytes`."""
+
+        if data[: len(_BINARY_MAGIC)] != _BINARY_MAGIC:
+            raise ValueError("not a canonical request encoding")
+        view = memoryview(data)
+        pos = len(_BINARY_MAGIC)
+        try:
+            method, pos = _read_str(view, pos)
+            path_template, pos = _read_str(view, pos)
+            mappings = []
+            for _ in range(2):
+                count, pos = _read_varint(view, pos)
+                mapping = {}
+                for _ in range(count):
+                    key, pos = _read_str(view, pos)
+                    n_values, pos = _read_varint(view, pos)
+                    values = []
+                    for _ in range(n_values):
+                        value, pos = _read_str(view, pos)
+                        values.append(value)
+                    mapping[key] = tuple(values)
+                mappings.append(mapping)
+            flags = view[pos]
+            pos += 1
+            body = None
+            if flags & 0x1:
+                digest_bytes, pos = _read_bytes(view, pos, 32)
+                digest = digest_bytes.hex()
+                content_type = None
+                if flags & 0x2:
+                    content_type, pos = _read_str(view, pos)
+                raw = b""
+                if flags & 0x4:
+                    length, pos = _read_varint(view, pos)
+                    raw, pos = _read_bytes(view, pos, length)
+                size = None
+                if flags & 0x8:
+                    size, pos = _read_varint(view, pos)
+                body = CanonicalBody(raw=raw, digest=digest, content_type=content_type, size=size)
+        except IndexError:
+            raise ValueError("truncated canonical request encoding") from None
+        if pos != len(data):
+            raise ValueError("trailing bytes after canonical request encoding")
+        return cls(
+            method=method,
+            path_template=path_template,
+            headers=mappings[0],
+            query=mappings[1],
+            body=body,
+        )
+
+
+_BINARY_MAGIC = b"TCR1"
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _write_str(out: bytearray, value: str) -> None:
+    encoded = value.encode("utf-8")
+    _write_varint(out, len(encoded))
+    out += encoded
+
+
+def _read_varint(view: memoryview, pos: int) -> Tuple[int, int]:
+    result = 0
+    shift = 0
+    while True:
+        byte = view[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _read_bytes(view: memoryview, pos: int, length: int) -> Tuple[bytes, int]:
+    end = pos + length
+    if end > len(view):
+        raise IndexError("field out of range")
+    return bytes(view[pos:end]), end
+
+
+def _read_str(view: memoryview, pos: int) -> Tuple[str, int]:
+    length, pos = _read_varint(view, pos)
+    raw, pos = _read_bytes(view, pos, length)
+    return raw.decode("utf-8"), pos
+
+
+class Canonicalizer:
+    """Per-route canonicalization state compiled once at registration time.
+
+    The header allowlist is frozen into a lowercase set and the optional route
+    ``path_template`` (``/items/{item_id}`` style) is compiled once so
+    requests matching the route shape resolve their template without any
+    string rewriting. Converter suffixes are dropped from the resolved
+    template and a ``{name:path}`` parameter spans one or more segments.
+    Paths that do not match fall back to rewriting, in order, the segments
+    holding each path parameter value.
+    """
+
+    def __init__(
+        self,
+        *,
+        header_allowlist: Iterable[str],
+        path_template: Optional[str] = None,
+    ):
+        self.header_allowlist = frozenset(value.lower() for value in header_allowlist)
+        self.path_template = path_template
+        self._template_segments: Optional[Tuple[Tuple[bool, str], ...]] = None
+        self._template_pattern: Optional["re.Pattern[str]"] = None
+        self._resolved_template: Optional[str] = None
+        if path_template is not None:
+            segments = self._template_segments = _compile_template(path_template)
+            self._template_pattern = _template_pattern(path_template, segments)
+            self._resolved_template = "/".join(f"{{{text}}}" if is_param else text for is_param, text in segments)
+
+    def canonicalize(
+        self,
+        *,
+        method: str,
+        raw_path: str,
+        headers: HeaderItems,
+        query: QueryItems,
+        body: Union[bytes, CanonicalBody, None],
+        path_params: Optional[Mapping[str, object]] = None,
+    ) -> CanonicalRequest:
+        """Normalise request primitives into a canonical shape."""
+
+        with timed("canonicalize"):
+            with trace_span("canonicalize.headers"):
+                normalized_headers = _normalize_headers(headers, self.header_allowlist)
+            with trace_span("canonicalize.query"):
+                normalized_query = _normalize_query(query)
+
+            path_template = self.resolve_path(raw_path, path_params)
+
+            if isinstance(body, CanonicalBody):
+                canonical_body: Optional[CanonicalBody] = body
+            else:
+                content_type = normalized_headers.get("content-type", (None,))[0]
+                with trace_span("canonicalize.body", bytes=len(body) if body else 0):
+                    canonical_body = _canonicalize_body(body, content_type) if body else None
+
+            request = CanonicalRequest(
+                method=method.upper(),
+                path_template=path_template,
+                headers=normalized_headers,
+                query=normalized_query,
+                body=canonical_body,
+            )
+            if current_trace() is not None:
+                # Hash eagerly so every span of the trace can carry it.
+                with trace_span("canonicalize.hash"):
+                    request.hash()
+                attach_canonical(request)
+            return request
+
+    @property
+    def specificity(self) -> Tuple[bool, ...]:
+        """Sort key putting static segments ahead of parameters, as werkzeug ranks rules."""
+
+        return tuple(is_param for is_param, _ in self._template_segments or ())
+
+    def match_path(self, raw_path: str) -> Optional[Dict[str, str]]:
+        """Return path parameters when ``raw_path`` fits the route template."""
+
+        pattern = self._template_pattern
+        if pattern is None or self._template_segments is None:
+            return None
+        match = pattern.fullmatch(raw_path)
+        if match is None:
+            return None
+        names = [text for is_param, text in self._template_segments if is_param]
+        return dict(zip(names, match.groups()))
+
+    def resolve_path(
+        self, raw_path: str, path_params: Optional[Mapping[str, object]] = None
+    ) -> str:
+        """Return the templated path for ``raw_path``."""
+
+        if not path_params:
+            return raw_path
+        if self._resolved_template is not None and self.match_path(raw_path) is not None:
+            return self._resolved_template
+        return _apply_path_params(raw_path, path_params)
 
 
 def canonicalize_request(
@@ -82,32 +367,146 @@ def canonicalize_request(
     header_allowlist: Sequence[str],
     headers: HeaderItems,
     query: QueryItems,
-    body: Optional[bytes],
+    body: Union[bytes, CanonicalBody, None],
     path_params: Optional[Mapping[str, object]] = None,
 ) -> CanonicalRequest:
-    """Normalise request primitives into a canonical shape."""
+    """Normalise request primitives into a canonical shape.
 
-    normalized_headers = _normalize_headers(headers, header_allowlist)
-    normalized_query = _normalize_query(query)
+    ``body`` may be the raw payload or a :class:`CanonicalBody` already
+    produced by :class:`CanonicalBodyBuilder`. Adapters handling many requests
+    per route should build a :class:`Canonicalizer` once instead.
+    """
 
-    path_template = _apply_path_params(raw_path, path_params)
+    return Canonicalizer(header_allowlist=header_allowlist).canonicalize(
+        method=method,
+        raw_path=raw_path,
+        headers=headers,
+        query=query,
+        body=body,
+        path_params=path_params,
+    )
 
-    content_type = normalized_headers.get("content-type", (None,))[0]
-    canonical_body = _canonicalize_body(body, content_type) if body else None
 
-    return CanonicalRequest(
-        method=method.upper(),
-        path_template=path_template,
-        headers=normalized_headers,
-        query=normalized_query,
-        body=canonical_body,
-    )
+class CanonicalBodyBuilder:
+    """Incrementally canonicalise a request body fed in chunks.
+
+    Non-JSON payloads are hashed as chunks arrive and buffered in memory until
+    ``spool_threshold`` bytes, after which they spill to a temporary file. JSON
+    payloads must be re-serialised, so they are buffered the same way and
+    canonicalised in :meth:`finish`, which reads the whole payload back into
+    memory: the spool bounds memory while a JSON body is being fed, not once
+    it is finished. The resulting digest always matches
+    :func:`canonicalize_request` for the same bytes.
+
+    With ``retain_payload=False`` non-JSON chunks are only hashed, for callers
+    that forward the body elsewhere; the finished body then has an empty
+    ``raw``.
+
+    A builder created inside a traced request adds one ``canonicalize.body``
+    span covering the time spent in :meth:`feed` and :meth:`finish`.
+    """
+
+    def __init__(
+        self,
+        content_type: Optional[str] = None,
+        *,
+        spool_threshold: int = DEFAULT_SPOOL_THRESHOLD,
+        retain_payload: bool = True,
+    ):
+        self.content_type = content_type
+        self.spool_threshold = spool_threshold
+        self.retain_payload = retain_payload
+        self._json = bool(content_type and "json" in content_type)
+        self._sha = hashlib.sha256()
+        self._buffer = bytearray()
+        self._spool: Optional[BinaryIO] = None
+        self._size = 0
+        self._finished = False
+        self._trace = current_trace()
+        self._traced_start = 0.0
+        self._traced_time = 0.0
+        if self._trace is not None:
+            self.feed = self._traced_feed  # type: ignore[method-assign]
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def feed(self, chunk: Union[bytes, bytearray, memoryview]) -> None:
+        if self._finished:
+            raise ValueError("body builder already finished")
+        if not chunk:
+            return
+        self._size += len(chunk)
+        if not self._json:
+            self._sha.update(chunk)
+            if not self.retain_payload:
+                return
+        if self._spool is not None:
+            self._spool.write(chunk)
+            return
+        self._buffer += chunk
+        if len(self._buffer) > self.spool_threshold:
+            self._spool = tempfile.TemporaryFile()
+            self._spool.write(self._buffer)
+            self._buffer = bytearray()
+
+    def _traced_feed(self, chunk: Union[bytes, bytearray, memoryview]) -> None:
+        start = perf_counter()
+        if not self._traced_start:
+            self._traced_start = start
+        try:
+            CanonicalBodyBuilder.feed(self, chunk)
+        finally:
+            self._traced_time += perf_counter() - start
+
+    def finish(self) -> Optional[CanonicalBody]:
+        """Return the canonical body, or ``None`` when nothing was fed."""
+
+        trace = self._trace
+        if trace is None or self._finished:
+            return self._finish()
+        start = perf_counter()
+        try:
+            return self._finish()
+        finally:
+            end = perf_counter()
+            trace.record(
+                "canonicalize.body",
+                self._traced_start or start,
+                self._traced_time + end - start,
+                attributes={"bytes": self._size, "streamed": True},
+            )
+
+    def _finish(self) -> Optional[CanonicalBody]:
+        if self._finished:
+            raise ValueError("body builder already finished")
+        self._finished = True
+        if self._size == 0:
+            return None
+        if self._json:
+            if self._spool is not None:
+                self._spool.seek(0)
+                payload = self._spool.read()
+                self._spool.close()
+            else:
+                payload = bytes(self._buffer)
+            self._buffer = bytearray()
+            return _canonicalize_body(payload, self.content_type)
+        digest = self._sha.hexdigest()
+        if self._spool is not None:
+            self._spool.seek(0)
+            return CanonicalBody(
+                raw=b"", digest=digest, content_type=self.content_type, spool=self._spool, size=self._size
+            )
+        payload = bytes(self._buffer)
+        self._buffer = bytearray()
+        return CanonicalBody(raw=payload, digest=digest, content_type=self.content_type, size=self._size)
 
 
 def _normalize_headers(
-    headers: HeaderItems, allowlist: Sequence[str]
+    headers: HeaderItems, allowset: FrozenSet[str]
 ) -> Mapping[str, Tuple[str, ...]]:
-    allowset = {value.lower() for value in allowlist}
     collected: MutableMapping[str, list[str]] = {}
     for name, value in headers:
         key = name.lower()
@@ -133,13 +532,42 @@ def _apply_path_params(
 ) -> str:
     if not path_params:
         return raw_path
-    template = raw_path
+    # Parameters appear in route order: replace the first run of exact
+    # segments matching each value after the previous replacement.
+    parts = raw_path.split("/")
+    templated: list[str] = []
+    pos = 0
     for key, value in path_params.items():
-        # Only replace exact path segments
-        placeholder = f"{{{key}}}"
-        segment = str(value)
-        template = template.replace(f"/{segment}", f"/{placeholder}")
-    return template
+        needle = str(value).split("/")
+        for start in range(pos, len(parts) - len(needle) + 1):
+            if parts[start:start + len(needle)] == needle:
+                templated.extend(parts[pos:start])
+                templated.append(f"{{{key}}}")
+                pos = start + len(needle)
+                break
+    templated.extend(parts[pos:])
+    return "/".join(templated)
+
+
+def _compile_template(template: str) -> Tuple[Tuple[bool, str], ...]:
+    compiled = []
+    for part in template.split("/"):
+        if part.startswith("{") and part.endswith("}"):
+            # Drop converter suffixes such as ``{path:path}``
+            compiled.append((True, part[1:-1].split(":", 1)[0]))
+        else:
+            compiled.append((False, part))
+    return tuple(compiled)
+
+
+def _template_pattern(template: str, segments: Tuple[Tuple[bool, str], ...]) -> "re.Pattern[str]":
+    pieces = []
+    for part, (is_param, text) in zip(template.split("/"), segments):
+        if not is_param:
+            pieces.append(re.escape(text))
+        else:
+            pieces.append("(.+)" if part[1:-1].partition(":")[2] == "path" else "([^/]+)")
+    return re.compile("/".join(pieces))
 
 
 def _canonicalize_body(
@@ -147,11 +575,6 @@ def _canonicalize_body(
 ) -> CanonicalBody:
     payload = body
     if content_type and "json" in content_type:
-        try:
-            loaded = json.loads(body.decode("utf-8"))
-        except (UnicodeDecodeError, json.JSONDecodeError):
-            loaded = None
-        if loaded is not None:
-            payload = json.dumps(loaded, separators=(",", ":"), sort_keys=True).encode("utf-8")
+        payload = canonical_json(body) or body
     digest = hashlib.sha256(payload).hexdigest()
-    return CanonicalBody(raw=payload, digest=digest, content_type=content_type)
+    return CanonicalBody(raw=payload, digest=digest, content_type=content_type, size=len(body))
@@ -0,0 +1,70 @@
+"""Single-flight coalescing for concurrent identical async work."""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import inspect
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class AsyncCoalescer:
+    """Share one in-flight invocation between concurrent callers of the same key.
+
+    The first caller for a key starts the work as a task; later callers await
+    the same task until it finishes. Coroutine functions run on the event loop,
+    plain callables run in ``executor`` (the loop's default thread pool when
+    omitted). Waiters await a shielded task, so a cancelled caller never
+    cancels the shared invocation for the others, and each waiter gives up
+    with :class:`asyncio.TimeoutError` after ``max_wait_seconds``.
+
+    In-flight work is tracked per event loop, so one coalescer can be shared
+    by apps running on several loops; callers on different loops never await
+    each other's tasks. Every caller of a key receives the same result object,
+    so coalesce plain values (such as an estimate payload) rather than
+    framework responses.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_wait_seconds: Optional[float] = 30.0,
+        executor: Optional[Executor] = None,
+    ):
+        self.max_wait_seconds = max_wait_seconds
+        self.executor = executor
+        self._inflight: Dict[Tuple[asyncio.AbstractEventLoop, Hashable], "asyncio.Future[Any]"] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def run(self, key: Hashable, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        slot = (asyncio.get_running_loop(), key)
+        task = self._inflight.get(slot)
+        if task is None:
+            task = asyncio.ensure_future(self._invoke(func, args, kwargs))
+            self._inflight[slot] = task
+            self.started += 1
+            task.add_done_callback(functools.partial(self._finished, slot))
+        else:
+            self.coalesced += 1
+        return await asyncio.wait_for(asyncio.shield(task), self.max_wait_seconds)
+
+    async def _invoke(self, func: Callable[..., Any], args: Any, kwargs: Any) -> Any:
+        if inspect.iscoroutinefunction(func):
+            return await func(*args, **kwargs)
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    def _finished(self, slot: Tuple[asyncio.AbstractEventLoop, Hashable], task: "asyncio.Future[Any]") -> None:
+        if self._inflight.get(slot) is task:
+            del self._inflight[slot]
+        if not task.cancelled():
+            # Mark the exception retrieved when every waiter has gone away.
+            task.exception()
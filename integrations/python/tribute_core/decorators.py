@@ -2,12 +2,14 @@
 
 Decorators attach metadata to handlers while keeping them pure functions. The
 metadata lives on ``__tribute_semantics__`` so adapters can discover it without
-executing the user handler.
+executing the user handler. Decorators return the handler itself, so stacking
+them adds no call overhead.
 """
 
 from __future__ import annotations
 
-from dataclasses import dataclass, field
+import inspect
+from dataclasses import dataclass, field, replace
 from functools import wraps
 from typing import Any, Callable, Dict, Optional, Protocol, TypeVar, cast
 
@@ -46,28 +48,73 @@ def _ensure_semantics(target: Callable[..., Any]) -> MethodSemantics:
     return cast(MethodSemantics, semantics)
 
 
-def _wrap_handler(func: F, semantics: MethodSemantics) -> F:
-    @wraps(func)
-    def wrapper(*args: Any, **kwargs: Any):
-        return func(*args, **kwargs)
-
-    setattr(wrapper, "__tribute_semantics__", semantics)
+def _annotate(func: F, update: Callable[[MethodSemantics], None]) -> F:
+    """Record semantics on ``func`` and return it without adding a call frame.
+
+    Stacked decorators share one ``MethodSemantics`` on the original function,
+    so coroutine and async-generator handlers stay introspectable as such.
+    Only callables that reject attributes (bound methods, builtins) get a
+    single flat wrapper of the matching kind.
+    """
+
+    target: Callable[..., Any] = func
+    if inspect.ismethod(func):
+        # Attribute reads on a bound method fall through to the class-level
+        # function; give the wrapper its own copy of any semantics it inherits.
+        target = _flat_wrapper(func)
+        inherited = getattr(target, "__tribute_semantics__", None)
+        if inherited is not None:
+            setattr(target, "__tribute_semantics__", replace(inherited))
+        semantics = _ensure_semantics(target)
+    else:
+        try:
+            semantics = _ensure_semantics(target)
+        except (AttributeError, TypeError):
+            target = _flat_wrapper(func)
+            semantics = _ensure_semantics(target)
+    update(semantics)
 
     def register_estimate(estimator: Callable[..., Any]) -> Callable[..., Any]:
         semantics.estimate_handler = estimator
         return estimator
 
-    setattr(wrapper, "estimate", register_estimate)
-    return cast(F, wrapper)
+    setattr(target, "estimate", register_estimate)
+    return cast(F, target)
+
+
+def _flat_wrapper(func: Callable[..., Any]) -> Callable[..., Any]:
+    if inspect.iscoroutinefunction(func):
+
+        @wraps(func)
+        async def async_wrapper(*args: Any, **kwargs: Any):
+            return await func(*args, **kwargs)
+
+        return async_wrapper
+
+    if inspect.isasyncgenfunction(func):
+
+        @wraps(func)
+        async def async_gen_wrapper(*args: Any, **kwargs: Any):
+            async for item in func(*args, **kwargs):
+                yield item
+
+        return async_gen_wrapper
+
+    @wraps(func)
+    def wrapper(*args: Any, **kwargs: Any):
+        return func(*args, **kwargs)
+
+    return wrapper
 
 
 def metered(**options: Any) -> Callable[[F], F]:
     """Mark a handler as metered and store pricing semantics."""
 
     def decorator(func: F) -> F:
-        semantics = _ensure_semantics(func)
-        semantics.metered = {**options}
-        return _wrap_handler(func, semantics)
+        def update(semantics: MethodSemantics) -> None:
+            semantics.metered = {**options}
+
+        return _annotate(func, update)
 
     return decorator
 
@@ -76,9 +123,10 @@ def entitlement(**options: Any) -> Callable[[F], F]:
     """Declare entitlement metadata for enforcement and documentation."""
 
     def decorator(func: F) -> F:
-        semantics = _ensure_semantics(func)
-        semantics.entitlement = {**options}
-        return _wrap_handler(func, semantics)
+        def update(semantics: MethodSemantics) -> None:
+            semantics.entitlement = {**options}
+
+        return _annotate(func, update)
 
     return decorator
 
@@ -87,9 +135,10 @@ def cacheable(**options: Any) -> Callable[[F], F]:
     """Annotate cache semantics for the proxy's guidance."""
 
     def decorator(func: F) -> F:
-        semantics = _ensure_semantics(func)
-        semantics.cacheable = {**options}
-        return _wrap_handler(func, semantics)
+        def update(semantics: MethodSemantics) -> None:
+            semantics.cacheable = {**options}
+
+        return _annotate(func, update)
 
     return decorator
 
@@ -3,11 +3,23 @@
 from __future__ import annotations
 
 import argparse
+import heapq
 import json
+from decimal import Decimal
 from pathlib import Path
-from typing import Any, Dict, Iterable
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
 
 from .estimate import verify_signature
+from .jwks import RemoteJWKSResolver
+from .price import Price, PriceLike
+from .pricing import CompiledPricing, PriceExpression, PricingEngine
+
+try:  # pragma: no cover - exercised only when numpy is installed
+    import numpy as _np
+except ImportError:  # pragma: no cover
+    _np = None
+
+_RULE_MEMO_LIMIT = 100_000
 
 
 def diff_openapi(previous: Path, current: Path) -> Dict[str, Any]:
@@ -21,25 +33,249 @@ def diff_openapi(previous: Path, current: Path) -> Dict[str, Any]:
     }
 
 
-def verify_signature_cli(payload: Path, jwk_path: Path) -> bool:
+def verify_signature_cli(payload: Path, jwk_path: Union[Path, str]) -> bool:
+    """Verify ``payload``'s price signature against a JWKS file or URL."""
+
     data = json.loads(payload.read_text())
-    jwk = json.loads(jwk_path.read_text())
     token = data.get("price_signature")
     if not token:
         raise ValueError("payload missing price_signature")
 
-    def resolver(kid: str) -> bytes | None:
-        for key in jwk.get("keys", []):
-            if key.get("kid") == kid:
-                secret = key.get("k")
-                if not secret:
-                    return None
-                return secret.encode("utf-8")
-        return None
-
+    resolver = RemoteJWKSResolver(jwk_path)
+    resolver.refresh()
     return verify_signature(token=token, key_resolver=resolver)
 
 
+class _Reconciliation:
+    """Running totals for :func:`reconcile_usage`; memory is bounded by ``top``.
+
+    All amounts are integer micro-units priced by :class:`PriceExpression`,
+    row by row or column-wise through :meth:`PriceExpression.micros`, so
+    re-pricing is exact.
+    """
+
+    def __init__(self, compiled: CompiledPricing, *, tolerance: int, top: int):
+        self.compiled = compiled
+        self.tolerance = tolerance
+        self.top = top
+        rules = compiled.rules
+        # The extra trailing slot prices unmatched rows at zero.
+        self.expressions = [rule.price for rule in rules] + [PriceExpression()]
+        # Column per price field, for the NumPy path.
+        self.coefficients = [
+            [getattr(rule.price, name).micros for rule in rules] + [0]
+            for name in ("flat", "per_mb_request", "per_mb_response", "minimum")
+        ]
+        self.unmatched = len(rules)
+        self.rule_rows = [0] * (len(rules) + 1)
+        self.rule_delta = [0] * (len(rules) + 1)
+        self.rows = 0
+        self.skipped: Dict[str, int] = {"invalid": 0, "missing_price": 0, "other_version": 0}
+        self.mismatches = 0
+        self.recorded_total = 0
+        self.repriced_total = 0
+        self.worst: List[Tuple[int, int, Dict[str, Any]]] = []
+        self._memo: Dict[Tuple[str, str], int] = {}
+
+    def rule_index(self, method: str, path: str) -> int:
+        key = (method, path)
+        index = self._memo.get(key)
+        if index is None:
+            if len(self._memo) >= _RULE_MEMO_LIMIT:
+                self._memo.clear()
+            rule = self.compiled.match(method, path)
+            index = self._memo[key] = self.unmatched if rule is None else rule.index
+        return index
+
+    def add_batch(
+        self,
+        indexes: List[int],
+        request_bytes: List[int],
+        response_bytes: List[int],
+        recorded: List[int],
+        hashes: List[Optional[str]],
+        use_numpy: bool,
+    ) -> None:
+        if not indexes:
+            return
+        offset = self.rows
+        self.rows += len(indexes)
+        if use_numpy:
+            candidates = self._add_numpy(indexes, request_bytes, response_bytes, recorded)
+        else:
+            candidates = self._add_python(indexes, request_bytes, response_bytes, recorded)
+        for position, price, delta in candidates:
+            self._keep_worst(offset + position, indexes[position], recorded[position], price, delta, hashes[position])
+
+    def _add_numpy(
+        self,
+        indexes: List[int],
+        request_bytes: List[int],
+        response_bytes: List[int],
+        recorded: List[int],
+    ) -> List[Tuple[int, int, int]]:
+        rows = _np.asarray(indexes, dtype=_np.intp)
+        flat, per_req, per_resp, minimum = (
+            _np.asarray(column, dtype=_np.int64)[rows] for column in self.coefficients
+        )
+        repriced = PriceExpression.micros(
+            flat,
+            per_req,
+            per_resp,
+            minimum,
+            request_bytes=_np.asarray(request_bytes, dtype=_np.int64),
+            response_bytes=_np.asarray(response_bytes, dtype=_np.int64),
+            floor=_np.maximum,
+        )
+        actual = _np.asarray(recorded, dtype=_np.int64)
+        delta = repriced - actual
+        counts = _np.bincount(rows, minlength=len(self.rule_rows))
+        deltas = _np.zeros(len(self.rule_delta), dtype=_np.int64)
+        _np.add.at(deltas, rows, delta)
+        for index, (count, total) in enumerate(zip(counts.tolist(), deltas.tolist())):
+            self.rule_rows[index] += count
+            self.rule_delta[index] += total
+        self.recorded_total += int(actual.sum())
+        self.repriced_total += int(repriced.sum())
+        mismatched = _np.flatnonzero(_np.abs(delta) > self.tolerance)
+        self.mismatches += int(mismatched.size)
+        if mismatched.size > self.top:
+            # Only the batch's largest deltas can enter the overall top list.
+            keep = _np.argpartition(-_np.abs(delta[mismatched]), max(self.top - 1, 0))[: self.top]
+            mismatched = mismatched[keep]
+        return [(int(i), int(repriced[i]), int(delta[i])) for i in mismatched]
+
+    def _add_python(
+        self,
+        indexes: List[int],
+        request_bytes: List[int],
+        response_bytes: List[int],
+        recorded: List[int],
+    ) -> List[Tuple[int, int, int]]:
+        expressions = self.expressions
+        candidates = []
+        for position, (i, req, resp, actual) in enumerate(
+            zip(indexes, request_bytes, response_bytes, recorded)
+        ):
+            price = expressions[i].evaluate(request_bytes=req, response_bytes=resp).micros
+            delta = price - actual
+            self.rule_rows[i] += 1
+            self.rule_delta[i] += delta
+            self.recorded_total += actual
+            self.repriced_total += price
+            if abs(delta) > self.tolerance:
+                self.mismatches += 1
+                candidates.append((position, price, delta))
+        return candidates
+
+    def _keep_worst(
+        self, row: int, index: int, actual: int, price: int, delta: int, request_hash: Optional[str]
+    ) -> None:
+        if self.top <= 0:
+            return
+        if len(self.worst) >= self.top and abs(delta) <= self.worst[0][0]:
+            return
+        detail = {
+            "request_hash": request_hash,
+            "rule": None if index == self.unmatched else index,
+            "final_price": str(Price(actual)),
+            "repriced": str(Price(price)),
+            "delta": str(Price(delta)),
+        }
+        if len(self.worst) < self.top:
+            heapq.heappush(self.worst, (abs(delta), row, detail))
+        else:
+            heapq.heapreplace(self.worst, (abs(delta), row, detail))
+
+    def summary(self) -> Dict[str, Any]:
+        rules = []
+        for rule in self.compiled.rules:
+            if self.rule_rows[rule.index]:
+                rules.append(
+                    {
+                        "rule": rule.index,
+                        "method": rule.method,
+                        "path": rule.path,
+                        "rows": self.rule_rows[rule.index],
+                        "delta": str(Price(self.rule_delta[rule.index])),
+                    }
+                )
+        return {
+            "policy_version": self.compiled.policy_version,
+            "rows": self.rows,
+            "unmatched_rows": self.rule_rows[self.unmatched],
+            "skipped": dict(self.skipped),
+            "mismatches": self.mismatches,
+            "recorded_total": str(Price(self.recorded_total)),
+            "repriced_total": str(Price(self.repriced_total)),
+            "delta_total": str(Price(self.repriced_total - self.recorded_total)),
+            "rules": rules,
+            "worst": [detail for _, _, detail in sorted(self.worst, key=lambda item: (-item[0], item[1]))],
+        }
+
+
+def reconcile_usage(
+    lines: Iterable[Union[str, bytes]],
+    pricing: Union[PricingEngine, CompiledPricing],
+    *,
+    tolerance: PriceLike = 0,
+    batch_size: int = 65536,
+    top: int = 10,
+    use_numpy: Optional[bool] = None,
+) -> Dict[str, Any]:
+    """Re-price JSONL usage records and summarise differences from ``final_price``.
+
+    Each record is a serialised :class:`~tribute_core.usage.UsageReport` plus
+    ``method``, ``path`` and optionally ``request_bytes``, ``request_hash`` and
+    ``policy_version`` (records priced under another version are skipped).
+    Rows are processed in batches of ``batch_size`` so memory stays flat; each
+    batch is priced column-wise with NumPy when it is installed. Amounts are
+    compared in micro-units; differences up to ``tolerance`` are accepted.
+    """
+
+    compiled = pricing.compiled if isinstance(pricing, PricingEngine) else pricing
+    state = _Reconciliation(compiled, tolerance=Price.parse(tolerance).micros, top=top)
+    vectorize = _np is not None if use_numpy is None else use_numpy
+    version = compiled.policy_version
+    parse_price = Price.parse
+    columns: Tuple[List[Any], ...] = ([], [], [], [], [])
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line, parse_float=Decimal)
+            method = str(record["method"]).upper()
+            path = str(record["path"])
+        except (ValueError, KeyError, TypeError):
+            state.skipped["invalid"] += 1
+            continue
+        if record.get("policy_version", version) != version:
+            state.skipped["other_version"] += 1
+            continue
+        final_price = record.get("final_price")
+        if final_price is None:
+            state.skipped["missing_price"] += 1
+            continue
+        try:
+            row_request_bytes = int(record.get("request_bytes") or 0)
+            row_response_bytes = int(record.get("response_bytes") or 0)
+            row_recorded = parse_price(final_price).micros
+        except (ValueError, TypeError, ArithmeticError):
+            state.skipped["invalid"] += 1
+            continue
+        indexes, request_bytes, response_bytes, recorded, hashes = columns
+        indexes.append(state.rule_index(method, path))
+        request_bytes.append(row_request_bytes)
+        response_bytes.append(row_response_bytes)
+        recorded.append(row_recorded)
+        hashes.append(record.get("request_hash"))
+        if len(indexes) >= batch_size:
+            state.add_batch(*columns, use_numpy=vectorize)
+            columns = ([], [], [], [], [])
+    state.add_batch(*columns, use_numpy=vectorize)
+    return state.summary()
+
+
 def _simulate_receipt() -> Dict[str, Any]:
     return {
         "status": "ok",
@@ -57,10 +293,17 @@ def run(argv: Iterable[str] | None = None) -> int:
 
     verify_cmd = sub.add_parser("verify-estimate", help="validate a price signature against a JWKS")
     verify_cmd.add_argument("payload", type=Path)
-    verify_cmd.add_argument("jwks", type=Path)
+    verify_cmd.add_argument("jwks", help="JWKS file path or http(s) URL")
 
     sub.add_parser("simulate-receipt", help="run a proxy receipt simulation")
 
+    reconcile_cmd = sub.add_parser("reconcile", help="re-price JSONL usage reports against a policy")
+    reconcile_cmd.add_argument("usage", type=Path, help="JSONL file of usage reports")
+    reconcile_cmd.add_argument("policy", type=Path, help="merchant config or pricing JSON")
+    reconcile_cmd.add_argument("--tolerance", default="0", help="accepted difference, e.g. 0.000001")
+    reconcile_cmd.add_argument("--batch-size", type=int, default=65536)
+    reconcile_cmd.add_argument("--top", type=int, default=10, help="number of worst discrepancies to list")
+
     args = parser.parse_args(list(argv) if argv is not None else None)
 
     if args.command == "diff-openapi":
@@ -74,6 +317,15 @@ def run(argv: Iterable[str] | None = None) -> int:
     if args.command == "simulate-receipt":
         print(json.dumps(_simulate_receipt(), indent=2))
         return 0
+    if args.command == "reconcile":
+        engine = PricingEngine()
+        engine.load(args.policy.read_bytes())
+        with args.usage.open("rb") as usage:
+            summary = reconcile_usage(
+                usage, engine, tolerance=args.tolerance, batch_size=args.batch_size, top=args.top
+            )
+        print(json.dumps(summary, indent=2))
+        return 1 if summary["mismatches"] else 0
 
     parser.print_help()
     return 1
@@ -0,0 +1,171 @@
+"""Local entitlement checks against compiled feature bitmasks."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Mapping, Optional, Tuple
+
+from .caching import TTLCache
+from .proxy_context import ProxyContext
+
+SUBSCRIPTION_REQUIRED_STATUS = 402
+
+
+class SubscriptionRequired(Exception):
+    """A subject lacks a feature; renders as the proxy's 402 ``subscription_required``."""
+
+    status = SUBSCRIPTION_REQUIRED_STATUS
+
+    def __init__(self, feature: str, *, reason: Optional[str] = None, upgrade_url: Optional[str] = None):
+        super().__init__(f"subscription:{feature} required")
+        self.feature = feature
+        self.reason = reason
+        self.upgrade_url = upgrade_url
+
+    def body(self) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {"error": "subscription_required", "needed": f"subscription:{self.feature}"}
+        if self.upgrade_url is not None:
+            payload["upgrade_url"] = self.upgrade_url
+        if self.reason is not None:
+            payload["reason"] = self.reason
+        return payload
+
+    def headers(self) -> Dict[str, str]:
+        headers = {"X-Required-Entitlement": self.feature}
+        if self.upgrade_url is not None:
+            headers["X-Upgrade-Url"] = self.upgrade_url
+        return headers
+
+
+@dataclass(frozen=True)
+class EntitlementRequirement:
+    """Features a route needs, as a bitmask over the engine's feature table."""
+
+    mask: int
+    features: Tuple[str, ...]
+    bits: Tuple[int, ...]
+    upgrade_url: Optional[str] = None
+
+    def missing(self, granted: int) -> Optional[str]:
+        """Return the first required feature not in ``granted``, if any."""
+
+        if granted & self.mask == self.mask:
+            return None
+        for feature, bit in zip(self.features, self.bits):
+            if not granted & bit:
+                return feature
+        return None
+
+
+class EntitlementEngine:
+    """Check ``@entitlement`` requirements without a per-request round trip.
+
+    Every feature name gets a bit the first time it is seen, so a route's
+    requirement compiles to a mask and a subject's grants to an integer.
+    ``resolver(sub)`` returns the features granted to a proxy-context subject
+    (``user@merchant``); its result is cached as a bitset for
+    ``ttl_seconds``, and a check is then a single AND. Call
+    :meth:`invalidate` when grants change.
+
+    ``@entitlement`` accepts ``feature=`` or ``features=[...]`` (all
+    required) and an optional ``upgrade_url=``.
+    """
+
+    def __init__(
+        self,
+        resolver: Callable[[str], Iterable[str]],
+        *,
+        ttl_seconds: float = 60.0,
+        max_entries: int = 65536,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.resolver = resolver
+        self._bits: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._grants: TTLCache[int] = TTLCache(
+            max_entries=max_entries, default_ttl_seconds=ttl_seconds, clock=clock
+        )
+
+    def compile(self, options: Optional[Mapping[str, Any]]) -> Optional[EntitlementRequirement]:
+        """Compile ``@entitlement`` options; None when the route is not gated."""
+
+        if not options:
+            return None
+        features = options.get("features") or ()
+        if isinstance(features, str):
+            features = (features,)
+        if options.get("feature"):
+            features = (options["feature"], *features)
+        features = tuple(dict.fromkeys(str(feature) for feature in features))
+        if not features:
+            return None
+        bits = tuple(self._bit(feature) for feature in features)
+        mask = 0
+        for bit in bits:
+            mask |= bit
+        upgrade_url = options.get("upgrade_url")
+        return EntitlementRequirement(
+            mask=mask, features=features, bits=bits, upgrade_url=str(upgrade_url) if upgrade_url else None
+        )
+
+    def grants(self, subject: str) -> int:
+        """Return the cached grant bitset for ``subject``, resolving it on a miss."""
+
+        granted = self._grants.get(subject)
+        if granted is None:
+            granted = self.mask(self.resolver(subject))
+            self._grants.set(subject, granted)
+        return granted
+
+    def mask(self, features: Iterable[str]) -> int:
+        granted = 0
+        for feature in features:
+            granted |= self._bit(str(feature))
+        return granted
+
+    def require(self, requirement: Optional[EntitlementRequirement], context: Optional[ProxyContext]) -> None:
+        """Raise :class:`SubscriptionRequired` unless ``context`` satisfies ``requirement``."""
+
+        if requirement is None:
+            return
+        if context is None:
+            raise SubscriptionRequired(
+                requirement.features[0], reason="missing_proxy_context", upgrade_url=requirement.upgrade_url
+            )
+        self._check(requirement, self.grants(context.sub))
+
+    async def require_async(
+        self, requirement: Optional[EntitlementRequirement], context: Optional[ProxyContext]
+    ) -> None:
+        """Like :meth:`require`, but runs the resolver in a thread on a cache miss."""
+
+        if requirement is None or context is None:
+            self.require(requirement, context)
+            return
+        granted = self._grants.get(context.sub)
+        if granted is None:
+            granted = await asyncio.get_running_loop().run_in_executor(None, self.grants, context.sub)
+        self._check(requirement, granted)
+
+    def invalidate(self, subject: Optional[str] = None) -> None:
+        """Drop cached grants for ``subject`` (or every subject when omitted)."""
+
+        if subject is None:
+            self._grants.clear()
+        else:
+            self._grants.pop(subject)
+
+    def _check(self, requirement: EntitlementRequirement, granted: int) -> None:
+        missing = requirement.missing(granted)
+        if missing is not None:
+            raise SubscriptionRequired(missing, reason="not_entitled", upgrade_url=requirement.upgrade_url)
+
+    def _bit(self, feature: str) -> int:
+        bit = self._bits.get(feature)
+        if bit is None:
+            with self._lock:
+                bit = self._bits.setdefault(feature, 1 << len(self._bits))
+        return bit
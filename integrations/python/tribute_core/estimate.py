@@ -3,12 +3,18 @@
 from __future__ import annotations
 
 import base64
+import binascii
 import hmac
 import json
+import threading
+import time
+from collections import OrderedDict
 from dataclasses import dataclass
-from decimal import Decimal, ROUND_HALF_UP
 from hashlib import sha256
-from typing import Any, Callable, Dict, Mapping, Optional, Protocol
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Protocol, Tuple
+
+from .metrics import timed
+from .price import Price, PriceLike
 
 
 def _b64url(data: bytes) -> str:
@@ -19,13 +25,13 @@ def _b64url(data: bytes) -> str:
 class EstimateResult:
     """Normalized estimate payload returned to integrators."""
 
-    estimated_price: Decimal
+    estimated_price: Price
     observables: Mapping[str, Any]
     price_signature: Optional[str]
 
     def to_dict(self) -> Dict[str, Any]:
         payload = {
-            "estimated_price": str(self.estimated_price.quantize(Decimal("0.000001"), rounding=ROUND_HALF_UP)),
+            "estimated_price": str(self.estimated_price),
             "observables": self.observables,
         }
         if self.price_signature:
@@ -36,29 +42,50 @@ class EstimateResult:
 class Signer(Protocol):
     key_id: str
 
-    def sign_estimate(self, price: Decimal, observables: Mapping[str, Any]) -> str:
+    def sign_estimate(self, price: Price, observables: Mapping[str, Any]) -> str:
         ...
 
 
 class HMACSigner:
-    """JWS HS256 signer for price estimates (suitable for PoC usage)."""
+    """JWS HS256 signer for price estimates (suitable for PoC usage).
+
+    The encoded JOSE header and a keyed HMAC state are prepared once; each
+    signature copies the keyed state instead of re-running the key schedule.
+    """
 
     def __init__(self, *, key_id: str, secret: bytes):
         self.key_id = key_id
         self._secret = secret
+        header = {"alg": "HS256", "kid": key_id, "typ": "JOSE"}
+        self._header_prefix = (
+            _b64url(json.dumps(header, separators=(",", ":")).encode("utf-8")) + "."
+        )
+        self._keyed = hmac.new(secret, self._header_prefix.encode("ascii"), sha256)
+
+    def sign_estimate(self, price: PriceLike, observables: Mapping[str, Any]) -> str:
+        """Sign ``price`` and ``observables``.
+
+        The signed price is the shortest plain decimal for the micro-unit
+        amount (``"0.05"``, ``"10"``), as tokens from earlier releases carry.
+        """
 
-    def sign_estimate(self, price: Decimal, observables: Mapping[str, Any]) -> str:
-        header = {"alg": "HS256", "kid": self.key_id, "typ": "JOSE"}
         payload = {
-            "price": str(price),
+            "price": format(Price.parse(price).to_decimal().normalize(), "f"),
             "observables": observables,
         }
-        encoded_header = _b64url(json.dumps(header, separators=(",", ":")).encode("utf-8"))
         encoded_payload = _b64url(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
-        signing_input = f"{encoded_header}.{encoded_payload}".encode("ascii")
-        digest = hmac.new(self._secret, signing_input, sha256).digest()
-        encoded_signature = _b64url(digest)
-        return f"{encoded_header}.{encoded_payload}.{encoded_signature}"
+        mac = self._keyed.copy()
+        mac.update(encoded_payload.encode("ascii"))
+        encoded_signature = _b64url(mac.digest())
+        return f"{self._header_prefix}{encoded_payload}.{encoded_signature}"
+
+    def sign_many(
+        self, estimates: Iterable[Tuple[PriceLike, Mapping[str, Any]]]
+    ) -> List[str]:
+        """Sign ``(price, observables)`` pairs, returning tokens in input order."""
+
+        sign = self.sign_estimate
+        return [sign(price, observables) for price, observables in estimates]
 
     @property
     def secret(self) -> bytes:
@@ -92,52 +119,198 @@ class JWKSManager:
 
 def estimate(
     *,
-    estimated_price: Decimal,
+    estimated_price: PriceLike,
     observables: Optional[Mapping[str, Any]] = None,
     signer: Optional[Signer] = None,
 ) -> EstimateResult:
     """Construct an estimate response and optionally sign it."""
 
+    price = Price.parse(estimated_price)
     observables = observables or {}
-    signature = signer.sign_estimate(estimated_price, observables) if signer else None
+    signature = None
+    if signer:
+        with timed("sign"):
+            signature = signer.sign_estimate(price, observables)
     return EstimateResult(
-        estimated_price=estimated_price,
+        estimated_price=price,
         observables=dict(observables),
         price_signature=signature,
     )
 
 
+class VerifiedTokenCache:
+    """Bounded LRU/TTL cache of tokens that already passed verification.
+
+    Entries are keyed by the SHA-256 of the token and remember the ``kid`` and
+    secret they were verified with. A hit re-resolves the ``kid`` and is only
+    honoured while the resolver still returns the same secret, so rotating or
+    removing a key invalidates its cached tokens without explicit calls.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = 4096,
+        ttl_seconds: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[bytes, Tuple[str, bytes, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, token: str, key_resolver: Callable[[str], Optional[bytes]]) -> bool:
+        """Return True when ``token`` is cached and its key has not rotated."""
+
+        key = _token_key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            kid, secret, expires_at = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                return False
+            self._entries.move_to_end(key)
+        current = key_resolver(kid)
+        if current is None or not hmac.compare_digest(current, secret):
+            self.invalidate(kid)
+            return False
+        return True
+
+    def store(self, token: str, kid: str, secret: bytes) -> None:
+        key = _token_key(token)
+        with self._lock:
+            self._entries[key] = (kid, secret, self._clock() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, kid: Optional[str] = None) -> None:
+        """Drop cached tokens for ``kid`` (or every token when omitted)."""
+
+        with self._lock:
+            if kid is None:
+                self._entries.clear()
+                return
+            for key in [key for key, entry in self._entries.items() if entry[0] == kid]:
+                del self._entries[key]
+
+
 def verify_signature(
     *,
     token: str,
     key_resolver: Callable[[str], Optional[bytes]],
+    cache: Optional[VerifiedTokenCache] = None,
 ) -> bool:
     """Validate an HS256 signature and return True when it matches."""
 
+    with timed("verify"):
+        return _verify_signature(token, key_resolver, cache)
+
+
+def _verify_signature(
+    token: str,
+    key_resolver: Callable[[str], Optional[bytes]],
+    cache: Optional[VerifiedTokenCache],
+) -> bool:
+    if cache is not None and cache.lookup(token, key_resolver):
+        return True
+
+    parsed = _parse_token(token)
+    if parsed is None:
+        return False
+    kid, signing_input, provided = parsed
+
+    secret = key_resolver(kid)
+    if secret is None:
+        return False
+
+    if not _check_hmac(secret, signing_input, provided):
+        return False
+    if cache is not None:
+        cache.store(token, kid, secret)
+    return True
+
+
+def verify_many(
+    tokens: Iterable[str],
+    *,
+    key_resolver: Callable[[str], Optional[bytes]],
+    cache: Optional[VerifiedTokenCache] = None,
+) -> List[bool]:
+    """Verify a batch of tokens, resolving each ``kid`` once per batch.
+
+    Results are returned in input order.
+    """
+
+    with timed("verify"):
+        return _verify_many(tokens, key_resolver, cache)
+
+
+def _verify_many(
+    tokens: Iterable[str],
+    key_resolver: Callable[[str], Optional[bytes]],
+    cache: Optional[VerifiedTokenCache],
+) -> List[bool]:
+    secrets: Dict[str, Optional[bytes]] = {}
+
+    def resolve(kid: str) -> Optional[bytes]:
+        if kid not in secrets:
+            secrets[kid] = key_resolver(kid)
+        return secrets[kid]
+
+    results: List[bool] = []
+    for token in tokens:
+        if cache is not None and cache.lookup(token, resolve):
+            results.append(True)
+            continue
+        parsed = _parse_token(token)
+        if parsed is None:
+            results.append(False)
+            continue
+        kid, signing_input, provided = parsed
+        secret = resolve(kid)
+        ok = secret is not None and _check_hmac(secret, signing_input, provided)
+        if ok and cache is not None and secret is not None:
+            cache.store(token, kid, secret)
+        results.append(ok)
+    return results
+
+
+def _parse_token(token: str) -> Optional[Tuple[str, bytes, bytes]]:
     try:
         encoded_header, encoded_payload, encoded_signature = token.split(".")
     except ValueError:
-        return False
+        return None
 
     try:
         header = json.loads(base64.urlsafe_b64decode(_pad_b64(encoded_header)))
-    except json.JSONDecodeError:
-        return False
+        provided = base64.urlsafe_b64decode(_pad_b64(encoded_signature))
+        signing_input = f"{encoded_header}.{encoded_payload}".encode("ascii")
+    except (binascii.Error, ValueError):
+        return None
 
-    kid = header.get("kid")
+    kid = header.get("kid") if isinstance(header, dict) else None
     if not kid:
-        return False
+        return None
+
+    return str(kid), signing_input, provided
 
-    secret = key_resolver(str(kid))
-    if secret is None:
-        return False
 
-    signing_input = f"{encoded_header}.{encoded_payload}".encode("ascii")
+def _check_hmac(secret: bytes, signing_input: bytes, provided: bytes) -> bool:
     expected = hmac.new(secret, signing_input, sha256).digest()
-    provided = base64.urlsafe_b64decode(_pad_b64(encoded_signature))
     return hmac.compare_digest(expected, provided)
 
 
+def _token_key(token: str) -> bytes:
+    return sha256(token.encode("utf-8")).digest()
+
+
 def _pad_b64(segment: str) -> bytes:
     padding = "=" * ((4 - len(segment) % 4) % 4)
     return (segment + padding).encode("ascii")
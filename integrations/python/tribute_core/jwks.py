@@ -0,0 +1,149 @@
+"""Remote JWKS resolution for estimate signature verification."""
+
+from __future__ import annotations
+
+import json
+import re
+import threading
+import time
+import urllib.request
+from pathlib import Path
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple, Union
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+Fetcher = Callable[[str], Tuple[bytes, Optional[float]]]
+
+
+def _default_secret(key: Mapping[str, Any]) -> Optional[bytes]:
+    secret = key.get("k")
+    if not secret:
+        return None
+    return str(secret).encode("utf-8")
+
+
+def fetch_jwks_source(source: str, *, timeout: float = 5.0) -> Tuple[bytes, Optional[float]]:
+    """Read a JWKS document from a URL or file, returning it with its max-age."""
+
+    if source.startswith(("http://", "https://")):
+        with urllib.request.urlopen(source, timeout=timeout) as response:
+            body = response.read()
+            match = _MAX_AGE.search(response.headers.get("Cache-Control", ""))
+        return body, float(match.group(1)) if match else None
+    if source.startswith("file://"):
+        source = source[len("file://") :]
+    return Path(source).read_bytes(), None
+
+
+class _Flight:
+    __slots__ = ("done", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.error: Optional[BaseException] = None
+
+
+class RemoteJWKSResolver:
+    """Resolve signing secrets by ``kid`` from a remote or on-disk JWKS.
+
+    Keys are indexed by ``kid``. Once warm, :meth:`resolve` only reads the
+    index: when the document nears expiry a background thread refreshes it and
+    callers keep using the current keys meanwhile. Only a cold cache or an
+    unknown ``kid`` fetches on the request path, and concurrent callers share
+    a single in-flight fetch. Unknown kids re-fetch at most once per
+    ``miss_interval`` seconds. Instances are callable, so they can be passed
+    directly as ``key_resolver``.
+    """
+
+    def __init__(
+        self,
+        source: Union[str, Path],
+        *,
+        refresh_interval: float = 300.0,
+        refresh_margin: float = 30.0,
+        miss_interval: float = 10.0,
+        fetch_timeout: float = 5.0,
+        fetcher: Optional[Fetcher] = None,
+        secret_decoder: Callable[[Mapping[str, Any]], Optional[bytes]] = _default_secret,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.source = str(source)
+        self.refresh_interval = refresh_interval
+        self.refresh_margin = refresh_margin
+        self.miss_interval = miss_interval
+        self.fetch_timeout = fetch_timeout
+        self._fetcher = fetcher or (lambda src: fetch_jwks_source(src, timeout=fetch_timeout))
+        self._secret_decoder = secret_decoder
+        self._clock = clock
+        self._keys: Dict[str, Optional[bytes]] = {}
+        self._expires_at: Optional[float] = None
+        self._fetched_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._flight: Optional[_Flight] = None
+        self.fetch_count = 0
+
+    def __call__(self, kid: str) -> Optional[bytes]:
+        return self.resolve(kid)
+
+    @property
+    def warm(self) -> bool:
+        return self._expires_at is not None
+
+    def resolve(self, kid: str) -> Optional[bytes]:
+        now = self._clock()
+        recently_fetched = self._fetched_at is not None and now - self._fetched_at < self.miss_interval
+        keys = self._keys
+        expires_at = self._expires_at
+        if expires_at is not None and kid in keys:
+            if now >= expires_at - self.refresh_margin and not recently_fetched:
+                self._fetch(wait=False)
+            return keys[kid]
+        if not recently_fetched:
+            self._fetch(wait=True)
+        return self._keys.get(kid)
+
+    def refresh(self) -> None:
+        """Fetch the JWKS now, joining an in-flight fetch when there is one."""
+
+        self._fetch(wait=True, raise_errors=True)
+
+    def _fetch(self, *, wait: bool, raise_errors: bool = False) -> None:
+        with self._lock:
+            flight = self._flight
+            leader = flight is None
+            if flight is None:
+                flight = self._flight = _Flight()
+        if leader:
+            if wait:
+                self._run_flight(flight)
+            else:
+                threading.Thread(target=self._run_flight, args=(flight,), daemon=True).start()
+                return
+        elif not wait:
+            return
+        else:
+            flight.done.wait(self.fetch_timeout)
+        if raise_errors and flight.error is not None:
+            raise flight.error
+
+    def _run_flight(self, flight: _Flight) -> None:
+        try:
+            body, max_age = self._fetcher(self.source)
+            document = json.loads(body)
+            keys = {
+                str(key["kid"]): self._secret_decoder(key)
+                for key in document.get("keys", [])
+                if isinstance(key, dict) and key.get("kid")
+            }
+            now = self._clock()
+            self._keys = keys
+            self._fetched_at = now
+            self._expires_at = now + (max_age if max_age is not None else self.refresh_interval)
+        except Exception as exc:  # surfaced to refresh(); resolve() keeps stale keys
+            flight.error = exc
+            self._fetched_at = self._clock()
+        finally:
+            with self._lock:
+                self.fetch_count += 1
+                self._flight = None
+            flight.done.set()
@@ -0,0 +1,299 @@
+"""Per-stage latency histograms with Prometheus text export.
+
+Instrumentation is off until a recorder is installed with
+:func:`set_recorder`; until then every timing site costs one global lookup.
+Stages recorded by the core and the adapters:
+
+- ``request``: the whole request as seen by the adapter, handler included.
+- ``handler``: the route handler alone, so ``request - handler`` is what the
+  integration adds.
+- ``canonicalize``, ``estimate``, ``sign``, ``verify`` and ``usage``.
+
+Observations are labelled with the route template set by the adapter for
+the current request (see :func:`route_scope`). The same timing sites open
+trace spans when a tracer is installed (see :mod:`tribute_core.tracing`).
+"""
+
+from __future__ import annotations
+
+import inspect
+import random
+import threading
+import weakref
+from bisect import bisect_left
+from contextvars import ContextVar
+from functools import wraps
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar, cast
+
+from .tracing import current_trace, get_tracer, trace_request
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.00001,
+    0.000025,
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_ROUTE: ContextVar[str] = ContextVar("tribute_route", default="")
+
+# Per (stage, route): one count per bucket plus the +Inf overflow, then the sum.
+_Series = List[Any]
+_Shard = Dict[Tuple[str, str], _Series]
+
+
+class LatencyRecorder:
+    """Fixed-bucket latency histograms keyed by stage and route.
+
+    Each thread writes to its own shard, so recording takes no lock; shards
+    are merged when :meth:`render_prometheus` or :meth:`snapshot` runs. When
+    a thread exits, its shard is folded into a retired aggregate, so thread
+    churn does not grow the recorder. With
+    ``sample_rate`` below 1 only that fraction of timings is taken, which
+    keeps bucket proportions but scales counts down.
+    """
+
+    def __init__(self, *, buckets: Sequence[float] = DEFAULT_BUCKETS, sample_rate: float = 1.0):
+        self.buckets = tuple(sorted(buckets))
+        self.sample_rate = sample_rate
+        self._local = threading.local()
+        # Live threads' shards by id(); equal dicts must not be confused.
+        self._shards: Dict[int, _Shard] = {}
+        self._retired: _Shard = {}
+        self._lock = threading.Lock()
+
+    def sampled(self) -> bool:
+        rate = self.sample_rate
+        return rate >= 1.0 or (rate > 0.0 and random.random() < rate)
+
+    def observe(self, stage: str, seconds: float, route: Optional[str] = None) -> None:
+        key = (stage, _ROUTE.get() if route is None else route)
+        shard = self._shard()
+        series = shard.get(key)
+        if series is None:
+            series = shard[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, seconds)] += 1
+        series[-1] += seconds
+
+    def snapshot(self) -> Dict[Tuple[str, str], Tuple[List[int], float]]:
+        """Merge the per-thread shards into ``{(stage, route): (counts, sum)}``."""
+
+        merged: Dict[Tuple[str, str], Tuple[List[int], float]] = {}
+        with self._lock:
+            # Copied under the lock so a shard being retired is counted once.
+            shards = list(self._shards.values())
+            shards.append({key: list(series) for key, series in self._retired.items()})
+        for shard in shards:
+            for key, series in list(shard.items()):
+                values = list(series)
+                counts, total = merged.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+                merged[key] = ([a + b for a, b in zip(counts, values[:-1])], total + values[-1])
+        return merged
+
+    def render_prometheus(self, *, name: str = "tribute_stage_duration_seconds") -> str:
+        """Render every histogram in the Prometheus text exposition format."""
+
+        lines = [
+            f"# HELP {name} Time spent in Tribute integration stages.",
+            f"# TYPE {name} histogram",
+        ]
+        bounds = [_format_float(bound) for bound in self.buckets] + ["+Inf"]
+        for (stage, route), (counts, total) in sorted(self.snapshot().items()):
+            labels = f'stage="{_escape(stage)}",route="{_escape(route)}"'
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"{name}_sum{{{labels}}} {_format_float(total)}")
+            lines.append(f"{name}_count{{{labels}}} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            for shard in self._shards.values():
+                shard.clear()
+            self._retired.clear()
+
+    def _shard(self) -> _Shard:
+        holder = getattr(self._local, "holder", None)
+        if holder is None:
+            # The thread-local holder is released when its thread exits,
+            # which hands the shard to _retire_shard.
+            holder = self._local.holder = _ShardHolder()
+            finalizer = weakref.finalize(holder, _retire_shard, weakref.ref(self), holder.shard)
+            finalizer.atexit = False
+            with self._lock:
+                self._shards[id(holder.shard)] = holder.shard
+        return holder.shard
+
+    def _retire(self, shard: _Shard) -> None:
+        with self._lock:
+            del self._shards[id(shard)]
+            retired = self._retired
+            for key, series in shard.items():
+                total = retired.get(key)
+                if total is None:
+                    retired[key] = list(series)
+                else:
+                    retired[key] = [a + b for a, b in zip(total, series)]
+
+
+class _ShardHolder:
+    __slots__ = ("shard", "__weakref__")
+
+    def __init__(self) -> None:
+        self.shard: _Shard = {}
+
+
+def _retire_shard(recorder_ref: "weakref.ref[LatencyRecorder]", shard: _Shard) -> None:
+    recorder = recorder_ref()
+    if recorder is not None:
+        recorder._retire(shard)
+
+
+class _Timer:
+    __slots__ = ("_recorder", "_stage", "_span", "_start")
+
+    def __init__(self, recorder: LatencyRecorder, stage: str, span: Any = None):
+        self._recorder = recorder
+        self._stage = stage
+        self._span = span
+
+    def __enter__(self) -> "_Timer":
+        if self._span is not None:
+            self._span.__enter__()
+        self._start = perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._recorder.observe(self._stage, perf_counter() - self._start)
+        if self._span is not None:
+            self._span.__exit__(*exc)
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopTimer":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+
+_NOOP = _NoopTimer()
+_recorder: Optional[LatencyRecorder] = None
+
+
+def get_recorder() -> Optional[LatencyRecorder]:
+    return _recorder
+
+
+def set_recorder(recorder: Optional[LatencyRecorder]) -> Optional[LatencyRecorder]:
+    """Install the process-wide recorder (``None`` turns timing off); returns the previous one."""
+
+    global _recorder
+    previous = _recorder
+    _recorder = recorder
+    return previous
+
+
+def timed(stage: str) -> Any:
+    """Context manager timing ``stage`` for the current route, if recording is on.
+
+    Inside a traced request the stage is also recorded as a span.
+    """
+
+    recorder = _recorder
+    if recorder is not None and not recorder.sampled():
+        recorder = None
+    trace = current_trace()
+    if recorder is None:
+        return _NOOP if trace is None else trace.span(stage)
+    return _Timer(recorder, stage, None if trace is None else trace.span(stage))
+
+
+def route_scope(route: Optional[str]) -> "_RouteScope":
+    """Label observations made inside the ``with`` block with ``route``."""
+
+    return _RouteScope(route or "")
+
+
+class _RouteScope:
+    __slots__ = ("_route", "_token")
+
+    def __init__(self, route: str):
+        self._route = route
+
+    def __enter__(self) -> "_RouteScope":
+        self._token = _ROUTE.set(self._route)
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        _ROUTE.reset(self._token)
+
+
+def instrument(func: F, stage: str, *, route: Optional[str] = None) -> F:
+    """Wrap ``func`` (sync or coroutine) so each call is timed as ``stage``.
+
+    With ``route`` the call is a request entry point: it runs inside
+    :func:`route_scope` and starts a trace when a tracer is installed. While
+    neither a recorder nor a tracer is installed the wrapper only adds a call
+    frame.
+    """
+
+    if inspect.iscoroutinefunction(func):
+
+        @wraps(func)
+        async def async_timed(*args: Any, **kwargs: Any) -> Any:
+            if _recorder is None and get_tracer() is None:
+                return await func(*args, **kwargs)
+            if route is None:
+                with timed(stage):
+                    return await func(*args, **kwargs)
+            with route_scope(route), trace_request(route), timed(stage):
+                return await func(*args, **kwargs)
+
+        return cast(F, async_timed)
+
+    @wraps(func)
+    def timed_call(*args: Any, **kwargs: Any) -> Any:
+        if _recorder is None and get_tracer() is None:
+            return func(*args, **kwargs)
+        if route is None:
+            with timed(stage):
+                return func(*args, **kwargs)
+        with route_scope(route), trace_request(route), timed(stage):
+            return func(*args, **kwargs)
+
+    return cast(F, timed_call)
+
+
+def current_route() -> str:
+    return _ROUTE.get()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_float(value: float) -> str:
+    return repr(float(value))
+
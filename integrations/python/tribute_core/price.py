@@ -0,0 +1,87 @@
+"""Fixed-point prices in integer micro-units."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Iterable, Union
+
+MICROS_PER_UNIT = 1_000_000
+_MICRO = Decimal("0.000001")
+
+PriceLike = Union["Price", Decimal, int, float, str]
+
+
+@dataclass(frozen=True, order=True)
+class Price:
+    """An amount stored as an integer count of micro-units (1e-6 of the currency).
+
+    Arithmetic between prices is plain integer arithmetic, so sums are exact
+    and cheap. Convert at the boundaries with :meth:`parse` (decimal strings,
+    ``Decimal``, whole-unit ``int`` and ``float``, rounded half-up to the
+    nearest micro-unit) and ``str()``, which renders six decimal places as
+    sent on the wire.
+    """
+
+    __slots__ = ("micros",)
+
+    micros: int
+
+    @classmethod
+    def parse(cls, value: PriceLike) -> "Price":
+        if isinstance(value, Price):
+            return value
+        if isinstance(value, int) and not isinstance(value, bool):
+            return cls(value * MICROS_PER_UNIT)
+        if isinstance(value, float):
+            # repr() is the shortest exact round-trip, so 0.1 stays 0.1.
+            value = repr(value)
+        return cls.from_decimal(Decimal(value))
+
+    @classmethod
+    def from_decimal(cls, value: Decimal) -> "Price":
+        return cls(int(value.quantize(_MICRO, rounding=ROUND_HALF_UP).scaleb(6)))
+
+    @staticmethod
+    def sum(prices: Iterable["Price"]) -> "Price":
+        return Price(sum(price.micros for price in prices))
+
+    def to_decimal(self) -> Decimal:
+        return Decimal(self.micros).scaleb(-6)
+
+    def __float__(self) -> float:
+        return self.micros / MICROS_PER_UNIT
+
+    def __bool__(self) -> bool:
+        return self.micros != 0
+
+    def __add__(self, other: "Price") -> "Price":
+        if not isinstance(other, Price):
+            return NotImplemented
+        return Price(self.micros + other.micros)
+
+    def __radd__(self, other: object) -> "Price":
+        # Lets the builtin sum() start from 0.
+        if other == 0:
+            return self
+        return NotImplemented
+
+    def __sub__(self, other: "Price") -> "Price":
+        if not isinstance(other, Price):
+            return NotImplemented
+        return Price(self.micros - other.micros)
+
+    def __neg__(self) -> "Price":
+        return Price(-self.micros)
+
+    def __mul__(self, factor: int) -> "Price":
+        if not isinstance(factor, int):
+            return NotImplemented
+        return Price(self.micros * factor)
+
+    __rmul__ = __mul__
+
+    def __str__(self) -> str:
+        sign = "-" if self.micros < 0 else ""
+        whole, frac = divmod(abs(self.micros), MICROS_PER_UNIT)
+        return f"{sign}{whole}.{frac:06d}"
@@ -0,0 +1,272 @@
+"""Compiled pricing rules from the merchant policy (``pricing.rules``)."""
+
+from __future__ import annotations
+
+import json
+import re
+import sys
+import threading
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Union
+
+from .canonicalization import CanonicalBody, CanonicalRequest
+from .price import Price
+
+_MB = 1024 * 1024
+_ZERO = Price(0)
+_PARAM = re.compile(r"\{[^/]+\}")
+
+
+@dataclass(frozen=True)
+class PriceExpression:
+    """``flat + perMbReq * request MB + perMbResp * response MB``, floored at ``min``.
+
+    Every coefficient is a :class:`Price` (per-MB rates are micro-units per
+    MB), and :meth:`evaluate` works in integers: the byte-proportional terms
+    are summed exactly and rounded half-up to a micro-unit once.
+    """
+
+    flat: Price = _ZERO
+    per_mb_request: Price = _ZERO
+    per_mb_response: Price = _ZERO
+    minimum: Price = _ZERO
+
+    @classmethod
+    def from_policy(cls, price: Mapping[str, Any]) -> "PriceExpression":
+        return cls(
+            flat=Price.parse(price.get("flat", 0)),
+            per_mb_request=Price.parse(price.get("perMbReq", 0)),
+            per_mb_response=Price.parse(price.get("perMbResp", 0)),
+            minimum=Price.parse(price.get("min", 0)),
+        )
+
+    def evaluate(self, *, request_bytes: int = 0, response_bytes: int = 0) -> Price:
+        return Price(
+            self.micros(
+                self.flat.micros,
+                self.per_mb_request.micros,
+                self.per_mb_response.micros,
+                self.minimum.micros,
+                request_bytes=request_bytes,
+                response_bytes=response_bytes,
+            )
+        )
+
+    @staticmethod
+    def micros(
+        flat: Any,
+        per_mb_request: Any,
+        per_mb_response: Any,
+        minimum: Any,
+        *,
+        request_bytes: Any,
+        response_bytes: Any,
+        floor: Any = max,
+    ) -> Any:
+        """The formula behind :meth:`evaluate` on raw micro-unit coefficients.
+
+        Plain integers give one price; integer arrays give one price per row
+        when ``floor`` is an element-wise maximum such as ``numpy.maximum``.
+        """
+
+        scaled = per_mb_request * request_bytes + per_mb_response * response_bytes
+        return floor(flat + (scaled + _MB // 2) // _MB, minimum)
+
+
+@dataclass(frozen=True)
+class PricingRule:
+    index: int
+    method: str
+    path: str
+    price: PriceExpression
+
+
+@dataclass
+class _Node:
+    literal: Dict[str, "_Node"] = field(default_factory=dict)
+    param: Optional["_Node"] = None
+    patterns: List[Tuple["re.Pattern[str]", "_Node"]] = field(default_factory=list)
+    rule: Optional[PricingRule] = None
+    # Lowest rule index anywhere below this node; lookups skip subtrees
+    # that cannot beat the best match found so far.
+    min_index: int = sys.maxsize
+
+
+class CompiledPricing:
+    """Immutable rule table indexed by method, then a path-segment trie.
+
+    Literal segments are dict lookups, ``{param}`` segments share one wildcard
+    branch and mixed segments such as ``{name}.json`` fall back to a regex.
+    When several rules match, the first one declared wins, as in the proxy.
+
+    A lookup tries the branches that match a segment in order of the lowest
+    rule index below them and skips any branch that cannot beat the best
+    match already found. Literal-only tables are walked once; wildcard
+    branches may still be revisited after a dead end, which
+    ``benchmarks/bench_pricing.py`` measures for the worst case.
+    """
+
+    def __init__(self, rules: List[PricingRule], *, policy_version: int):
+        self.policy_version = policy_version
+        self.rules = tuple(rules)
+        self._roots: Dict[str, _Node] = {}
+        for rule in rules:
+            self._insert(rule)
+
+    @classmethod
+    def from_policy(cls, pricing: Mapping[str, Any]) -> "CompiledPricing":
+        """Compile the ``pricing`` section of a merchant config."""
+
+        rules = [
+            PricingRule(
+                index=index,
+                method=str(rule["match"]["method"]).upper(),
+                path=str(rule["match"]["path"]),
+                price=PriceExpression.from_policy(rule.get("price") or {}),
+            )
+            for index, rule in enumerate(pricing.get("rules") or ())
+        ]
+        return cls(rules, policy_version=int(pricing.get("policyVersion", 0)))
+
+    def _insert(self, rule: PricingRule) -> None:
+        node = self._roots.setdefault(rule.method, _Node())
+        node.min_index = min(node.min_index, rule.index)
+        for segment in rule.path.split("/"):
+            if "{" not in segment:
+                node = node.literal.setdefault(segment, _Node())
+            elif _PARAM.fullmatch(segment):
+                if node.param is None:
+                    node.param = _Node()
+                node = node.param
+            else:
+                pattern = "[^/]+".join(re.escape(part) for part in _PARAM.split(segment))
+                child = next((n for p, n in node.patterns if p.pattern == pattern), None)
+                if child is None:
+                    child = _Node()
+                    node.patterns.append((re.compile(pattern), child))
+                node = child
+            node.min_index = min(node.min_index, rule.index)
+        if node.rule is None:
+            node.rule = rule
+
+    def match(self, method: str, path: str) -> Optional[PricingRule]:
+        root = self._roots.get(method.upper())
+        if root is None:
+            return None
+        return _walk(root, path.split("/"), 0, sys.maxsize)
+
+    def price(
+        self, method: str, path: str, *, request_bytes: int = 0, response_bytes: int = 0
+    ) -> Price:
+        """Price a request; unmatched routes are free, as in the proxy."""
+
+        rule = self.match(method, path)
+        if rule is None:
+            return _ZERO
+        return rule.price.evaluate(request_bytes=request_bytes, response_bytes=response_bytes)
+
+
+def _walk(node: _Node, segments: List[str], depth: int, bound: int) -> Optional[PricingRule]:
+    """Return the lowest-index rule below ``node`` matching ``segments``, if below ``bound``."""
+
+    if depth == len(segments):
+        rule = node.rule
+        return rule if rule is not None and rule.index < bound else None
+    segment = segments[depth]
+    literal = node.literal.get(segment)
+    if not segment or (node.param is None and not node.patterns):
+        if literal is None or literal.min_index >= bound:
+            return None
+        return _walk(literal, segments, depth + 1, bound)
+    candidates = [literal, node.param]
+    candidates.extend(child for pattern, child in node.patterns if pattern.fullmatch(segment))
+    best: Optional[PricingRule] = None
+    for child in sorted((c for c in candidates if c is not None), key=lambda c: c.min_index):
+        if child.min_index >= bound:
+            break
+        found = _walk(child, segments, depth + 1, bound)
+        if found is not None:
+            best, bound = found, found.index
+    return best
+
+
+class PricingEngine:
+    """Holds the active :class:`CompiledPricing` and swaps it on policy changes.
+
+    :meth:`load` recompiles only when ``policyVersion`` differs from the active
+    table; readers always see either the old or the new table, never a mix.
+    """
+
+    def __init__(self, pricing: Optional[Mapping[str, Any]] = None):
+        self._compiled = CompiledPricing([], policy_version=0)
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+        if pricing is not None:
+            self.load(pricing)
+
+    @property
+    def compiled(self) -> CompiledPricing:
+        return self._compiled
+
+    @property
+    def policy_version(self) -> int:
+        return self._compiled.policy_version
+
+    def load(self, policy: Union[Mapping[str, Any], bytes, str]) -> bool:
+        """Load a merchant config or its ``pricing`` section; return True if swapped."""
+
+        if isinstance(policy, (bytes, str)):
+            policy = json.loads(policy, parse_float=Decimal)
+        pricing = policy.get("pricing", policy)
+        version = int(pricing.get("policyVersion", 0))
+        with self._lock:
+            if version == self._version:
+                return False
+            self._compiled = CompiledPricing.from_policy(pricing)
+            self._version = version
+        return True
+
+    def price(
+        self, method: str, path: str, *, request_bytes: int = 0, response_bytes: int = 0
+    ) -> Price:
+        return self._compiled.price(
+            method, path, request_bytes=request_bytes, response_bytes=response_bytes
+        )
+
+    def price_request(
+        self,
+        request: CanonicalRequest,
+        *,
+        request_bytes: Optional[int] = None,
+        response_bytes: int = 0,
+    ) -> Price:
+        """Price a canonical request.
+
+        ``request_bytes`` defaults to the body length as received, which is
+        what the proxy bills, even for streamed bodies that did not retain
+        their payload. Bodies without a recorded size fall back to the
+        canonical payload length.
+        """
+
+        if request_bytes is None:
+            body = request.body
+            request_bytes = 0 if body is None else _body_size(body)
+        return self._compiled.price(
+            request.method,
+            request.path_template,
+            request_bytes=request_bytes,
+            response_bytes=response_bytes,
+        )
+
+
+def _body_size(body: CanonicalBody) -> int:
+    if body.size is not None:
+        return body.size
+    if not body.spooled:
+        return len(body.raw)
+    stream = body.open()
+    stream.seek(0, 2)
+    size = stream.tell()
+    stream.seek(0)
+    return size
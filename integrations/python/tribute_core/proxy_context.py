@@ -0,0 +1,137 @@
+"""Verification of the proxy's ``X-Proxy-Context`` envelope."""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import hmac
+import time
+from dataclasses import dataclass
+from hashlib import sha256
+from typing import Any, Callable, FrozenSet, Iterable, Mapping, Optional, Union
+
+from .caching import TTLCache
+from .canonical_json import json_loads
+
+PROXY_CONTEXT_HEADER = "x-proxy-context"
+_ISSUER = "tribute"
+
+
+@dataclass(frozen=True)
+class ProxyContext:
+    """Claims the proxy forwards about the caller and the paid request."""
+
+    __slots__ = ("sub", "rid", "inputs_hash", "receipt_nonce", "aud", "iat", "exp", "method", "claims")
+
+    sub: str
+    rid: Optional[str]
+    inputs_hash: Optional[str]
+    receipt_nonce: Optional[str]
+    aud: str
+    iat: int
+    exp: int
+    method: Optional[str]
+    claims: Mapping[str, Any]
+
+
+class ProxyContextVerifier:
+    """Check and decode ``X-Proxy-Context`` headers.
+
+    The envelope is ``base64(JSON) "." base64url(sha256(JSON))`` as built by
+    the edge proxy. The digest is unkeyed, so it guards against truncation
+    and corruption, not forgery; only trust the context on origins that are
+    reachable through the proxy alone.
+
+    :meth:`verify` enforces ``iss``, ``exp`` (with ``leeway_seconds``) and
+    ``aud``. The audience is ``audience`` when configured, otherwise the
+    request host passed by the adapter. Decoded contexts are cached by
+    envelope until they expire, so retries of the same request skip the
+    base64, digest and JSON work; expiry and audience are still checked on
+    every call.
+    """
+
+    def __init__(
+        self,
+        *,
+        audience: Union[str, Iterable[str], None] = None,
+        leeway_seconds: float = 0.0,
+        max_entries: int = 4096,
+        ttl_seconds: float = 300.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        if isinstance(audience, str):
+            audience = (audience,)
+        self.audience: Optional[FrozenSet[str]] = frozenset(audience) if audience is not None else None
+        self.leeway_seconds = leeway_seconds
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._cache: TTLCache[ProxyContext] = TTLCache(max_entries=max_entries, clock=clock)
+
+    def verify(self, header: Optional[str], *, host: Optional[str] = None) -> Optional[ProxyContext]:
+        """Return the decoded context, or None when missing, invalid or not for us."""
+
+        if not header:
+            return None
+        context = self._cache.get(header)
+        if context is None:
+            context = decode_proxy_context(header)
+            if context is None:
+                return None
+            ttl = min(self.ttl_seconds, context.exp + self.leeway_seconds - self._clock())
+            self._cache.set(header, context, ttl_seconds=ttl)
+        if context.exp + self.leeway_seconds <= self._clock():
+            return None
+        if not self._audience_matches(context.aud, host):
+            return None
+        return context
+
+    def _audience_matches(self, aud: str, host: Optional[str]) -> bool:
+        if self.audience is not None:
+            return aud in self.audience
+        if not host:
+            return False
+        return aud == host or aud == host.rsplit(":", 1)[0]
+
+
+def decode_proxy_context(header: str) -> Optional[ProxyContext]:
+    """Check the envelope digest and decode its claims, without expiry checks."""
+
+    encoded, sep, signature = header.rpartition(".")
+    if not sep:
+        return None
+    try:
+        raw = base64.b64decode(encoded, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    # btoa() encodes UTF-16 code units below 256 as single bytes, while the
+    # digest covers the UTF-8 encoding of the same string.
+    signed = raw if raw.isascii() else raw.decode("latin-1").encode("utf-8")
+    expected = base64.urlsafe_b64encode(sha256(signed).digest()).rstrip(b"=")
+    if not hmac.compare_digest(expected, signature.encode("ascii", "replace")):
+        return None
+    try:
+        claims = json_loads(signed)
+    except ValueError:
+        return None
+    if not isinstance(claims, dict) or claims.get("iss") != _ISSUER:
+        return None
+    sub, aud, iat, exp = claims.get("sub"), claims.get("aud"), claims.get("iat"), claims.get("exp")
+    if not isinstance(sub, str) or not isinstance(aud, str):
+        return None
+    if not isinstance(exp, int) or not isinstance(iat, int):
+        return None
+    return ProxyContext(
+        sub=sub,
+        rid=_optional_str(claims.get("rid")),
+        inputs_hash=_optional_str(claims.get("inputs_hash")),
+        receipt_nonce=_optional_str(claims.get("receipt_nonce")),
+        aud=aud,
+        iat=iat,
+        exp=exp,
+        method=_optional_str(claims.get("method")),
+        claims=claims,
+    )
+
+
+def _optional_str(value: Any) -> Optional[str]:
+    return value if isinstance(value, str) else None
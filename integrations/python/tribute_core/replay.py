@@ -0,0 +1,231 @@
+"""Receipt-nonce replay detection with a fixed memory budget."""
+
+from __future__ import annotations
+
+import math
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+from hashlib import blake2b
+from typing import Any, Callable, Dict, List, Optional
+
+from .proxy_context import ProxyContext
+
+try:  # pragma: no cover - POSIX only
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+REPLAY_STATUS = 409
+
+_MAGIC = 0x54524E43  # "TRNC"
+_PARAMS = struct.Struct("<4q")
+_EPOCH = struct.Struct("<q")
+
+
+def replay_error(context: ProxyContext) -> Dict[str, Any]:
+    """JSON body for a rejected replay, in the style of the proxy's 409s."""
+
+    return {"error": "replay", "rid": context.rid, "receipt_nonce": context.receipt_nonce}
+
+
+class ReplayGuard:
+    """Reject receipt nonces already seen within ``window_seconds``.
+
+    Nonces go into a rotating Bloom filter: ``generations`` + 1 filters, one
+    per ``window_seconds / generations`` slice of time, with the oldest one
+    cleared and reused as time moves on. A nonce stays visible for at least
+    the whole window, and memory is fixed by ``capacity`` (nonces expected per
+    window, assumed to arrive evenly across its slices) and ``false_positive_rate`` (chance that a fresh nonce is taken
+    for a replay): about 4 bytes per nonce at the defaults, so 50k requests a
+    second over five minutes fit in ~75 MB. There are no false negatives.
+
+    Keep the window at least as long as the proxy context lifetime (300
+    seconds); older envelopes are already refused by
+    :class:`ProxyContextVerifier`.
+
+    With ``shared_name`` the filters live in a POSIX shared-memory segment of
+    that name and updates are serialized with a file lock, so every pre-fork
+    worker on the host sees the same window. Workers must use the same
+    parameters. The segment outlives the processes; call :meth:`unlink` on
+    shutdown to remove it.
+    """
+
+    def __init__(
+        self,
+        *,
+        window_seconds: float = 300.0,
+        capacity: int = 1_000_000,
+        false_positive_rate: float = 1e-6,
+        generations: int = 4,
+        shared_name: Optional[str] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        if capacity <= 0 or generations <= 0 or not 0 < false_positive_rate < 1:
+            raise ValueError("capacity, generations and false_positive_rate must be positive")
+        self.window_seconds = window_seconds
+        self.generations = generations
+        self.slice_seconds = window_seconds / generations
+        self._clock = clock
+        slots = generations + 1
+        per_slice = math.ceil(capacity / generations)
+        # Each lookup consults every slot, so split the error budget between them.
+        bits = math.ceil(-per_slice * math.log(false_positive_rate / slots) / math.log(2) ** 2)
+        self.slot_bytes = -(-bits // 8)
+        self.bits = self.slot_bytes * 8
+        self.hashes = max(1, round(self.bits / per_slice * math.log(2)))
+        self.slots = slots
+        self._header = _PARAMS.size + slots * _EPOCH.size
+        size = self._header + slots * self.slot_bytes
+        self._thread_lock = threading.Lock()
+        self._lock_file: Optional[int] = None
+        self._shm: Any = None
+        if shared_name is None:
+            self._buf = memoryview(bytearray(size))
+            self._init_header()
+        else:
+            self._open_shared(shared_name, size)
+        self.accepted = 0
+        self.rejected = 0
+
+    def accept(self, nonce: str) -> bool:
+        """Record ``nonce``; return False when it was already seen in the window."""
+
+        positions = self._positions(nonce)
+        with self._locked():
+            epoch = int(self._clock() // self.slice_seconds)
+            buf = self._buf
+            current = self._rotate(epoch)
+            for slot in range(self.slots):
+                if self._live(slot, epoch) and self._contains(slot, positions):
+                    self.rejected += 1
+                    return False
+            offset = self._header + current * self.slot_bytes
+            for position in positions:
+                buf[offset + (position >> 3)] |= 1 << (position & 7)
+            self.accepted += 1
+        return True
+
+    def accept_context(self, context: Optional[ProxyContext]) -> bool:
+        """Apply :meth:`accept` to a verified context; contexts without a nonce pass."""
+
+        if context is None or not context.receipt_nonce:
+            return True
+        return self.accept(context.receipt_nonce)
+
+    def close(self) -> None:
+        if self._shm is not None:
+            self._buf.release()
+            self._shm.close()
+            self._shm = None
+        if self._lock_file is not None:
+            os.close(self._lock_file)
+            self._lock_file = None
+
+    def unlink(self) -> None:
+        """Remove the shared-memory segment (shared mode only)."""
+
+        if self._shm is not None:
+            if sys.version_info < (3, 13):
+                from multiprocessing import resource_tracker  # deferred import
+
+                # unlink() unregisters the segment, which _shared_memory already did.
+                resource_tracker.register(self._shm._name, "shared_memory")
+            self._shm.unlink()
+
+    def _positions(self, nonce: str) -> List[int]:
+        digest = blake2b(nonce.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        step = int.from_bytes(digest[8:], "little") | 1
+        bits = self.bits
+        return [(first + index * step) % bits for index in range(self.hashes)]
+
+    def _contains(self, slot: int, positions: List[int]) -> bool:
+        buf = self._buf
+        offset = self._header + slot * self.slot_bytes
+        for position in positions:
+            if not buf[offset + (position >> 3)] & (1 << (position & 7)):
+                return False
+        return True
+
+    def _live(self, slot: int, epoch: int) -> bool:
+        stored = _EPOCH.unpack_from(self._buf, _PARAMS.size + slot * _EPOCH.size)[0]
+        return epoch - self.generations <= stored <= epoch
+
+    def _rotate(self, epoch: int) -> int:
+        slot = epoch % self.slots
+        at = _PARAMS.size + slot * _EPOCH.size
+        if _EPOCH.unpack_from(self._buf, at)[0] != epoch:
+            start = self._header + slot * self.slot_bytes
+            self._buf[start : start + self.slot_bytes] = bytes(self.slot_bytes)
+            _EPOCH.pack_into(self._buf, at, epoch)
+        return slot
+
+    def _init_header(self) -> None:
+        _PARAMS.pack_into(self._buf, 0, _MAGIC, self.slots, self.slot_bytes, self.hashes)
+        for slot in range(self.slots):
+            _EPOCH.pack_into(self._buf, _PARAMS.size + slot * _EPOCH.size, -1)
+
+    def _open_shared(self, name: str, size: int) -> None:
+        if fcntl is None:
+            raise RuntimeError("shared replay guards need fcntl (POSIX)")
+        from multiprocessing import shared_memory  # deferred import
+
+        self._lock_file = os.open(
+            os.path.join(tempfile.gettempdir(), f"{name}.lock"), os.O_RDWR | os.O_CREAT, 0o600
+        )
+        with self._locked():
+            try:
+                self._shm = _shared_memory(shared_memory, name, create=True, size=size)
+                created = True
+            except FileExistsError:
+                self._shm = _shared_memory(shared_memory, name, create=False, size=0)
+                created = False
+            self._buf = self._shm.buf[:size]
+            if created:
+                self._init_header()
+            compatible = self._shm.size >= size and _PARAMS.unpack_from(self._buf, 0) == (
+                _MAGIC,
+                self.slots,
+                self.slot_bytes,
+                self.hashes,
+            )
+        if not compatible:
+            self.close()
+            raise ValueError(f"shared replay guard {name!r} was created with other parameters")
+
+    def _locked(self) -> "_GuardLock":
+        return _GuardLock(self._thread_lock, self._lock_file)
+
+
+class _GuardLock:
+    __slots__ = ("_thread_lock", "_fd")
+
+    def __init__(self, thread_lock: threading.Lock, fd: Optional[int]):
+        self._thread_lock = thread_lock
+        self._fd = fd
+
+    def __enter__(self) -> None:
+        self._thread_lock.acquire()
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+
+    def __exit__(self, *exc: Any) -> None:
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._thread_lock.release()
+
+
+def _shared_memory(module: Any, name: str, *, create: bool, size: int) -> Any:
+    # The segment is owned by the host, not by whichever worker touched it
+    # first, so keep the resource tracker from unlinking it at process exit.
+    if sys.version_info >= (3, 13):
+        return module.SharedMemory(name=name, create=create, size=size, track=False)
+    shm = module.SharedMemory(name=name, create=create, size=size)
+    from multiprocessing import resource_tracker  # deferred import
+
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
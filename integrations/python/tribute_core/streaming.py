@@ -0,0 +1,67 @@
+"""Stream wrappers that canonicalize request bodies as they are read."""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Iterator, List, Optional
+
+from .canonicalization import CanonicalBody, CanonicalBodyBuilder
+
+
+class HashingInput:
+    """File-like tee over a request stream that feeds every read to a builder.
+
+    Wraps ``wsgi.input`` or Django's request stream. Data is returned to the
+    caller unchanged. Once ``content_length`` bytes
+    have been read, or the stream reports EOF, ``on_complete`` receives the
+    finished canonical body.
+    """
+
+    def __init__(
+        self,
+        stream: Any,
+        builder: CanonicalBodyBuilder,
+        on_complete: Callable[[Optional[CanonicalBody]], None],
+        *,
+        content_length: Optional[int] = None,
+    ):
+        self._stream = stream
+        self._builder = builder
+        self._on_complete = on_complete
+        self._remaining = content_length
+        self.complete = False
+
+    def _tee(self, data: bytes, requested: Optional[int]) -> bytes:
+        if self.complete:
+            return data
+        self._builder.feed(data)
+        if self._remaining is not None:
+            self._remaining -= len(data)
+        at_eof = not data and requested != 0
+        if at_eof or (self._remaining is not None and self._remaining <= 0) or requested in (None, -1):
+            self.complete = True
+            self._on_complete(self._builder.finish())
+        return data
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        if self._remaining is not None and (size is None or size < 0):
+            # Never block on sockets that stay open past the declared body.
+            size = max(self._remaining, 0)
+            return self._tee(self._stream.read(size), size if size else None)
+        return self._tee(self._stream.read(size), size)
+
+    def readline(self, size: Optional[int] = -1) -> bytes:
+        line = self._stream.readline() if size is None or size < 0 else self._stream.readline(size)
+        # readline() reaching EOF returns b""; a partial line is never final.
+        return self._tee(line, 1)
+
+    def readlines(self, hint: int = -1) -> List[bytes]:
+        return list(iter(self.readline, b""))
+
+    def __iter__(self) -> Iterator[bytes]:
+        return iter(self.readline, b"")
+
+    def drain(self, chunk_size: int = 64 * 1024) -> None:
+        """Read and hash whatever the application left unread."""
+
+        while not self.complete:
+            self.read(chunk_size)
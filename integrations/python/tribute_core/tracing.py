@@ -0,0 +1,361 @@
+"""Sampled per-request trace spans written to a JSON-lines file.
+
+With a :class:`Tracer` installed by :func:`set_tracer`, each adapter request
+becomes a span tree: the ``request`` span at adapter entry and, below it,
+the stages timed through :func:`tribute_core.metrics.timed` (``handler``,
+``estimate``, ``sign``, ``verify``, ``usage`` and ``canonicalize`` with its
+``canonicalize.headers``, ``.query``, ``.body`` and ``.hash`` steps). Every
+span carries the route template and the canonical hash of the request.
+
+Head sampling keeps ``sample_rate`` of requests, decided as they start. Tail
+sampling (``slow_threshold_seconds``) keeps requests that end up slower than
+the threshold or raise; every request is then traced in memory and the
+spans are discarded at the end unless it qualifies.
+
+A span that ends after its request, such as the ``usage`` span of a WSGI
+response body streamed once the view has returned, is emitted on its own
+with the same ``trace_id``, as a child of the root span, if the trace was
+kept.
+"""
+
+from __future__ import annotations
+
+import os
+import queue
+import random
+import threading
+import time
+from contextvars import ContextVar
+from itertools import count
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Protocol, Tuple, Union
+
+from .canonical_json import json_dumps
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .canonicalization import CanonicalRequest
+
+_TRACE: ContextVar[Optional["Trace"]] = ContextVar("tribute_trace", default=None)
+_PARENT: ContextVar[int] = ContextVar("tribute_span", default=0)
+
+# (span_id, parent_id, name, start, duration, attributes)
+_SpanRecord = Tuple[int, int, str, float, float, Optional[Dict[str, Any]]]
+
+
+class TraceSink(Protocol):
+    def emit(self, records: List[Dict[str, Any]]) -> None:
+        ...
+
+
+class JsonLinesSink:
+    """Append span records to ``path``, one JSON object per line.
+
+    Records are written by a background thread. :meth:`emit` never blocks the
+    request: at most ``max_pending`` traces wait for the writer, and traces
+    arriving while the queue is full are dropped and counted in
+    :attr:`dropped`.
+    """
+
+    def __init__(self, path: Union[str, "os.PathLike[str]"], *, max_pending: int = 1024):
+        self.path = os.fspath(path)
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[List[Dict[str, Any]]]]" = queue.Queue(maxsize=max_pending)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def emit(self, records: List[Dict[str, Any]]) -> None:
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(records)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self) -> None:
+        """Block until every queued trace has been written."""
+
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Write what is queued and stop the writer thread."""
+
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                thread = threading.Thread(target=self._run, name="tribute-trace-sink", daemon=True)
+                thread.start()
+                self._thread = thread
+
+    def _run(self) -> None:
+        with open(self.path, "ab") as out:
+            while True:
+                batch = self._queue.get()
+                try:
+                    if batch is None:
+                        return
+                    out.write(b"".join(json_dumps(record, default=str) + b"\n" for record in batch))
+                    if self._queue.empty():
+                        out.flush()
+                finally:
+                    self._queue.task_done()
+
+
+class Trace:
+    """Spans recorded so far for one request."""
+
+    __slots__ = (
+        "trace_id",
+        "route",
+        "head_sampled",
+        "canonical",
+        "spans",
+        "dropped_spans",
+        "closed",
+        "_late",
+        "_root",
+        "_ids",
+        "_max_spans",
+        "_origin",
+        "_wall",
+    )
+
+    def __init__(self, route: str, *, head_sampled: bool, max_spans: int):
+        self.trace_id = os.urandom(8).hex()
+        self.route = route
+        self.head_sampled = head_sampled
+        self.canonical: Optional["CanonicalRequest"] = None
+        self.spans: List[_SpanRecord] = []
+        self.dropped_spans = 0
+        self.closed = False
+        self._late: Optional[Tuple[TraceSink, str]] = None
+        self._root = 0
+        self._ids = count(1)
+        self._max_spans = max_spans
+        self._origin = perf_counter()
+        self._wall = time.time()
+
+    def span(self, name: str, **attributes: Any) -> "_Span":
+        """Context manager recording ``name`` as a child of the current span."""
+
+        return _Span(self, name, attributes or None)
+
+    def record(
+        self, name: str, start: float, duration: float, *, attributes: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Add an already measured span (``start`` from ``perf_counter``)."""
+
+        self._add(next(self._ids), _PARENT.get(), name, start, duration, attributes)
+
+    def _add(
+        self,
+        span_id: int,
+        parent: int,
+        name: str,
+        start: float,
+        duration: float,
+        attributes: Optional[Dict[str, Any]],
+    ) -> None:
+        if self.closed:
+            if self._late is not None:
+                sink, sampled = self._late
+                sink.emit(self._render([(span_id, parent or self._root, name, start, duration, attributes)], sampled))
+            return
+        # The root span finishes last; keep a slot for it.
+        if parent and len(self.spans) >= self._max_spans - 1:
+            self.dropped_spans += 1
+            return
+        self.spans.append((span_id, parent, name, start, duration, attributes))
+
+    def records(self, sampled: str) -> List[Dict[str, Any]]:
+        """Render the spans as JSON-ready dicts, oldest first."""
+
+        return self._render(sorted(self.spans, key=lambda span: span[3]), sampled)
+
+    def close(self, late: Optional[Tuple[TraceSink, str]] = None) -> None:
+        """Stop collecting spans; with ``late``, later spans go to that sink with that sampling label."""
+
+        self.closed = True
+        self._late = late
+        self._root = next((span[0] for span in self.spans if not span[1]), 0)
+
+    def _render(self, spans: List[_SpanRecord], sampled: str) -> List[Dict[str, Any]]:
+        canonical_hash = self.canonical.hash() if self.canonical is not None else None
+        records = []
+        for span_id, parent, name, start, duration, attributes in spans:
+            record: Dict[str, Any] = {
+                "trace_id": self.trace_id,
+                "span_id": span_id,
+                "parent_id": parent or None,
+                "name": name,
+                "route": self.route,
+                "canonical_hash": canonical_hash,
+                "start": self._wall + (start - self._origin),
+                "duration": duration,
+                "sampled": sampled,
+            }
+            if not parent and self.dropped_spans:
+                attributes = {**(attributes or {}), "dropped_spans": self.dropped_spans}
+            if attributes:
+                record["attributes"] = attributes
+            records.append(record)
+        return records
+
+
+class _Span:
+    __slots__ = ("_trace", "_name", "_attributes", "_id", "_parent", "_token", "_start")
+
+    def __init__(self, trace: Trace, name: str, attributes: Optional[Dict[str, Any]]):
+        self._trace = trace
+        self._name = name
+        self._attributes = attributes
+
+    def __enter__(self) -> "_Span":
+        self._parent = _PARENT.get()
+        self._id = next(self._trace._ids)
+        self._token = _PARENT.set(self._id)
+        self._start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type: Any, *exc: Any) -> None:
+        duration = perf_counter() - self._start
+        _PARENT.reset(self._token)
+        attributes = self._attributes
+        if exc_type is not None:
+            attributes = {**(attributes or {}), "error": exc_type.__name__}
+        self._trace._add(self._id, self._parent, self._name, self._start, duration, attributes)
+
+
+class Tracer:
+    """Decide which requests are traced and hand finished traces to ``sink``.
+
+    ``sample_rate`` is the head-sampled fraction. With
+    ``slow_threshold_seconds`` every other request is traced too and kept
+    only when it took at least that long or raised. ``max_spans`` bounds the
+    spans kept per trace; the rest are counted on the root span.
+    """
+
+    def __init__(
+        self,
+        sink: TraceSink,
+        *,
+        sample_rate: float = 0.01,
+        slow_threshold_seconds: Optional[float] = None,
+        max_spans: int = 256,
+    ):
+        self.sink = sink
+        self.sample_rate = sample_rate
+        self.slow_threshold_seconds = slow_threshold_seconds
+        self.max_spans = max_spans
+
+    def start(self, route: str) -> Optional[Trace]:
+        rate = self.sample_rate
+        head = rate >= 1.0 or (rate > 0.0 and random.random() < rate)
+        if not head and self.slow_threshold_seconds is None:
+            return None
+        return Trace(route, head_sampled=head, max_spans=self.max_spans)
+
+    def finish(self, trace: Trace, duration: float, *, failed: bool = False) -> bool:
+        """Close ``trace`` and emit it if sampled; return whether it was kept."""
+
+        if trace.head_sampled:
+            sampled = "head"
+        elif failed or (self.slow_threshold_seconds is not None and duration >= self.slow_threshold_seconds):
+            sampled = "tail"
+        else:
+            trace.close()
+            return False
+        trace.close((self.sink, sampled))
+        self.sink.emit(trace.records(sampled))
+        return True
+
+
+class _RequestTrace:
+    __slots__ = ("_tracer", "_route", "_trace", "_token", "_start")
+
+    def __init__(self, tracer: Tracer, route: str):
+        self._tracer = tracer
+        self._route = route
+
+    def __enter__(self) -> Optional[Trace]:
+        trace = self._trace = self._tracer.start(self._route)
+        if trace is not None:
+            self._token = _TRACE.set(trace)
+            self._start = perf_counter()
+        return trace
+
+    def __exit__(self, exc_type: Any, *exc: Any) -> None:
+        trace = self._trace
+        if trace is None:
+            return
+        duration = perf_counter() - self._start
+        _TRACE.reset(self._token)
+        self._tracer.finish(trace, duration, failed=exc_type is not None)
+
+
+class _NoopScope:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+
+_NOOP = _NoopScope()
+_tracer: Optional[Tracer] = None
+
+
+def get_tracer() -> Optional[Tracer]:
+    return _tracer
+
+
+def set_tracer(tracer: Optional[Tracer]) -> Optional[Tracer]:
+    """Install the process-wide tracer (``None`` turns tracing off); returns the previous one."""
+
+    global _tracer
+    previous = _tracer
+    _tracer = tracer
+    return previous
+
+
+def current_trace() -> Optional[Trace]:
+    return _TRACE.get()
+
+
+def trace_request(route: Optional[str]) -> Any:
+    """Context manager tracing one request for ``route``, if the tracer samples it.
+
+    Nested calls (an adapter wrapper inside the ASGI middleware, say) join the
+    trace already in progress.
+    """
+
+    tracer = _tracer
+    if tracer is None or _TRACE.get() is not None:
+        return _NOOP
+    return _RequestTrace(tracer, route or "")
+
+
+def trace_span(name: str, **attributes: Any) -> Any:
+    """Context manager recording ``name`` in the current trace; a no-op outside one."""
+
+    trace = _TRACE.get()
+    if trace is None:
+        return _NOOP
+    return trace.span(name, **attributes)
+
+
+def attach_canonical(canonical: Optional["CanonicalRequest"]) -> None:
+    """Label the current trace with ``canonical``'s hash (first one wins)."""
+
+    trace = _TRACE.get()
+    if trace is not None and trace.canonical is None and canonical is not None:
+        trace.canonical = canonical
+
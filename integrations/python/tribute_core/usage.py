@@ -2,66 +2,244 @@
 
 from __future__ import annotations
 
+import base64
+import hashlib
 from dataclasses import dataclass
-from typing import Any, Iterable, Mapping, MutableMapping, Optional, Tuple
+from time import perf_counter
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    MutableMapping,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from .metrics import LatencyRecorder, current_route, get_recorder, timed
+from .tracing import Trace, current_trace
+from .price import Price, PriceLike
+
+Chunk = Union[bytes, bytearray, memoryview]
 
 
 @dataclass
 class UsageReport:
     """Structured usage emitted back to the proxy."""
 
-    final_price: Optional[float]
+    final_price: Optional[Price]
     usage: Mapping[str, Any]
     response_bytes: int
+    content_hash: Optional[str] = None
+
+    def to_headers(self) -> Dict[str, str]:
+        """Return the response headers (or trailers) the proxy reads."""
+
+        headers: Dict[str, str] = {}
+        if self.content_hash is not None:
+            headers["X-Content-Hash"] = self.content_hash
+        if self.final_price is not None:
+            headers["X-Final-Price"] = str(self.final_price)
+        return headers
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return a JSON-ready body; ``final_price`` is a number, as the proxy expects."""
+
+        payload: Dict[str, Any] = {"usage": dict(self.usage), "response_bytes": self.response_bytes}
+        if self.content_hash is not None:
+            payload["content_hash"] = self.content_hash
+        if self.final_price is not None:
+            payload["final_price"] = float(self.final_price)
+        return payload
 
 
 class UsageTracker:
-    """Collect byte counts and structured usage for responses."""
+    """Collect byte counts, the content hash and structured usage for responses.
+
+    The hash is the SHA-256 of the body, base64url-encoded without padding, as
+    sent in ``X-Content-Hash``.
+    """
 
     def __init__(self) -> None:
         self._bytes = 0
+        self._sha = hashlib.sha256()
         self._usage: MutableMapping[str, Any] = {}
-        self._final_price: Optional[float] = None
+        self._final_price: Optional[Price] = None
 
-    def add_chunk(self, chunk: bytes) -> None:
-        self._bytes += len(chunk)
+    def add_chunk(self, chunk: Chunk) -> None:
+        self._bytes += chunk.nbytes if isinstance(chunk, memoryview) else len(chunk)
+        self._sha.update(chunk)
 
     def set_usage(self, usage: Mapping[str, Any]) -> None:
         self._usage.update(dict(usage))
 
-    def set_final_price(self, price: Optional[float]) -> None:
-        self._final_price = price
+    def set_final_price(self, price: Optional[PriceLike]) -> None:
+        self._final_price = None if price is None else Price.parse(price)
+
+    def content_hash(self) -> str:
+        return base64.urlsafe_b64encode(self._sha.digest()).rstrip(b"=").decode("ascii")
 
     def build(self) -> UsageReport:
         return UsageReport(
             final_price=self._final_price,
             usage=dict(self._usage),
             response_bytes=self._bytes,
+            content_hash=self.content_hash(),
         )
 
 
+class AccountedStream:
+    """Pass a response body through while counting bytes and hashing it.
+
+    Works as both a sync and an async iterator (async iteration also accepts
+    a sync body), consumed once. Chunks, including ``memoryview`` slices, are yielded
+    unchanged. Once the body is exhausted, :attr:`report` holds the final
+    :class:`UsageReport` and the registered completion callbacks run, which is
+    where trailers or after-response hooks pick it up. With a latency recorder
+    installed, the time spent counting and hashing is recorded once, as the
+    ``usage`` stage of the route that created the stream; inside a traced
+    request it is also added to the trace as a ``usage`` span. WSGI servers
+    iterate the body after the view has returned and its trace has closed;
+    the span is then emitted late (see :mod:`tribute_core.tracing`).
+    """
+
+    def __init__(
+        self,
+        body: Union[Iterable[Chunk], AsyncIterable[Chunk]],
+        *,
+        tracker: Optional[UsageTracker] = None,
+        on_complete: Optional[Callable[[UsageReport], None]] = None,
+    ):
+        self._body = body
+        self.tracker = tracker or UsageTracker()
+        self.report: Optional[UsageReport] = None
+        self._callbacks: List[Callable[[UsageReport], None]] = []
+        self._recorder: Optional[LatencyRecorder] = None
+        # Captured here because WSGI bodies are iterated after the view returns.
+        self._trace: Optional[Trace] = current_trace()
+        self._route = current_route()
+        self._started = 0.0
+        self._elapsed = 0.0
+        self._iterator: Optional[Iterator[Chunk]] = None
+        self._async_iterator: Optional[AsyncIterator[Chunk]] = None
+        if on_complete is not None:
+            self._callbacks.append(on_complete)
+
+    def add_done_callback(self, callback: Callable[[UsageReport], None]) -> None:
+        if self.report is not None:
+            callback(self.report)
+        else:
+            self._callbacks.append(callback)
+
+    def __iter__(self) -> "AccountedStream":
+        return self
+
+    def __next__(self) -> Chunk:
+        iterator = self._iterator
+        if iterator is None:
+            iterator = self._iterator = self._iter()
+        return next(iterator)
+
+    def __aiter__(self) -> "AccountedStream":
+        return self
+
+    async def __anext__(self) -> Chunk:
+        iterator = self._async_iterator
+        if iterator is None:
+            iterator = self._async_iterator = self._aiter()
+        return await iterator.__anext__()
+
+    def _iter(self) -> Iterator[Chunk]:
+        add_chunk = self._chunk_adder()
+        for chunk in self._body:  # type: ignore[union-attr]
+            add_chunk(chunk)
+            yield chunk
+        self._finish()
+
+    async def _aiter(self) -> AsyncIterator[Chunk]:
+        add_chunk = self._chunk_adder()
+        body = self._body
+        if hasattr(body, "__aiter__"):
+            async for chunk in body:  # type: ignore[union-attr]
+                add_chunk(chunk)
+                yield chunk
+        else:
+            for chunk in body:  # type: ignore[union-attr]
+                add_chunk(chunk)
+                yield chunk
+        self._finish()
+
+    def _chunk_adder(self) -> Callable[[Chunk], None]:
+        add_chunk = self.tracker.add_chunk
+        recorder = get_recorder()
+        if recorder is not None and not recorder.sampled():
+            recorder = None
+        trace = current_trace() or self._trace
+        if recorder is None and trace is None:
+            return add_chunk
+        self._recorder = recorder
+        self._trace = trace
+        self._route = current_route() or self._route
+        self._started = perf_counter()
+
+        def timed_add(chunk: Chunk) -> None:
+            start = perf_counter()
+            add_chunk(chunk)
+            self._elapsed += perf_counter() - start
+
+        return timed_add
+
+    def _finish(self) -> None:
+        if self.report is not None:
+            return
+        start = perf_counter()
+        self.report = self.tracker.build()
+        elapsed = self._elapsed + perf_counter() - start
+        if self._recorder is not None:
+            self._recorder.observe("usage", elapsed, route=self._route)
+        if self._trace is not None:
+            self._trace.record(
+                "usage", self._started, elapsed, attributes={"response_bytes": self.report.response_bytes}
+            )
+        callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback(self.report)
+
+
 def enrich_response(
     *,
     body: bytes,
     usage: Optional[Mapping[str, Any]] = None,
-    final_price: Optional[float] = None,
+    final_price: Optional[PriceLike] = None,
 ) -> Tuple[bytes, UsageReport]:
     """Attach usage metadata to a response body."""
 
-    tracker = UsageTracker()
-    tracker.add_chunk(body)
-    if usage:
-        tracker.set_usage(usage)
-    tracker.set_final_price(final_price)
-    return body, tracker.build()
+    with timed("usage"):
+        tracker = UsageTracker()
+        tracker.add_chunk(body)
+        if usage:
+            tracker.set_usage(usage)
+        tracker.set_final_price(final_price)
+        return body, tracker.build()
 
 
 def wrap_iterable(
-    iterable: Iterable[bytes], *, tracker: Optional[UsageTracker] = None
-) -> Iterable[bytes]:
-    """Yield body chunks while counting bytes."""
-
-    tracker = tracker or UsageTracker()
-    for chunk in iterable:
-        tracker.add_chunk(chunk)
-        yield chunk
+    iterable: Iterable[Chunk], *, tracker: Optional[UsageTracker] = None
+) -> AccountedStream:
+    """Yield body chunks while counting bytes and hashing content."""
+
+    return AccountedStream(iterable, tracker=tracker)
+
+
+def wrap_async_iterable(
+    iterable: AsyncIterable[Chunk], *, tracker: Optional[UsageTracker] = None
+) -> AccountedStream:
+    """Async counterpart of :func:`wrap_iterable` for streaming responses."""
+
+    return AccountedStream(iterable, tracker=tracker)
@@ -1,5 +1,5 @@
 """Django REST Framework adapter for the Tribute core."""
 
-from .adapter import DRFAdapter
+from .adapter import DRFAdapter, canonical_request
 
-__all__ = ["DRFAdapter"]
+__all__ = ["DRFAdapter", "canonical_request"]
@@ -1,47 +1,450 @@
-"""Django REST Framework integration skeleton."""
+"""Django REST Framework integration for Tribute core hooks."""
 
 from __future__ import annotations
 
-from typing import Any, Callable
+import copy
+import inspect
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
 
-from tribute_core import canonicalize_request, estimate_handler, resolve_semantics
+from tribute_core import (
+    CACHEABLE_METHODS,
+    CachedResponse,
+    CacheRule,
+    CanonicalBody,
+    CanonicalBodyBuilder,
+    CanonicalRequest,
+    Canonicalizer,
+    EntitlementEngine,
+    EntitlementRequirement,
+    EstimateCache,
+    HashingInput,
+    ProxyContextVerifier,
+    ReplayGuard,
+    ResponseCache,
+    SubscriptionRequired,
+    estimate_handler,
+    instrument,
+    replay_error,
+    resolve_semantics,
+)
+from tribute_core.caching import estimate_payload
+from tribute_core.canonicalization import DEFAULT_SPOOL_THRESHOLD
+from tribute_core.replay import REPLAY_STATUS
+
+_LIST_ACTIONS = ("list", "create")
+_DETAIL_ACTIONS = ("retrieve", "update", "partial_update", "destroy")
 
 
 class DRFAdapter:
-    """Wrap DRF viewsets to invoke Tribute core hooks."""
+    """Wrap DRF viewsets to invoke Tribute core hooks.
+
+    ``register_viewset`` compiles one :class:`Canonicalizer` per viewset
+    action. Coroutine handlers get native async wrappers, so async views under
+    ASGI keep running on the event loop. Request bodies are not read by the
+    wrapper: the request stream is replaced with a hashing tee and
+    ``request.tribute_canonical`` is set once the view has consumed the body
+    (see :func:`canonical_request`).
+
+    With a ``response_cache``, ``GET`` and ``HEAD`` requests to ``@cacheable``
+    actions are served from it; other methods run the action as usual. The
+    action's response is finalized and rendered inside the wrapper so the
+    cache stores the bytes the client receives; hits return a plain
+    ``HttpResponse``.
+
+    With a ``proxy_context`` verifier, wrapped actions also set
+    ``request.tribute_proxy_context`` to the decoded ``X-Proxy-Context`` (or
+    ``None``), and a ``replay_guard`` answers ``409`` to replayed receipt
+    nonces before the action runs. An ``entitlements`` engine answers
+    ``402 subscription_required`` on ``@entitlement`` actions the subject is
+    not entitled to.
+
+    Actions record ``request``, ``handler`` and ``estimate`` timings, labelled
+    with the action's path template, when a latency recorder is installed,
+    and each call starts a trace when a tracer is installed.
+    """
 
-    def __init__(self, *, router: Any, header_allowlist: list[str] | None = None):
+    def __init__(
+        self,
+        *,
+        router: Any,
+        header_allowlist: list[str] | None = None,
+        estimate_cache: Optional[EstimateCache] = None,
+        spool_threshold: int = DEFAULT_SPOOL_THRESHOLD,
+        response_cache: Optional[ResponseCache] = None,
+        proxy_context: Optional[ProxyContextVerifier] = None,
+        replay_guard: Optional[ReplayGuard] = None,
+        entitlements: Optional[EntitlementEngine] = None,
+    ):
+        if replay_guard is not None and proxy_context is None:
+            raise ValueError("replay_guard needs a proxy_context verifier")
+        if entitlements is not None and proxy_context is None:
+            raise ValueError("entitlements need a proxy_context verifier")
         self.router = router
         self.header_allowlist = header_allowlist or ["authorization", "content-type", "accept"]
+        self.estimate_cache = estimate_cache
+        self.spool_threshold = spool_threshold
+        self.response_cache = response_cache
+        self.proxy_context = proxy_context
+        self.replay_guard = replay_guard
+        self.entitlements = entitlements
 
     def register_viewset(self, path: str, viewset: Any, *, basename: str) -> None:
         self.router.register(path, viewset, basename=basename)
 
-        for method in getattr(viewset, "http_method_names", []):
-            handler = getattr(viewset, method, None)
+        prefix = "/" + path.strip("/")
+        trailing = getattr(self.router, "trailing_slash", "/")
+        lookup = getattr(viewset, "lookup_url_kwarg", None) or getattr(viewset, "lookup_field", "pk")
+        templates: Dict[str, Optional[str]] = {
+            method: None for method in getattr(viewset, "http_method_names", [])
+        }
+        templates.update({action: f"{prefix}{trailing}" for action in _LIST_ACTIONS})
+        templates.update({action: f"{prefix}/{{{lookup}}}{trailing}" for action in _DETAIL_ACTIONS})
+
+        for name, template in templates.items():
+            handler = getattr(viewset, name, None)
             if not handler:
                 continue
             semantics = resolve_semantics(handler)
-            wrapped = self._instrument_method(handler)
-            setattr(viewset, method, wrapped)
+            canonicalizer = Canonicalizer(header_allowlist=self.header_allowlist, path_template=template)
+            cache_rule = CacheRule.from_options(semantics.cacheable)
+            requirement = self.entitlements.compile(semantics.entitlement) if self.entitlements else None
+            timed_handler = instrument(handler, "handler")
+            if self.response_cache is not None and cache_rule is not None:
+                instrumented = self._cached_method(
+                    timed_handler, canonicalizer, self.response_cache, cache_rule, requirement
+                )
+            else:
+                instrumented = self._instrument_method(timed_handler, canonicalizer, requirement)
+            setattr(viewset, name, instrument(instrumented, "request", route=template))
             estimator = estimate_handler(handler)
             if estimator:
-                setattr(viewset, f"{method}_estimate", estimator)
+                estimator = instrument(estimator, "estimate")
+                if self.estimate_cache is not None:
+                    estimator = self._cached_estimator(estimator, self.estimate_cache, canonicalizer)
+                setattr(viewset, f"{name}_estimate", instrument(estimator, "request", route=template))
+
+    def _instrument_method(
+        self,
+        handler: Callable[..., Any],
+        canonicalizer: Canonicalizer,
+        requirement: Optional[EntitlementRequirement] = None,
+    ) -> Callable[..., Any]:
+        spool_threshold = self.spool_threshold
+        verifier = self.proxy_context
+        guard = self.replay_guard
+        engine = self.entitlements
+
+        if inspect.iscoroutinefunction(handler):
+
+            @wraps(handler)
+            async def async_wrapped(viewset_self: Any, request: Any, *args: Any, **kwargs: Any):
+                rejected = _attach_proxy_context(verifier, guard, request) or await _check_entitlement_async(
+                    engine, requirement, request
+                )
+                if rejected is not None:
+                    return rejected
+                _attach_streaming(canonicalizer, request, kwargs, spool_threshold)
+                return await handler(viewset_self, request, *args, **kwargs)
 
-    def _instrument_method(self, handler: Callable[..., Any]) -> Callable[..., Any]:
-        header_allowlist = self.header_allowlist
+            return async_wrapped
 
+        @wraps(handler)
         def wrapped(viewset_self: Any, request: Any, *args: Any, **kwargs: Any):
-            canonical = canonicalize_request(
-                method=request.method,
-                raw_path=request.get_full_path(),
-                header_allowlist=header_allowlist,
-                headers=request.headers.items(),
-                query=request.query_params.lists() if hasattr(request.query_params, "lists") else request.query_params.items(),
-                body=request.body,
-                path_params=kwargs,
+            rejected = _attach_proxy_context(verifier, guard, request) or _check_entitlement(
+                engine, requirement, request
             )
-            setattr(request, "tribute_canonical", canonical)
+            if rejected is not None:
+                return rejected
+            _attach_streaming(canonicalizer, request, kwargs, spool_threshold)
             return handler(viewset_self, request, *args, **kwargs)
 
         return wrapped
+
+    def _cached_method(
+        self,
+        handler: Callable[..., Any],
+        canonicalizer: Canonicalizer,
+        cache: ResponseCache,
+        rule: CacheRule,
+        requirement: Optional[EntitlementRequirement] = None,
+    ) -> Callable[..., Any]:
+        verifier = self.proxy_context
+        guard = self.replay_guard
+        engine = self.entitlements
+        uncached = self._instrument_method(handler, canonicalizer, requirement)
+
+        if inspect.iscoroutinefunction(handler):
+
+            @wraps(handler)
+            async def async_wrapped(viewset_self: Any, request: Any, *args: Any, **kwargs: Any):
+                if request.method not in CACHEABLE_METHODS:
+                    return await uncached(viewset_self, request, *args, **kwargs)
+                rejected = _attach_proxy_context(verifier, guard, request) or await _check_entitlement_async(
+                    engine, requirement, request
+                )
+                if rejected is not None:
+                    return rejected
+                canonical = _canonicalize(canonicalizer, request, kwargs, _read_body(request))
+
+                async def compute() -> Any:
+                    response = await handler(viewset_self, request, *args, **kwargs)
+                    return _render(viewset_self, request, response, args, kwargs)
+
+                result = await cache.get_or_compute_async(
+                    cache.key(canonical, rule, request.headers.get, path=request.path),
+                    rule,
+                    compute,
+                    _response_parts,
+                    method=request.method,
+                )
+                return _from_cache(result)
+
+            return async_wrapped
+
+        @wraps(handler)
+        def wrapped(viewset_self: Any, request: Any, *args: Any, **kwargs: Any):
+            if request.method not in CACHEABLE_METHODS:
+                return uncached(viewset_self, request, *args, **kwargs)
+            rejected = _attach_proxy_context(verifier, guard, request) or _check_entitlement(
+                engine, requirement, request
+            )
+            if rejected is not None:
+                return rejected
+            canonical = _canonicalize(canonicalizer, request, kwargs, _read_body(request))
+
+            def compute() -> Any:
+                response = handler(viewset_self, request, *args, **kwargs)
+                return _render(viewset_self, request, response, args, kwargs)
+
+            result = cache.get_or_compute(
+                cache.key(canonical, rule, request.headers.get, path=request.path),
+                rule,
+                compute,
+                _response_parts,
+                method=request.method,
+            )
+            return _from_cache(result)
+
+        return wrapped
+
+    def _cached_estimator(
+        self, estimator: Callable[..., Any], cache: EstimateCache, canonicalizer: Canonicalizer
+    ) -> Callable[..., Any]:
+        if inspect.iscoroutinefunction(estimator):
+
+            @wraps(estimator)
+            async def async_cached(viewset_self: Any, request: Any, *args: Any, **kwargs: Any):
+                canonical = _canonicalize(canonicalizer, request, kwargs, _read_body(request))
+                payload = cache.get(canonical)
+                if payload is not None:
+                    return _estimate_response(payload)
+                result = await estimator(viewset_self, request, *args, **kwargs)
+                payload = _estimate_payload(result)
+                if payload is not None:
+                    cache.put(canonical, payload)
+                return result
+
+            return async_cached
+
+        @wraps(estimator)
+        def cached(viewset_self: Any, request: Any, *args: Any, **kwargs: Any):
+            canonical = _canonicalize(canonicalizer, request, kwargs, _read_body(request))
+            payload = cache.get(canonical)
+            if payload is not None:
+                return _estimate_response(payload)
+            result = estimator(viewset_self, request, *args, **kwargs)
+            payload = _estimate_payload(result)
+            if payload is not None:
+                cache.put(canonical, payload)
+            return result
+
+        return cached
+
+
+def canonical_request(request: Any, *, drain: bool = False) -> Optional[CanonicalRequest]:
+    """Return ``request.tribute_canonical`` once the body has been consumed.
+
+    With ``drain=True`` any unread body is consumed (and discarded) so the
+    canonical request can be finalized; only use it after the view is done
+    with the body.
+    """
+
+    canonical = getattr(request, "tribute_canonical", None)
+    if canonical is None and drain:
+        stream = getattr(request, "tribute_input", None)
+        if stream is not None:
+            stream.drain()
+            canonical = getattr(request, "tribute_canonical", None)
+    return canonical
+
+
+def _attach_streaming(
+    canonicalizer: Canonicalizer, request: Any, path_params: Any, spool_threshold: int
+) -> None:
+    django_request = getattr(request, "_request", request)
+    content_length = _content_length(django_request)
+    if hasattr(django_request, "_body") or not content_length:
+        _canonicalize(canonicalizer, request, path_params, getattr(django_request, "_body", None))
+        return
+
+    content_type = None
+    if "content-type" in canonicalizer.header_allowlist:
+        content_type = request.headers.get("content-type")
+    builder = CanonicalBodyBuilder(content_type, spool_threshold=spool_threshold, retain_payload=False)
+    # Headers and query are normalized now; only the body waits for the view.
+    parts = _request_parts(request)
+
+    def finalize(body: Optional[CanonicalBody]) -> None:
+        canonical = canonicalizer.canonicalize(
+            method=request.method,
+            raw_path=request.path,
+            headers=parts[0],
+            query=parts[1],
+            body=body,
+            path_params=path_params,
+        )
+        setattr(request, "tribute_canonical", canonical)
+
+    stream = HashingInput(django_request._stream, builder, finalize, content_length=content_length)
+    django_request._stream = stream
+    setattr(request, "tribute_input", stream)
+
+
+def _attach_proxy_context(
+    verifier: Optional[ProxyContextVerifier], guard: Optional[ReplayGuard], request: Any
+) -> Any:
+    if verifier is None:
+        return None
+    meta = getattr(request, "_request", request).META
+    context = verifier.verify(meta.get("HTTP_X_PROXY_CONTEXT"), host=meta.get("HTTP_HOST"))
+    setattr(request, "tribute_proxy_context", context)
+    if guard is not None and context is not None and not guard.accept_context(context):
+        from django.http import JsonResponse  # deferred import
+
+        return JsonResponse(replay_error(context), status=REPLAY_STATUS)
+    return None
+
+
+def _check_entitlement(
+    engine: Optional[EntitlementEngine], requirement: Optional[EntitlementRequirement], request: Any
+) -> Any:
+    if engine is None or requirement is None:
+        return None
+    try:
+        engine.require(requirement, getattr(request, "tribute_proxy_context", None))
+    except SubscriptionRequired as exc:
+        return _subscription_required(exc)
+    return None
+
+
+async def _check_entitlement_async(
+    engine: Optional[EntitlementEngine], requirement: Optional[EntitlementRequirement], request: Any
+) -> Any:
+    if engine is None or requirement is None:
+        return None
+    try:
+        await engine.require_async(requirement, getattr(request, "tribute_proxy_context", None))
+    except SubscriptionRequired as exc:
+        return _subscription_required(exc)
+    return None
+
+
+def _subscription_required(exc: SubscriptionRequired) -> Any:
+    from django.http import JsonResponse  # deferred import
+
+    response = JsonResponse(exc.body(), status=exc.status)
+    for name, value in exc.headers().items():
+        response[name] = value
+    return response
+
+
+def _canonicalize(
+    canonicalizer: Canonicalizer, request: Any, path_params: Any, body: Optional[bytes]
+) -> CanonicalRequest:
+    headers, query = _request_parts(request)
+    canonical = canonicalizer.canonicalize(
+        method=request.method,
+        raw_path=request.path,
+        headers=headers,
+        query=query,
+        body=body,
+        path_params=path_params,
+    )
+    setattr(request, "tribute_canonical", canonical)
+    return canonical
+
+
+def _estimate_payload(result: Any) -> Optional[Dict[str, Any]]:
+    payload = estimate_payload(result)
+    if payload is not None or not hasattr(result, "status_code"):
+        return payload
+    if not 200 <= result.status_code < 300 or getattr(result, "cookies", None):
+        return None
+    if "Set-Cookie" in getattr(result, "headers", {}):
+        return None
+    data = getattr(result, "data", None)
+    return dict(data) if isinstance(data, Mapping) else None
+
+
+def _estimate_response(payload: Mapping[str, Any]) -> Any:
+    from rest_framework.response import Response  # deferred import
+
+    # finalize_response() sets renderer state on the response, so hits never
+    # share one object.
+    return Response(copy.deepcopy(payload))
+
+
+def _render(viewset_self: Any, request: Any, response: Any, args: Any, kwargs: Any) -> Any:
+    if getattr(response, "is_rendered", True):
+        return response
+    if hasattr(response, "data"):
+        # DRF picks the renderer after the action returns; do it now so the bytes can be cached.
+        response = viewset_self.finalize_response(request, response, *args, **kwargs)
+    return response.render()
+
+
+def _response_parts(response: Any) -> Optional[Tuple[int, List[Tuple[str, str]], bytes]]:
+    if getattr(response, "streaming", False):
+        return None
+    headers = response.headers.items() if hasattr(response, "headers") else response.items()
+    return response.status_code, list(headers), response.content
+
+
+def _from_cache(result: Any) -> Any:
+    if not isinstance(result, CachedResponse):
+        return result
+    from django.http import HttpResponse  # deferred import
+
+    response = HttpResponse(result.body, status=result.status)
+    for name, value in result.headers:
+        response[name] = value
+    return response
+
+
+def _request_parts(request: Any) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+    params = getattr(request, "query_params", None)
+    if params is None:
+        params = request.GET
+    return list(request.headers.items()), list(_iter_query(params))
+
+
+def _read_body(request: Any) -> Optional[bytes]:
+    django_request = getattr(request, "_request", request)
+    return django_request.body if _content_length(django_request) else None
+
+
+def _content_length(django_request: Any) -> int:
+    try:
+        return max(int(django_request.META.get("CONTENT_LENGTH") or 0), 0)
+    except ValueError:
+        return 0
+
+
+def _iter_query(params: Any) -> Iterable[Tuple[str, str]]:
+    if hasattr(params, "lists"):
+        for key, values in params.lists():
+            for value in values:
+                yield key, value
+    else:
+        yield from params.items()
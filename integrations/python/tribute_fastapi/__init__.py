@@ -1,5 +1,6 @@
 """FastAPI adapter for the Tribute core."""
 
 from .adapter import FastAPIAdapter
+from .middleware import TributeASGIMiddleware
 
-__all__ = ["FastAPIAdapter"]
+__all__ = ["FastAPIAdapter", "TributeASGIMiddleware"]
@@ -2,26 +2,91 @@
 
 from __future__ import annotations
 
-from typing import Any, Awaitable, Callable, Iterable, Optional
+import inspect
+import json
+import typing
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
 
 from tribute_core import (
+    CACHEABLE_METHODS,
+    PROXY_CONTEXT_HEADER,
+    AsyncCoalescer,
+    CacheRule,
+    Canonicalizer,
+    EntitlementEngine,
+    EntitlementRequirement,
+    EstimateCache,
+    ProxyContextVerifier,
+    ReplayGuard,
+    ResponseCache,
+    SubscriptionRequired,
     apply_openapi_extensions,
     build_proxy_metadata,
-    canonicalize_request,
     estimate_handler,
+    instrument,
+    replay_error,
     resolve_semantics,
 )
+from tribute_core.caching import estimate_payload
+from tribute_core.replay import REPLAY_STATUS
+
+from .middleware import CONTEXT_STATE_KEY, STATE_KEY, TributeASGIMiddleware
 
 HeaderItems = Iterable[tuple[str, str]]
 QueryItems = Iterable[tuple[str, str]]
 
+_REQUEST_KWARG = "tribute_request"
+
 
 class FastAPIAdapter:
-    """Attach Tribute semantics to FastAPI routes."""
+    """Attach Tribute semantics to FastAPI routes.
+
+    A ``response_cache`` serves ``GET`` and ``HEAD`` requests to
+    ``@cacheable`` routes through :class:`TributeASGIMiddleware`, so it takes
+    effect once :meth:`install_middleware` has been called.
 
-    def __init__(self, *, app: Any, header_allowlist: Optional[list[str]] = None):
+    A ``proxy_context`` verifier stores its result as
+    ``request.state.tribute_proxy_context``, a ``replay_guard`` answers
+    ``409`` to replayed receipt nonces and an ``entitlements`` engine answers
+    ``402 subscription_required`` on ``@entitlement`` routes the subject is
+    not entitled to. The middleware applies them before the app runs;
+    without it, the registered routes apply them instead.
+
+    Handlers and estimators record ``handler`` and ``estimate`` timings when
+    a latency recorder is installed; the middleware adds the ``request``
+    stage and the route label. The same stages become trace spans when a
+    tracer is installed (see :func:`tribute_core.set_tracer`).
+    """
+
+    def __init__(
+        self,
+        *,
+        app: Any,
+        header_allowlist: Optional[list[str]] = None,
+        estimate_cache: Optional[EstimateCache] = None,
+        estimate_coalescer: Optional[AsyncCoalescer] = None,
+        response_cache: Optional[ResponseCache] = None,
+        proxy_context: Optional[ProxyContextVerifier] = None,
+        replay_guard: Optional[ReplayGuard] = None,
+        entitlements: Optional[EntitlementEngine] = None,
+    ):
+        if replay_guard is not None and proxy_context is None:
+            raise ValueError("replay_guard needs a proxy_context verifier")
+        if entitlements is not None and proxy_context is None:
+            raise ValueError("entitlements need a proxy_context verifier")
         self.app = app
         self.header_allowlist = header_allowlist or ["authorization", "content-type", "accept"]
+        self.estimate_cache = estimate_cache
+        self.estimate_coalescer = estimate_coalescer
+        self.response_cache = response_cache
+        self.proxy_context = proxy_context
+        self.replay_guard = replay_guard
+        self.entitlements = entitlements
+        self._entitlement_rules: Dict[Tuple[str, str], EntitlementRequirement] = {}
+        self._cache_rules: Dict[Tuple[str, str], CacheRule] = {}
+        self._canonicalizer = Canonicalizer(header_allowlist=self.header_allowlist)
+        self._route_canonicalizers: Dict[str, Canonicalizer] = {}
 
     def register(
         self,
@@ -32,14 +97,35 @@ class FastAPIAdapter:
         name: Optional[str] = None,
     ) -> None:
         semantics = resolve_semantics(handler)
+        self._route_canonicalizers[path] = Canonicalizer(
+            header_allowlist=self.header_allowlist, path_template=path
+        )
+        cache_rule = CacheRule.from_options(semantics.cacheable)
+        if self.response_cache is not None and cache_rule is not None:
+            for method in methods or ["GET"]:
+                if method.upper() in CACHEABLE_METHODS:
+                    self._cache_rules[(method.upper(), path)] = cache_rule
+        requirement = self.entitlements.compile(semantics.entitlement) if self.entitlements is not None else None
+        if requirement is not None:
+            for method in methods or ["GET"]:
+                self._entitlement_rules[(method.upper(), path)] = requirement
+        endpoint = _timed_endpoint(handler, "handler")
+        if self.proxy_context is not None:
+            endpoint = self._admit(endpoint, requirement)
         self.app.add_api_route(
             path,
-            handler,
+            endpoint,
             methods=methods,
             name=name,
         )
         estimator = estimate_handler(handler)
         if estimator:
+            self._route_canonicalizers[f"{path}/estimate"] = Canonicalizer(
+                header_allowlist=self.header_allowlist, path_template=f"{path}/estimate"
+            )
+            estimator = _timed_endpoint(estimator, "estimate")
+            if self.estimate_cache is not None or self.estimate_coalescer is not None:
+                estimator = self._wrap_estimator(estimator)
             self.app.add_api_route(
                 f"{path}/estimate",
                 estimator,
@@ -47,12 +133,35 @@ class FastAPIAdapter:
                 name=f"{name or handler.__name__}_estimate",
             )
 
+    def install_middleware(self, **options: Any) -> None:
+        """Add :class:`TributeASGIMiddleware` using this adapter's routes."""
+
+        self.app.add_middleware(
+            TributeASGIMiddleware,
+            header_allowlist=self.header_allowlist,
+            canonicalizers=self._route_canonicalizers.values(),
+            response_cache=self.response_cache,
+            cache_rules=self._cache_rules,
+            proxy_context=self.proxy_context,
+            replay_guard=self.replay_guard,
+            entitlements=self.entitlements,
+            entitlement_rules=self._entitlement_rules,
+            **options,
+        )
+
     async def on_request(self, request: Any):
+        scope = getattr(request, "scope", None) or {}
+        existing = scope.get("state", {}).get(STATE_KEY)
+        if existing is not None:
+            return existing
         body = await request.body() if callable(getattr(request, "body", None)) else None
-        canonical = canonicalize_request(
+        existing = scope.get("state", {}).get(STATE_KEY)
+        if existing is not None:
+            # The middleware finalized the canonical request while the body was read.
+            return existing
+        canonical = self._canonicalizer_for(request).canonicalize(
             method=request.method,
             raw_path=str(request.url.path),
-            header_allowlist=self.header_allowlist,
             headers=_iter_headers(request.headers),
             query=_iter_query(request.query_params),
             body=body,
@@ -60,9 +169,117 @@ class FastAPIAdapter:
         )
         state = getattr(request, "state", None)
         if state is not None:
-            setattr(state, "tribute_canonical", canonical)
+            setattr(state, STATE_KEY, canonical)
         return canonical
 
+    def _wrap_estimator(self, estimator: Callable[..., Any]) -> Callable[..., Awaitable[Any]]:
+        """Serve ``estimator`` through the estimate cache and coalescer.
+
+        The cache holds :func:`~tribute_core.caching.estimate_payload`
+        mappings and every hit gets a new ``JSONResponse``; otherwise
+        concurrent requests with the same canonical hash share one estimator
+        invocation: the caller that ran it gets the estimator's result and
+        the others a new ``JSONResponse`` built from its payload. A result
+        without a payload (a streamed response, say) is never shared; the
+        other callers run the estimator themselves. The wrapper advertises
+        the estimator's own signature plus a ``Request`` parameter, so
+        FastAPI keeps resolving the estimator's dependencies.
+        """
+
+        from starlette.concurrency import run_in_threadpool  # deferred import
+        from starlette.requests import Request
+        from starlette.responses import JSONResponse
+
+        cache = self.estimate_cache
+        coalescer = self.estimate_coalescer
+        is_async = inspect.iscoroutinefunction(estimator)
+
+        async def compute(canonical: Any, args: Any, kwargs: Any, owner: Any = None) -> Any:
+            if is_async:
+                result = await estimator(*args, **kwargs)
+            else:
+                result = await run_in_threadpool(estimator, *args, **kwargs)
+            payload = _estimate_payload(result)
+            if cache is not None and payload is not None:
+                cache.put(canonical, payload)
+            return payload, result, owner
+
+        signature, request_name = _with_request_param(estimator, Request)
+
+        @wraps(estimator)
+        async def wrapped(*args: Any, **kwargs: Any):
+            request = _pop_request(kwargs, request_name)
+            canonical = await self.on_request(request)
+            if cache is not None:
+                payload = cache.get(canonical)
+                if payload is not None:
+                    return JSONResponse(payload)
+            if coalescer is None:
+                return (await compute(canonical, args, kwargs))[1]
+            owner = object()
+            payload, result, leader = await coalescer.run(canonical.hash(), compute, canonical, args, kwargs, owner)
+            if leader is owner:
+                return result
+            if payload is not None:
+                return JSONResponse(payload)
+            return (await compute(canonical, args, kwargs))[1]
+
+        setattr(wrapped, "__signature__", signature)
+        return wrapped
+
+    def _admit(
+        self, endpoint: Callable[..., Any], requirement: Optional[EntitlementRequirement]
+    ) -> Callable[..., Awaitable[Any]]:
+        """Verify the proxy context, apply the replay guard and check ``requirement`` inside the route.
+
+        Requests that passed through :class:`TributeASGIMiddleware` already
+        carry the verified context, so it is not verified or replay-checked
+        twice. ``requirement`` is always checked here: the middleware only
+        enforces routes its path matching resolves (not ``{p:path}``
+        converters or apps under a ``root_path``), and grants are cached, so
+        the repeat check is cheap.
+        """
+
+        from starlette.concurrency import run_in_threadpool  # deferred import
+        from starlette.requests import Request
+        from starlette.responses import JSONResponse
+
+        verifier = self.proxy_context
+        guard = self.replay_guard
+        engine = self.entitlements
+        assert verifier is not None
+        is_async = inspect.iscoroutinefunction(endpoint)
+        signature, request_name = _with_request_param(endpoint, Request)
+
+        @wraps(endpoint)
+        async def admitted(*args: Any, **kwargs: Any):
+            request = _pop_request(kwargs, request_name)
+            state = request.scope.setdefault("state", {})
+            if CONTEXT_STATE_KEY in state:
+                context = state[CONTEXT_STATE_KEY]
+            else:
+                context = state[CONTEXT_STATE_KEY] = verifier.verify(
+                    request.headers.get(PROXY_CONTEXT_HEADER), host=request.headers.get("host")
+                )
+                if guard is not None and context is not None and not guard.accept_context(context):
+                    return JSONResponse(replay_error(context), status_code=REPLAY_STATUS)
+            if engine is not None and requirement is not None:
+                try:
+                    await engine.require_async(requirement, context)
+                except SubscriptionRequired as exc:
+                    return JSONResponse(exc.body(), status_code=exc.status, headers=exc.headers())
+            if is_async:
+                return await endpoint(*args, **kwargs)
+            return await run_in_threadpool(endpoint, *args, **kwargs)
+
+        setattr(admitted, "__signature__", signature)
+        return admitted
+
+    def _canonicalizer_for(self, request: Any) -> Canonicalizer:
+        scope = getattr(request, "scope", None) or {}
+        route_path = getattr(scope.get("route"), "path", None)
+        return self._route_canonicalizers.get(route_path, self._canonicalizer)
+
     def patch_openapi(self) -> None:
         schema = self.app.openapi()
         for route in getattr(self.app, "routes", []):
@@ -83,6 +300,63 @@ class FastAPIAdapter:
         self.app.openapi_schema = schema
 
 
+def _timed_endpoint(func: Callable[..., Any], stage: str) -> Callable[..., Any]:
+    timed_func = instrument(func, stage)
+    # FastAPI resolves string annotations against the endpoint's module, which
+    # for the wrapper would be ours; hand it the resolved signature instead.
+    setattr(timed_func, "__signature__", _resolved_signature(func))
+    return timed_func
+
+
+def _resolved_signature(func: Callable[..., Any]) -> inspect.Signature:
+    signature = inspect.signature(func)
+    hints = typing.get_type_hints(func, include_extras=True)
+    return signature.replace(
+        parameters=[
+            param.replace(annotation=hints.get(name, param.annotation))
+            for name, param in signature.parameters.items()
+        ],
+        return_annotation=hints.get("return", signature.return_annotation),
+    )
+
+
+def _with_request_param(func: Callable[..., Any], request_type: type) -> Tuple[inspect.Signature, str]:
+    """Return ``func``'s signature with a ``request_type`` parameter and that parameter's name.
+
+    FastAPI injects the request into one parameter only, so a parameter the
+    function already declares is reused rather than shadowed.
+    """
+
+    signature = _resolved_signature(func)
+    params = list(signature.parameters.values())
+    for param in params:
+        if isinstance(param.annotation, type) and issubclass(param.annotation, request_type):
+            return signature, param.name
+    extra = inspect.Parameter(_REQUEST_KWARG, inspect.Parameter.KEYWORD_ONLY, annotation=request_type)
+    if params and params[-1].kind is inspect.Parameter.VAR_KEYWORD:
+        params.insert(len(params) - 1, extra)
+    else:
+        params.append(extra)
+    return signature.replace(parameters=params), _REQUEST_KWARG
+
+
+def _pop_request(kwargs: Dict[str, Any], name: str) -> Any:
+    return kwargs.pop(name) if name == _REQUEST_KWARG else kwargs[name]
+
+
+def _estimate_payload(result: Any) -> Optional[Dict[str, Any]]:
+    payload = estimate_payload(result)
+    if payload is not None or not hasattr(result, "status_code"):
+        return payload
+    if not 200 <= result.status_code < 300 or "set-cookie" in result.headers:
+        return None
+    body = getattr(result, "body", None)
+    if not body or "json" not in (result.headers.get("content-type") or ""):
+        return None
+    data = json.loads(body)
+    return data if isinstance(data, dict) else None
+
+
 def _iter_headers(headers: Any) -> HeaderItems:
     if hasattr(headers, "multi_items"):
         return headers.multi_items()
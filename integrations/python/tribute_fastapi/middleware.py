@@ -0,0 +1,319 @@
+"""Pure ASGI middleware that canonicalizes requests while they stream."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Mapping, MutableMapping, Optional, Tuple
+from urllib.parse import parse_qsl
+
+from tribute_core import (
+    CachedResponse,
+    CacheRule,
+    CanonicalBody,
+    CanonicalBodyBuilder,
+    CanonicalRequest,
+    Canonicalizer,
+    EntitlementEngine,
+    EntitlementRequirement,
+    ProxyContextVerifier,
+    ReplayGuard,
+    ResponseCache,
+    SubscriptionRequired,
+    get_recorder,
+    get_tracer,
+    replay_error,
+    route_scope,
+    timed,
+    trace_request,
+)
+from tribute_core.canonicalization import DEFAULT_SPOOL_THRESHOLD
+from tribute_core.replay import REPLAY_STATUS
+
+Scope = MutableMapping[str, Any]
+Message = MutableMapping[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+ASGIApp = Callable[[Scope, Receive, Send], Awaitable[None]]
+
+STATE_KEY = "tribute_canonical"
+CONTEXT_STATE_KEY = "tribute_proxy_context"
+
+
+class TributeASGIMiddleware:
+    """Attach a ``CanonicalRequest`` to ``scope["state"]`` without buffering.
+
+    Headers and the query string are read straight from the ASGI scope. Body
+    chunks are hashed as the downstream app receives them and passed through
+    untouched, so the body is never buffered twice. Requests without a body
+    are canonicalized before the app runs. For requests with a body, the
+    canonical request appears under ``scope["state"]["tribute_canonical"]``
+    (``request.state.tribute_canonical`` in Starlette) once the final chunk
+    has been received.
+
+    ``canonicalizers`` are route canonicalizers tried in order to resolve the
+    path template; it may be a live view such as ``dict.values()``.
+
+    With a ``response_cache``, bodiless ``GET`` and ``HEAD`` requests to
+    routes listed in ``cache_rules`` (keyed by method and path template) are
+    answered from the cache.
+    Misses pass the response through while capturing it, and stale hits are
+    served immediately while one background task replays the request through
+    the app to refresh the entry.
+
+    With a ``proxy_context`` verifier, the decoded ``X-Proxy-Context`` (or
+    ``None``) is stored under ``scope["state"]["tribute_proxy_context"]``
+    before the app runs, and a ``replay_guard`` answers ``409`` to contexts
+    whose receipt nonce was already seen. An ``entitlements`` engine answers
+    ``402 subscription_required`` for routes in ``entitlement_rules`` (keyed
+    by method and path template) when the subject is not entitled.
+
+    When a latency recorder is installed, each request is timed as the
+    ``request`` stage and labelled with its route template for everything
+    recorded downstream. When a tracer is installed, the middleware is where
+    each request's trace starts.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        header_allowlist: Optional[List[str]] = None,
+        canonicalizers: Iterable[Canonicalizer] = (),
+        spool_threshold: int = DEFAULT_SPOOL_THRESHOLD,
+        response_cache: Optional[ResponseCache] = None,
+        cache_rules: Optional[Mapping[Tuple[str, str], CacheRule]] = None,
+        proxy_context: Optional[ProxyContextVerifier] = None,
+        replay_guard: Optional[ReplayGuard] = None,
+        entitlements: Optional[EntitlementEngine] = None,
+        entitlement_rules: Optional[Mapping[Tuple[str, str], EntitlementRequirement]] = None,
+    ):
+        if replay_guard is not None and proxy_context is None:
+            raise ValueError("replay_guard needs a proxy_context verifier")
+        if entitlements is not None and proxy_context is None:
+            raise ValueError("entitlements need a proxy_context verifier")
+        self.app = app
+        self.proxy_context = proxy_context
+        self.replay_guard = replay_guard
+        self.entitlements = entitlements
+        self.entitlement_rules: Mapping[Tuple[str, str], EntitlementRequirement] = (
+            entitlement_rules if entitlement_rules is not None else {}
+        )
+        self.response_cache = response_cache
+        self.cache_rules: Mapping[Tuple[str, str], CacheRule] = cache_rules if cache_rules is not None else {}
+        self.canonicalizer = Canonicalizer(
+            header_allowlist=header_allowlist or ["authorization", "content-type", "accept"]
+        )
+        self.canonicalizers = canonicalizers
+        self.spool_threshold = spool_threshold
+        self._allow_bytes = frozenset(name.encode("latin-1") for name in self.canonicalizer.header_allowlist)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        raw_path: str = scope["path"]
+        canonicalizer, path_params = self._route(raw_path)
+        if get_recorder() is None and get_tracer() is None:
+            await self._handle(scope, receive, send, raw_path, canonicalizer, path_params)
+            return
+        route = canonicalizer.path_template
+        with route_scope(route), trace_request(route), timed("request"):
+            await self._handle(scope, receive, send, raw_path, canonicalizer, path_params)
+
+    async def _handle(
+        self,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+        raw_path: str,
+        canonicalizer: Canonicalizer,
+        path_params: Optional[Dict[str, str]],
+    ) -> None:
+        allow = self._allow_bytes
+        headers: List[Tuple[str, str]] = []
+        has_body: Optional[bool] = None
+        envelope: Optional[bytes] = None
+        host: Optional[bytes] = None
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                has_body = value != b"0"
+            elif name == b"transfer-encoding":
+                has_body = True
+            elif name == b"x-proxy-context":
+                envelope = value
+            elif name == b"host":
+                host = value
+            if name in allow:
+                headers.append((name.decode("latin-1"), value.decode("latin-1")))
+        if has_body is None:
+            # HTTP/1.x frames every body with one of those headers; HTTP/2 and
+            # HTTP/3 can send one without either.
+            http1 = scope.get("http_version", "1.1") in ("1.0", "1.1")
+            has_body = not http1 and scope["method"] not in ("GET", "HEAD")
+        query_string: bytes = scope.get("query_string", b"")
+        query = parse_qsl(query_string.decode("latin-1"), keep_blank_values=True) if query_string else []
+        state = scope.setdefault("state", {})
+        if self.proxy_context is not None:
+            context = state[CONTEXT_STATE_KEY] = self.proxy_context.verify(
+                envelope.decode("latin-1") if envelope is not None else None,
+                host=host.decode("latin-1") if host is not None else None,
+            )
+            guard = self.replay_guard
+            if guard is not None and context is not None and not guard.accept_context(context):
+                await _send_json(send, REPLAY_STATUS, replay_error(context))
+                return
+            requirement = self.entitlement_rules.get((scope["method"], canonicalizer.path_template or ""))
+            if self.entitlements is not None and requirement is not None:
+                try:
+                    await self.entitlements.require_async(requirement, context)
+                except SubscriptionRequired as exc:
+                    await _send_json(send, exc.status, exc.body(), exc.headers())
+                    return
+
+        def finalize(body: Optional[CanonicalBody]) -> None:
+            state[STATE_KEY] = canonicalizer.canonicalize(
+                method=scope["method"],
+                raw_path=raw_path,
+                headers=headers,
+                query=query,
+                body=body,
+                path_params=path_params,
+            )
+
+        if not has_body:
+            finalize(None)
+            rule = self.cache_rules.get((scope["method"], canonicalizer.path_template or ""))
+            if self.response_cache is not None and rule is not None:
+                await self._serve_cached(scope, receive, send, state[STATE_KEY], rule)
+                return
+            await self.app(scope, receive, send)
+            return
+
+        content_type = None
+        if "content-type" in canonicalizer.header_allowlist:
+            content_type = next((value for name, value in headers if name == "content-type"), None)
+        builder = CanonicalBodyBuilder(
+            content_type, spool_threshold=self.spool_threshold, retain_payload=False
+        )
+        done = False
+
+        async def tee_receive() -> Message:
+            nonlocal done
+            message = await receive()
+            if not done and message["type"] == "http.request":
+                builder.feed(message.get("body", b""))
+                if not message.get("more_body", False):
+                    done = True
+                    finalize(builder.finish())
+            return message
+
+        await self.app(scope, tee_receive, send)
+
+    async def _serve_cached(
+        self, scope: Scope, receive: Receive, send: Send, canonical: CanonicalRequest, rule: CacheRule
+    ) -> None:
+        cache = self.response_cache
+        assert cache is not None
+        raw_headers = scope["headers"]
+
+        def header(name: str) -> Optional[str]:
+            wanted = name.encode("latin-1")
+            for key, value in raw_headers:
+                if key == wanted:
+                    return value.decode("latin-1")
+            return None
+
+        key = cache.key(canonical, rule, header, path=scope["path"])
+        entry = cache.lookup(key)
+        if entry is None:
+            await self._run_and_store(scope, receive, send, key, rule)
+            return
+        if not cache.is_fresh(entry) and cache.begin_revalidation(key):
+            cache.keep_task(asyncio.ensure_future(self._refresh(scope, key, rule)))
+        await _send_entry(send, entry)
+
+    async def _run_and_store(self, scope: Scope, receive: Receive, send: Send, key: str, rule: CacheRule) -> None:
+        cache = self.response_cache
+        assert cache is not None
+        status = 0
+        headers: List[Tuple[str, str]] = []
+        chunks: List[bytes] = []
+        size = 0
+
+        async def capture(message: Message) -> None:
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers.extend(
+                    (name.decode("latin-1"), value.decode("latin-1")) for name, value in message.get("headers", ())
+                )
+            elif message["type"] == "http.response.body" and size >= 0:
+                body = message.get("body", b"")
+                size += len(body)
+                if size > cache.max_body_bytes:
+                    size = -1
+                    chunks.clear()
+                else:
+                    chunks.append(body)
+                    if not message.get("more_body", False):
+                        cache.store(key, rule, status, headers, b"".join(chunks), method=scope["method"])
+            await send(message)
+
+        await self.app(scope, receive, capture)
+
+    async def _refresh(self, scope: Scope, key: str, rule: CacheRule) -> None:
+        cache = self.response_cache
+        assert cache is not None
+        done = asyncio.Event()
+        requested = False
+
+        async def receive() -> Message:
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await done.wait()
+            return {"type": "http.disconnect"}
+
+        async def discard(message: Message) -> None:
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                done.set()
+
+        try:
+            replay = dict(scope)
+            replay["state"] = dict(scope.get("state", {}))
+            await self._run_and_store(replay, receive, discard, key, rule)
+        finally:
+            done.set()
+            cache.end_revalidation(key)
+
+    def _route(self, raw_path: str) -> Tuple[Canonicalizer, Optional[Dict[str, str]]]:
+        for canonicalizer in self.canonicalizers:
+            params = canonicalizer.match_path(raw_path)
+            if params is not None:
+                return canonicalizer, params
+        return self.canonicalizer, None
+
+
+async def _send_entry(send: Send, entry: CachedResponse) -> None:
+    await send(
+        {
+            "type": "http.response.start",
+            "status": entry.status,
+            "headers": [(name.encode("latin-1"), value.encode("latin-1")) for name, value in entry.headers],
+        }
+    )
+    await send({"type": "http.response.body", "body": entry.body, "more_body": False})
+
+
+async def _send_json(
+    send: Send, status: int, payload: Mapping[str, Any], headers: Optional[Mapping[str, str]] = None
+) -> None:
+    body = json.dumps(payload).encode("utf-8")
+    raw_headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode("latin-1"))]
+    for name, value in (headers or {}).items():
+        raw_headers.append((name.lower().encode("latin-1"), value.encode("latin-1")))
+    await send({"type": "http.response.start", "status": status, "headers": raw_headers})
+    await send({"type": "http.response.body", "body": body})
@@ -1,5 +1,6 @@
 """Flask adapter for the Tribute core."""
 
 from .adapter import FlaskAdapter
+from .middleware import TributeWSGIMiddleware, canonical_request
 
-__all__ = ["FlaskAdapter"]
+__all__ = ["FlaskAdapter", "TributeWSGIMiddleware", "canonical_request"]
@@ -2,20 +2,98 @@
 
 from __future__ import annotations
 
-from typing import Any, Callable, Iterable, List, Tuple
+import re
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
-from tribute_core import canonicalize_request, estimate_handler, resolve_semantics
+from tribute_core import (
+    CACHEABLE_METHODS,
+    CachedResponse,
+    CacheRule,
+    CanonicalRequest,
+    Canonicalizer,
+    EntitlementEngine,
+    EntitlementRequirement,
+    EstimateCache,
+    ProxyContextVerifier,
+    ReplayGuard,
+    ResponseCache,
+    SubscriptionRequired,
+    estimate_handler,
+    attach_canonical,
+    instrument,
+    replay_error,
+    resolve_semantics,
+)
+from tribute_core.caching import estimate_payload
+from tribute_core.replay import REPLAY_STATUS
+
+from .middleware import CONTEXT_KEY, ENVIRON_KEY, STREAM_KEY, TributeWSGIMiddleware, verify_proxy_context
 
 HeaderItems = Iterable[Tuple[str, str]]
 QueryItems = Iterable[Tuple[str, str]]
 
+_RULE_PARAM = re.compile(r"<(?:[^:<>]+:)?([^<>]+)>")
+
 
 class FlaskAdapter:
-    """Wrap Flask app routes to tap into Tribute core semantics."""
+    """Wrap Flask app routes to tap into Tribute core semantics.
+
+    With a ``response_cache``, ``GET`` and ``HEAD`` requests to routes
+    decorated with ``@cacheable`` are served from it; stale entries are refreshed on a thread that carries a copy of
+    the request context.
+
+    With a ``proxy_context`` verifier, the decoded ``X-Proxy-Context`` of each
+    request is available as ``request.environ["tribute.proxy_context"]``; add
+    a ``replay_guard`` to answer ``409`` to replayed receipt nonces, and an
+    ``entitlements`` engine to answer ``402 subscription_required`` on
+    ``@entitlement`` routes the context's subject is not entitled to.
+
+    Routes record ``request``, ``handler`` and ``estimate`` timings, labelled
+    with the route template, when a latency recorder is installed (see
+    :func:`tribute_core.set_recorder`), and each request starts a trace when
+    a tracer is installed (see :func:`tribute_core.set_tracer`).
+    """
 
-    def __init__(self, app: Any, *, header_allowlist: List[str] | None = None):
+    def __init__(
+        self,
+        app: Any,
+        *,
+        header_allowlist: List[str] | None = None,
+        estimate_cache: Optional[EstimateCache] = None,
+        response_cache: Optional[ResponseCache] = None,
+        proxy_context: Optional[ProxyContextVerifier] = None,
+        replay_guard: Optional[ReplayGuard] = None,
+        entitlements: Optional[EntitlementEngine] = None,
+    ):
+        if replay_guard is not None and proxy_context is None:
+            raise ValueError("replay_guard needs a proxy_context verifier")
+        if entitlements is not None and proxy_context is None:
+            raise ValueError("entitlements need a proxy_context verifier")
         self.app = app
         self.header_allowlist = header_allowlist or ["authorization", "content-type", "accept"]
+        self.estimate_cache = estimate_cache
+        self.response_cache = response_cache
+        self.proxy_context = proxy_context
+        self.replay_guard = replay_guard
+        self.entitlements = entitlements
+        self._route_canonicalizers: Dict[str, Canonicalizer] = {}
+
+    def install_middleware(self, **options: Any) -> None:
+        """Wrap ``app.wsgi_app`` with :class:`TributeWSGIMiddleware`.
+
+        Route wrappers then stop buffering bodies with ``get_data()`` and
+        leave the canonical request to the streaming middleware.
+        """
+
+        self.app.wsgi_app = TributeWSGIMiddleware(
+            self.app.wsgi_app,
+            header_allowlist=self.header_allowlist,
+            canonicalizers=self._route_canonicalizers.values(),
+            proxy_context=self.proxy_context,
+            replay_guard=self.replay_guard,
+            **options,
+        )
 
     def register(
         self,
@@ -27,37 +105,176 @@ class FlaskAdapter:
     ) -> None:
         semantics = resolve_semantics(handler)
         endpoint = endpoint or handler.__name__
+        template = _RULE_PARAM.sub(r"{\1}", rule)
+        canonicalizer = self._route_canonicalizers[rule] = Canonicalizer(
+            header_allowlist=self.header_allowlist,
+            path_template=template,
+        )
+        timed_handler = instrument(handler, "handler")
 
-        def wrapped(*args: Any, **kwargs: Any):
-            from flask import request as flask_request  # deferred import
+        cache = self.response_cache
+        cache_rule = CacheRule.from_options(semantics.cacheable) if cache is not None else None
+        verifier = self.proxy_context
+        guard = self.replay_guard
+        engine = self.entitlements
+        requirement = engine.compile(semantics.entitlement) if engine is not None else None
 
-            canonical = canonicalize_request(
-                method=flask_request.method,
-                raw_path=flask_request.path,
-                header_allowlist=self.header_allowlist,
-                headers=_iter_headers(flask_request.headers),
-                query=_iter_query(flask_request.args),
-                body=flask_request.get_data(),
-                path_params=kwargs,
-            )
-            flask_request.environ["tribute.canonical_request"] = canonical
-            return handler(*args, **kwargs)
+        def wrapped(*args: Any, **kwargs: Any):
+            if verifier is not None:
+                rejected = _admit(verifier, guard, engine, requirement)
+                if rejected is not None:
+                    return rejected
+            if cache_rule is not None:
+                return _cached_response(timed_handler, args, kwargs, canonicalizer, cache, cache_rule)
+            _canonicalize(canonicalizer, kwargs)
+            return timed_handler(*args, **kwargs)
 
-        self.app.add_url_rule(rule, endpoint, wrapped, methods=list(methods))
+        self.app.add_url_rule(
+            rule, endpoint, instrument(wrapped, "request", route=template), methods=list(methods)
+        )
 
         estimator = estimate_handler(handler)
         if estimator:
+            estimate_canonicalizer = self._route_canonicalizers[f"{rule}/estimate"] = Canonicalizer(
+                header_allowlist=self.header_allowlist,
+                path_template=f"{template}/estimate",
+            )
+            estimator = instrument(estimator, "estimate")
+            if self.estimate_cache is not None:
+                estimator = _cached_estimator(estimator, self.estimate_cache, estimate_canonicalizer)
             self.app.add_url_rule(
                 f"{rule}/estimate",
                 f"{endpoint}_estimate",
-                estimator,
+                instrument(estimator, "request", route=f"{template}/estimate"),
                 methods=["POST"],
             )
 
 
+def _canonicalize(
+    canonicalizer: Canonicalizer, path_params: Any, *, need_body: bool = False
+) -> Optional[CanonicalRequest]:
+    from flask import request as flask_request  # deferred import
+
+    environ = flask_request.environ
+    if STREAM_KEY in environ or ENVIRON_KEY in environ:
+        # The streaming middleware owns canonicalization for this request.
+        if need_body and ENVIRON_KEY not in environ:
+            flask_request.get_data()
+        canonical = environ.get(ENVIRON_KEY)
+        attach_canonical(canonical)
+        return canonical
+
+    canonical = canonicalizer.canonicalize(
+        method=flask_request.method,
+        raw_path=flask_request.path,
+        headers=_iter_headers(flask_request.headers),
+        query=_iter_query(flask_request.args),
+        body=flask_request.get_data(),
+        path_params=path_params,
+    )
+    environ[ENVIRON_KEY] = canonical
+    return canonical
+
+
+def _admit(
+    verifier: ProxyContextVerifier,
+    guard: Optional[ReplayGuard],
+    engine: Optional[EntitlementEngine],
+    requirement: Optional[EntitlementRequirement],
+) -> Any:
+    from flask import request as flask_request  # deferred import
+
+    environ = flask_request.environ
+    if CONTEXT_KEY in environ:
+        # The middleware already verified the context and applied the guard.
+        context = environ[CONTEXT_KEY]
+    else:
+        context = environ[CONTEXT_KEY] = verify_proxy_context(verifier, environ)
+        if guard is not None and context is not None and not guard.accept_context(context):
+            return replay_error(context), REPLAY_STATUS
+    if engine is not None:
+        try:
+            engine.require(requirement, context)
+        except SubscriptionRequired as exc:
+            return exc.body(), exc.status, exc.headers()
+    return None
+
+
+def _cached_estimator(
+    estimator: Callable[..., Any], cache: EstimateCache, canonicalizer: Canonicalizer
+) -> Callable[..., Any]:
+    @wraps(estimator)
+    def cached(*args: Any, **kwargs: Any):
+        canonical = _canonicalize(canonicalizer, kwargs, need_body=True)
+        if canonical is None:
+            return estimator(*args, **kwargs)
+        payload = cache.get(canonical)
+        if payload is not None:
+            from flask import jsonify  # deferred import
+
+            # A new response per hit: after_request hooks and session saving
+            # mutate the object they are given.
+            return jsonify(payload)
+        result = estimator(*args, **kwargs)
+        payload = _estimate_payload(result)
+        if payload is not None:
+            cache.put(canonical, payload)
+        return result
+
+    return cached
+
+
+def _estimate_payload(result: Any) -> Optional[Dict[str, Any]]:
+    payload = estimate_payload(result)
+    if payload is not None or not hasattr(result, "status_code"):
+        return payload
+    if not 200 <= result.status_code < 300 or "Set-Cookie" in result.headers:
+        return None
+    if result.is_streamed or not result.is_json:
+        return None
+    data = result.get_json(silent=True)
+    return data if isinstance(data, dict) else None
+
+
+def _cached_response(
+    handler: Callable[..., Any],
+    args: Any,
+    kwargs: Any,
+    canonicalizer: Canonicalizer,
+    cache: ResponseCache,
+    rule: CacheRule,
+) -> Any:
+    from flask import copy_current_request_context, current_app  # deferred import
+    from flask import request as flask_request
+
+    if flask_request.method not in CACHEABLE_METHODS:
+        _canonicalize(canonicalizer, kwargs)
+        return handler(*args, **kwargs)
+    canonical = _canonicalize(canonicalizer, kwargs, need_body=True)
+    if canonical is None:
+        return handler(*args, **kwargs)
+
+    @copy_current_request_context
+    def compute() -> Any:
+        return current_app.make_response(handler(*args, **kwargs))
+
+    key = cache.key(canonical, rule, flask_request.headers.get, path=flask_request.path)
+    result = cache.get_or_compute(key, rule, compute, _response_parts, method=flask_request.method)
+    if isinstance(result, CachedResponse):
+        return current_app.response_class(result.body, status=result.status, headers=list(result.headers))
+    return result
+
+
+def _response_parts(response: Any) -> Optional[Tuple[int, List[Tuple[str, str]], bytes]]:
+    if response.is_streamed or response.direct_passthrough:
+        return None
+    return response.status_code, list(response.headers.items()), response.get_data()
+
+
 def _iter_headers(headers: Any) -> HeaderItems:
     if hasattr(headers, "items"):
-        return headers.items(multi=True)
+        # werkzeug Headers.items() already yields repeated headers once each.
+        return headers.items()
     return headers
 
 
@@ -0,0 +1,184 @@
+"""WSGI middleware that canonicalizes requests while the body is read."""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Callable, Dict, Iterable, List, Mapping, MutableMapping, Optional, Tuple
+from urllib.parse import parse_qsl
+
+from tribute_core import (
+    CanonicalBody,
+    CanonicalBodyBuilder,
+    CanonicalRequest,
+    Canonicalizer,
+    HashingInput,
+    ProxyContext,
+    ProxyContextVerifier,
+    ReplayGuard,
+    replay_error,
+)
+from tribute_core.canonicalization import DEFAULT_SPOOL_THRESHOLD
+
+Environ = MutableMapping[str, Any]
+WSGIApp = Callable[[Environ, Callable[..., Any]], Iterable[bytes]]
+
+ENVIRON_KEY = "tribute.canonical_request"
+STREAM_KEY = "tribute.input"
+CONTEXT_KEY = "tribute.proxy_context"
+
+
+class TributeWSGIMiddleware:
+    """Canonicalize requests from ``environ`` and a hashing ``wsgi.input`` tee.
+
+    Allowlisted headers are read from their ``environ`` keys and the query
+    string is parsed directly, without building werkzeug ``MultiDict``
+    objects. Requests without a body are canonicalized up front. Otherwise
+    ``wsgi.input`` is replaced with a :class:`HashingInput` and the canonical
+    request lands in ``environ["tribute.canonical_request"]`` once the
+    application has consumed the body (see :func:`canonical_request`).
+
+    Paths are matched against ``canonicalizers`` the way werkzeug ranks
+    rules: a template with a static segment wins over one with a parameter
+    in the same place, whatever the registration order.
+
+    With a ``proxy_context`` verifier, the decoded ``X-Proxy-Context`` (or
+    ``None``) is stored in ``environ["tribute.proxy_context"]``, and a
+    ``replay_guard`` answers ``409`` to contexts whose receipt nonce was
+    already seen, before the app runs.
+    """
+
+    def __init__(
+        self,
+        app: WSGIApp,
+        *,
+        header_allowlist: Optional[List[str]] = None,
+        canonicalizers: Iterable[Canonicalizer] = (),
+        spool_threshold: int = DEFAULT_SPOOL_THRESHOLD,
+        proxy_context: Optional[ProxyContextVerifier] = None,
+        replay_guard: Optional[ReplayGuard] = None,
+    ):
+        if replay_guard is not None and proxy_context is None:
+            raise ValueError("replay_guard needs a proxy_context verifier")
+        self.app = app
+        self.proxy_context = proxy_context
+        self.replay_guard = replay_guard
+        self.canonicalizer = Canonicalizer(
+            header_allowlist=header_allowlist or ["authorization", "content-type", "accept"]
+        )
+        self.canonicalizers = canonicalizers
+        self._registered: Tuple[Canonicalizer, ...] = ()
+        self._ranked: List[Canonicalizer] = []
+        self.spool_threshold = spool_threshold
+        self._environ_keys = tuple(
+            (name, _environ_key(name)) for name in sorted(self.canonicalizer.header_allowlist)
+        )
+
+    def __call__(self, environ: Environ, start_response: Callable[..., Any]) -> Iterable[bytes]:
+        raw_path = _wsgi_str(environ.get("PATH_INFO", "")) or "/"
+        canonicalizer, path_params = self._route(raw_path)
+        headers = [(name, environ[key]) for name, key in self._environ_keys if key in environ]
+        query_string = _wsgi_str(environ.get("QUERY_STRING", ""))
+        query = parse_qsl(query_string, keep_blank_values=True) if query_string else []
+        if self.proxy_context is not None:
+            context = environ[CONTEXT_KEY] = verify_proxy_context(self.proxy_context, environ)
+            guard = self.replay_guard
+            if guard is not None and context is not None and not guard.accept_context(context):
+                return _replay_response(context, start_response)
+
+        def finalize(body: Optional[CanonicalBody]) -> None:
+            environ[ENVIRON_KEY] = canonicalizer.canonicalize(
+                method=environ.get("REQUEST_METHOD", "GET"),
+                raw_path=raw_path,
+                headers=headers,
+                query=query,
+                body=body,
+                path_params=path_params,
+            )
+
+        content_length = _content_length(environ)
+        chunked = "chunked" in environ.get("HTTP_TRANSFER_ENCODING", "").lower()
+        if not chunked and not content_length:
+            finalize(None)
+            return self.app(environ, start_response)
+
+        content_type = None
+        if "content-type" in canonicalizer.header_allowlist:
+            content_type = environ.get("CONTENT_TYPE") or None
+        builder = CanonicalBodyBuilder(
+            content_type, spool_threshold=self.spool_threshold, retain_payload=False
+        )
+        stream = HashingInput(
+            environ["wsgi.input"],
+            builder,
+            finalize,
+            content_length=None if chunked else content_length,
+        )
+        environ["wsgi.input"] = stream
+        environ[STREAM_KEY] = stream
+        return self.app(environ, start_response)
+
+    def _route(self, raw_path: str) -> Tuple[Canonicalizer, Optional[Dict[str, str]]]:
+        registered = tuple(self.canonicalizers)
+        if registered != self._registered:
+            # The adapter passes a live view, so routes may be added later.
+            self._registered = registered
+            self._ranked = sorted(registered, key=lambda canonicalizer: canonicalizer.specificity)
+        for canonicalizer in self._ranked:
+            params = canonicalizer.match_path(raw_path)
+            if params is not None:
+                return canonicalizer, params
+        return self.canonicalizer, None
+
+
+def canonical_request(environ: Mapping[str, Any], *, drain: bool = False) -> Optional[CanonicalRequest]:
+    """Return the canonical request for ``environ`` once it is final.
+
+    With ``drain=True`` any unread body is consumed (and discarded) so the
+    canonical request can be finalized; only use it after the handler is done
+    with the body.
+    """
+
+    canonical = environ.get(ENVIRON_KEY)
+    if canonical is None and drain:
+        stream = environ.get(STREAM_KEY)
+        if stream is not None:
+            stream.drain()
+            canonical = environ.get(ENVIRON_KEY)
+    return canonical
+
+
+def verify_proxy_context(
+    verifier: ProxyContextVerifier, environ: Mapping[str, Any]
+) -> Optional[ProxyContext]:
+    """Verify the ``X-Proxy-Context`` header of a WSGI request."""
+
+    return verifier.verify(
+        environ.get("HTTP_X_PROXY_CONTEXT"), host=environ.get("HTTP_HOST") or environ.get("SERVER_NAME")
+    )
+
+
+def _replay_response(context: ProxyContext, start_response: Callable[..., Any]) -> List[bytes]:
+    body = json.dumps(replay_error(context)).encode("utf-8")
+    start_response(
+        "409 Conflict", [("Content-Type", "application/json"), ("Content-Length", str(len(body)))]
+    )
+    return [body]
+
+
+def _environ_key(header: str) -> str:
+    key = header.upper().replace("-", "_")
+    if key in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+        return key
+    return f"HTTP_{key}"
+
+
+def _wsgi_str(value: str) -> str:
+    # PEP 3333 strings carry raw bytes as latin-1; decode them as UTF-8 like werkzeug.
+    return value.encode("latin-1").decode("utf-8", "replace")
+
+
+def _content_length(environ: Mapping[str, Any]) -> int:
+    try:
+        return max(int(environ.get("CONTENT_LENGTH") or 0), 0)
+    except ValueError:
+        return 0